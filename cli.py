@@ -0,0 +1,321 @@
+import argparse
+import csv
+import datetime
+import sys
+import time
+
+# Headless entry point for scripts and cron: python cli.py <command> ...
+# Nothing here imports Tk; every command imports only the services it uses.
+# Exit code 0 on success, 1 when the command (or part of a batch) failed.
+
+REPORTS = ("custody", "pending", "low-stock", "reorder", "items", "balances", "movements")
+
+# Schema objects the current code relies on: (migration, kind, name). Tables and indexes are
+# looked up with to_regclass, columns as "table.column" in information_schema.
+SCHEMA_CHECKS = (
+    ("schema", "table", "users"),
+    ("schema", "table", "items"),
+    ("schema", "table", "inventory_stock"),
+    ("001", "table", "stock_movements"),
+    ("001", "table", "stock_snapshot_balances"),
+    ("002", "index", "idx_items_name_trgm"),
+    ("002", "index", "idx_items_name_id"),
+    ("002", "index", "idx_items_category_id"),
+    ("003", "table", "audit_events"),
+    ("004", "column", "requests.status_code"),
+    ("004", "index", "idx_requests_pending"),
+    ("004", "index", "idx_requests_courier_queue"),
+    ("005", "table", "college_versions"),
+    ("006", "table", "stock_alerts"),
+    ("006", "table", "stock_alert_events"),
+    ("007", "column", "requests.archived"),
+    ("007", "table", "requests_hot"),
+)
+
+
+# ---------------------------------------------------------
+# PART 1: DATA COMMANDS
+# ---------------------------------------------------------
+
+def cmd_backup(args):
+    from services.stock_manager import StockManager
+    ok, message = StockManager.backup_database(args.output)
+    print(message)
+    return 0 if ok else 1
+
+
+def cmd_restore(args):
+    from services.stock_manager import StockManager
+    ok, message = StockManager.restore_database(args.path)
+    print(message)
+    return 0 if ok else 1
+
+
+def cmd_import_items(args):
+    """CSV with the header name,category,unit,quantity,reorder_level; imported in one transaction."""
+    items = []
+    try:
+        with open(args.path, newline='') as f:
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    items.append((row['name'].strip(), row['category'].strip(), row['unit'].strip(),
+                                  int(row.get('quantity') or 0), int(row.get('reorder_level') or 10)))
+                except (KeyError, AttributeError, ValueError) as e:
+                    print(f"{args.path}:{line}: bad row ({e})")
+                    return 1
+    except OSError as e:
+        print(f"Cannot read {args.path}: {e}")
+        return 1
+    if not items:
+        print("No items to import")
+        return 0
+
+    from services.stock_manager import StockManager
+    item_ids = StockManager.add_items_bulk(items)
+    if not item_ids:
+        print("Import failed, no items were added")
+        return 1
+    print(f"Imported {len(item_ids)} items (ids {item_ids[0]}-{item_ids[-1]})")
+    return 0
+
+
+def cmd_approve(args):
+    from models.request_status import RequestStatus
+    from services.request_manager import RequestManager
+
+    pending = {row.request_no: row for row in RequestManager.get_pending_requests()}
+    request_nos = sorted(pending) if args.all_pending else args.requests
+    failed = 0
+    for request_no in request_nos:
+        row = pending.get(request_no)
+        if row is None:
+            print(f"#{request_no}: not pending")
+            failed += 1
+            continue
+        if RequestManager.process_approval(request_no, RequestStatus.approval_for(row.request_type), args.manager):
+            print(f"#{request_no}: approved")
+        else:
+            print(f"#{request_no}: not approved (insufficient stock or already processed)")
+            failed += 1
+    print(f"{len(request_nos) - failed} approved, {failed} failed")
+    return 1 if failed else 0
+
+
+def cmd_reject(args):
+    from services.request_manager import RequestManager
+
+    failed = 0
+    for request_no in args.requests:
+        if RequestManager.process_rejection(request_no, args.reason, args.manager):
+            print(f"#{request_no}: rejected")
+        else:
+            print(f"#{request_no}: not rejected (already picked up or unknown)")
+            failed += 1
+    print(f"{len(args.requests) - failed} rejected, {failed} failed")
+    return 1 if failed else 0
+
+
+# ---------------------------------------------------------
+# PART 2: REPORTS AND HEALTH
+# ---------------------------------------------------------
+
+def _report_batches(args):
+    """Yields lists of row namedtuples for the report."""
+    from services.stock_manager import StockManager
+    from services.stock_ledger import StockLedger
+
+    report = args.report
+    if report == "custody" and args.as_of:
+        yield StockLedger.get_custody_as_of(args.as_of)
+    elif report == "custody":
+        yield from StockManager.iter_all_college_custody()
+    elif report == "balances":
+        # One location (default: the central warehouse) at a point in time, from the stock ledger
+        yield StockLedger.get_balances_as_of(args.as_of or datetime.datetime.now(), args.college, args.item)
+    elif report == "movements":
+        yield StockLedger.get_movements(args.item, args.college, args.since, args.until)
+    elif report == "pending":
+        from services.request_manager import RequestManager
+        yield RequestManager.get_pending_requests()
+    elif report == "low-stock":
+        yield StockManager.get_low_stock_alerts()
+    elif report == "reorder":
+        from services.demand_analytics import DemandAnalytics  # numpy, only for this report
+        yield DemandAnalytics.get_reorder_recommendations()
+    elif report == "items":
+        yield StockManager.get_all_items()
+
+
+def cmd_report(args):
+    from config.db_config import CancelToken, query_scope
+
+    # The services catch DB errors and return no rows: the token tells an empty report from a failed one
+    token = CancelToken()
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        count = 0
+        with query_scope(token=token):
+            for rows in _report_batches(args):
+                if rows and count == 0:
+                    writer.writerow(rows[0]._fields)
+                writer.writerows(rows)
+                count += len(rows)
+    finally:
+        if args.output: out.close()
+    if token.failed:
+        print(f"Report failed: database error (see above), {count} rows written", file=sys.stderr)
+        return 1
+    if args.output:
+        print(f"{count} rows written to {args.output}")
+    return 0
+
+
+def _timestamp(text, day_time=datetime.time.max):
+    """argparse type for --as-of / --until: an ISO date or date-time; a bare date means the end of that day."""
+    try:
+        if len(text) == 10:
+            return datetime.datetime.combine(datetime.date.fromisoformat(text), day_time)
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a date: {text!r} (use YYYY-MM-DD[ HH:MM[:SS]])")
+
+
+def _start_timestamp(text):
+    """Same as _timestamp() for --since: a bare date means the start of that day."""
+    return _timestamp(text, datetime.time.min)
+
+
+def _check_connection(label, read_only):
+    from config.db_config import get_db_connection
+
+    start = time.perf_counter()
+    conn = get_db_connection(read_only=read_only)
+    if conn is None:
+        print(f"FAIL  {label}: no connection")
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        print(f"ok    {label}: {(time.perf_counter() - start) * 1000:.0f} ms")
+        return conn
+    except Exception as e:
+        print(f"FAIL  {label}: {e}")
+        conn.close()
+        return None
+
+
+def cmd_health(args):
+    import psycopg2
+    from config.db_config import DATABASE_URL, DATABASE_READ_URL  # also loads .env
+
+    if not DATABASE_URL:
+        print("FAIL  DATABASE_URL is not set")
+        return 1
+
+    failed = 0
+    conn = _check_connection("primary", read_only=False)
+    if conn is None:
+        return 1
+    try:
+        cursor = conn.cursor()
+        for migration, kind, name in SCHEMA_CHECKS:
+            if kind == "column":
+                table, column = name.split(".")
+                cursor.execute("""
+                    SELECT EXISTS (SELECT 1 FROM information_schema.columns
+                                   WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s)
+                """, (table, column))
+                present = cursor.fetchone()[0]
+            else:
+                cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+                present = cursor.fetchone()[0]
+            if not present:
+                source = "database/schema.sql" if migration == "schema" else f"migration {migration}"
+                print(f"FAIL  {kind} {name} missing (apply {source})")
+                failed += 1
+    except psycopg2.Error as e:
+        print(f"FAIL  schema check: {e}")
+        failed += 1
+    finally:
+        conn.close()
+    if not failed:
+        print(f"ok    schema: {len(SCHEMA_CHECKS)} tables, columns and indexes present")
+
+    if DATABASE_READ_URL:
+        replica = _check_connection("replica", read_only=True)
+        if replica is None:
+            failed += 1
+        else:
+            replica.close()
+    return 1 if failed else 0
+
+
+# ---------------------------------------------------------
+# PART 3: ARGUMENTS
+# ---------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="KSU inventory from the command line (no GUI)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("backup", help="Export the central tables to CSV")
+    p.add_argument("--output", default="backup.csv", help="File to write (default backup.csv)")
+    p.set_defaults(func=cmd_backup)
+
+    p = commands.add_parser("restore", help="Load a backup file into a fresh database")
+    p.add_argument("path", nargs="?", default="backup.csv")
+    p.set_defaults(func=cmd_restore)
+
+    p = commands.add_parser("import-items", help="Add items from a CSV file (name,category,unit,quantity,reorder_level)")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_import_items)
+
+    p = commands.add_parser("approve", help="Approve pending requests or returns")
+    p.add_argument("requests", nargs="*", type=int, metavar="REQUEST_NO")
+    p.add_argument("--all-pending", action="store_true", help="Approve every pending request")
+    p.add_argument("--manager", type=int, required=True, help="User id of the approving manager")
+    p.set_defaults(func=cmd_approve)
+
+    p = commands.add_parser("reject", help="Reject requests")
+    p.add_argument("requests", nargs="+", type=int, metavar="REQUEST_NO")
+    p.add_argument("--reason", required=True)
+    p.add_argument("--manager", type=int, required=True, help="User id of the rejecting manager")
+    p.set_defaults(func=cmd_reject)
+
+    p = commands.add_parser("report", help="Export a report as CSV")
+    p.add_argument("report", choices=REPORTS)
+    p.add_argument("--output", help="File to write (default stdout)")
+    p.add_argument("--as-of", type=_timestamp, metavar="DATE",
+                   help="custody / balances: as they stood at DATE, from the stock ledger")
+    p.add_argument("--college", type=int, help="balances / movements: college id (default: central warehouse)")
+    p.add_argument("--item", type=int, help="balances: only this item; movements: the item (required)")
+    p.add_argument("--since", type=_start_timestamp, metavar="DATE", help="movements: from DATE")
+    p.add_argument("--until", type=_timestamp, metavar="DATE", help="movements: up to DATE")
+    p.set_defaults(func=cmd_report)
+
+    p = commands.add_parser("health", help="Check the database connection(s) and migrations")
+    p.set_defaults(func=cmd_health)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "approve" and not (args.requests or args.all_pending):
+        parser.error("approve: give request numbers or --all-pending")
+    if args.command == "report":
+        if args.as_of and args.report not in ("custody", "balances"):
+            parser.error("report: --as-of only applies to custody and balances")
+        if args.report == "movements" and args.item is None:
+            parser.error("report movements: --item is required")
+    try:
+        return args.func(args)
+    finally:
+        if "config.db_config" in sys.modules:
+            sys.modules["config.db_config"].close_all_connections()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
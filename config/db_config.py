@@ -1,27 +1,314 @@
+import contextlib
+import contextvars
 import os
+import queue
+import threading
+import time
 import psycopg2
+import psycopg2.extensions
 from dotenv import load_dotenv
+from monitoring import metrics, tracing
 
 load_dotenv()  # here we load the DB URL variable
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Optional read replica. Read-only service calls (lists, dashboard, backup) go there,
+# except for DB_READ_PIN_SECONDS after this app committed a write, so users always see their own changes.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+DB_READ_PIN_SECONDS = float(os.getenv("DB_READ_PIN_SECONDS", "10"))
 
-def get_db_connection():
+# Idle connections kept open for reuse. Several are needed at once when a window
+# loads its tables concurrently (see gui/async_loader.py).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+
+# Idle connections older than this are closed instead of reused (server may have dropped them)
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "300"))
+
+# Statement timeout applied to background list/dashboard loads (see gui/async_loader.py)
+DB_LOAD_TIMEOUT_MS = int(os.getenv("DB_LOAD_TIMEOUT_MS", "30000"))
+
+_idle_connections = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+_idle_read_connections = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+_last_write_at = None  # time.monotonic() of the last commit on the primary
+
+# (CancelToken or None, statement timeout in ms or None) for the code running in this context
+_query_scope = contextvars.ContextVar("query_scope", default=(None, None))
+
+
+class CancelToken:
+    """
+    Cooperative cancellation for the queries run inside a query_scope(token=...).
+    cancel() may be called from any thread: statements already running on the token's
+    connections are cancelled server-side, and no new connection is handed out.
+    `failed` is set when a connection could not be opened or a statement failed (error, timeout,
+    cancel) on one of its connections: services catch those errors and return a fallback such as [],
+    so this is how the caller tells that result apart from a real one.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self.failed = False
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            for raw_conn in self._connections:
+                try:
+                    raw_conn.cancel()
+                except psycopg2.Error:
+                    pass
+
+    def _attach(self, raw_conn):
+        with self._lock:
+            if self.cancelled: return False
+            self._connections.add(raw_conn)
+            return True
+
+    def _detach(self, raw_conn):
+        # Under the lock, so cancel() never hits a connection already handed to someone else
+        with self._lock:
+            self._connections.discard(raw_conn)
+
+
+@contextlib.contextmanager
+def query_scope(token=None, timeout_ms=None):
+    """
+    Applies a CancelToken and/or a statement timeout to every connection taken with
+    get_db_connection() inside the block, e.g.
+
+        with query_scope(timeout_ms=5000):
+            rows = StockManager.get_all_college_custody()
+
+    A cancelled or timed-out statement raises psycopg2.extensions.QueryCanceledError in the
+    service, which handles it like any other DB error. The timeout lasts until the connection's
+    first commit or rollback. Unset arguments are inherited from an outer scope.
+    """
+    outer_token, outer_timeout = _query_scope.get()
+    reset = _query_scope.set((token or outer_token, timeout_ms or outer_timeout))
+    try:
+        yield
+    finally:
+        _query_scope.reset(reset)
+
+
+# Transaction states a connection is left in after a failed statement (or a broken connection)
+_FAILED_TRANSACTION_STATUSES = (psycopg2.extensions.TRANSACTION_STATUS_INERROR,
+                                psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN)
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a psycopg2 connection taken from the pool.
+    Everything is forwarded to the real connection, except close(), which hands the
+    connection back to the pool so callers keep the usual `finally: conn.close()` pattern,
+    and commit(), which also starts the read-your-writes window on the primary.
+    """
+
+    def __init__(self, raw_conn, token=None, replica=False):
+        self._raw = raw_conn
+        self._released = False
+        self._token = token
+        self._replica = replica
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def commit(self):
+        with tracing.span("db.commit", replica=self._replica):
+            self._raw.commit()
+        if not self._replica:
+            global _last_write_at
+            _last_write_at = time.monotonic()
+
+    def close(self):
+        if self._released: return
+        self._released = True
+        if self._token:
+            if self._raw.get_transaction_status() in _FAILED_TRANSACTION_STATUSES:
+                self._token.failed = True  # The service caught a statement error on this connection
+            self._token._detach(self._raw)
+        _release_connection(self._raw, self._replica)
+
+
+class _InstrumentedCursorMixin:
+    """
+    Records every statement as an sql.* tracing span and in the SQL latency/error metrics
+    (mixed into the cursor class the caller asked for).
+    """
+
+    def execute(self, query, vars=None):
+        return _run_statement("sql.execute", super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return _run_statement("sql.executemany", super().executemany, query, vars_list)
+
+
+_instrumented_cursor_classes = {}  # cursor class -> its instrumented subclass
+
+
+class _InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection used while tracing or metrics are on: its cursors record their statements."""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.pop('cursor_factory', None) or self.cursor_factory or psycopg2.extensions.cursor
+        instrumented = _instrumented_cursor_classes.get(factory)
+        if instrumented is None:
+            instrumented = _instrumented_cursor_classes[factory] = type(
+                f"Instrumented{factory.__name__}", (_InstrumentedCursorMixin, factory), {})
+        return super().cursor(*args, cursor_factory=instrumented, **kwargs)
+
+
+def _run_statement(kind, execute, query, params):
+    span = tracing.span(kind, statement=_statement_label(query)) if tracing.enabled() else tracing.span(kind)
+    start = time.perf_counter()
+    try:
+        with span:
+            return execute(query, params)
+    except psycopg2.Error as e:
+        metrics.STATEMENT_ERRORS.inc(metrics.service_method(), type(e).__name__)
+        raise
+    finally:
+        if metrics.enabled():
+            metrics.STATEMENT_SECONDS.observe(time.perf_counter() - start, metrics.service_method(),
+                                              _statement_label(query).split(" ", 1)[0].upper())
+
+
+def _statement_label(query):
+    if isinstance(query, bytes): query = query.decode("utf-8", "replace")
+    return " ".join(str(query).split())[:160]
+
+
+def _acquire_connection(replica=False):
+    """Returns an idle pooled connection, or opens a new one if none is usable."""
+    idle = _idle_read_connections if replica else _idle_connections
+    while True:
+        try:
+            raw_conn, released_at = idle.get_nowait()
+        except queue.Empty:
+            return _connect(replica)
+
+        if raw_conn.closed or time.monotonic() - released_at > DB_POOL_RECYCLE_SECONDS:
+            raw_conn.close()
+            continue
+        return raw_conn
+
+
+def _connect(replica=False):
+    factory = _InstrumentedConnection if tracing.enabled() or metrics.enabled() else None
+    metrics.CONNECTIONS_OPENED.inc(_pool_label(replica))
+    if not replica:
+        return psycopg2.connect(DATABASE_URL, connection_factory=factory)
+    raw_conn = psycopg2.connect(DATABASE_READ_URL, connection_factory=factory)
+    raw_conn.set_session(readonly=True)  # A write sent here by mistake fails instead of being lost
+    return raw_conn
+
+
+def _release_connection(raw_conn, replica=False):
+    if raw_conn.closed: return
+    try:
+        raw_conn.rollback()  # Discard anything the caller did not commit
+        (_idle_read_connections if replica else _idle_connections).put_nowait((raw_conn, time.monotonic()))
+    except (psycopg2.Error, queue.Full):
+        raw_conn.close()
+
+
+def _pool_label(replica):
+    return "replica" if replica else "primary"
+
+
+def _use_replica(read_only):
+    if not (read_only and DATABASE_READ_URL):
+        return False
+    # Read-your-writes: right after a commit the replica may not have the change yet
+    return _last_write_at is None or time.monotonic() - _last_write_at > DB_READ_PIN_SECONDS
+
+
+def get_db_connection(read_only=False):
+    """
+    Returns a pooled connection, or None if the database is unreachable.
+    Pass read_only=True for calls that never write: they are routed to DATABASE_READ_URL when configured.
+    """
     if not DATABASE_URL:
         # This will happen if the .env file is missing or doesn't have the variable
         raise EnvironmentError("DATABASE_URL not found. Please check your local .env ")
 
-    conn = None
+    token, timeout_ms = _query_scope.get()
+    if token and token.cancelled:
+        return None  # The load this query belongs to was abandoned
+
+    replica = _use_replica(read_only)
+    raw_conn = None
     try:
-        # Connect using the DATABASE_URL string
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
+        # Reuse an idle connection when possible, otherwise connect using the DATABASE_URL string
+        started = time.perf_counter()
+        with tracing.span("db.acquire") as span:
+            try:
+                raw_conn = _acquire_connection(replica)
+            except psycopg2.Error as e:
+                if not replica: raise
+                metrics.CONNECTION_FAILURES.inc("replica")
+                print(f"WARNING: Read replica unavailable, reading from the primary. Details: {e}")
+                replica = False
+                raw_conn = _acquire_connection()
+            span.set(replica=replica)
+        metrics.CONNECTION_ACQUIRE.observe(time.perf_counter() - started, _pool_label(replica))
+        if timeout_ms is not None:
+            # SET LOCAL: opens the caller's transaction and ends with it, so the pool needs no reset
+            with raw_conn.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+        if token and not token._attach(raw_conn):
+            _release_connection(raw_conn, replica)
+            return None
+        return PooledConnection(raw_conn, token, replica)
     except psycopg2.Error as e:
+        if raw_conn is not None: raw_conn.close()
+        if token: token.failed = True
+        metrics.CONNECTION_FAILURES.inc(_pool_label(replica))
         print(f"ERROR: Could not connect to the database, Details: {e}")
         return None
 
 
+def warm_up_pool(count=None):
+    """
+    Opens up to `count` connections (default: the pool size) ahead of time and parks them in the pool,
+    so the first queries after login do not pay for connection setup. Safe to run on a background thread.
+    Returns the number of connections opened.
+    """
+    if not DATABASE_URL: return 0
+    count = DB_POOL_SIZE if count is None else min(count, DB_POOL_SIZE)
+    opened = 0
+    for replica, idle in ((False, _idle_connections), (True, _idle_read_connections)):
+        if replica and not DATABASE_READ_URL: continue
+        while idle.qsize() < count:
+            try:
+                raw_conn = _connect(replica)
+            except psycopg2.Error as e:
+                print(f"ERROR: Could not warm up the connection pool, Details: {e}")
+                break
+            _release_connection(raw_conn, replica)
+            opened += 1
+    return opened
+
+
+def close_all_connections():
+    """Closes every idle pooled connection (used on application exit)."""
+    for idle in (_idle_connections, _idle_read_connections):
+        while True:
+            try:
+                raw_conn, _ = idle.get_nowait()
+            except queue.Empty:
+                break
+            raw_conn.close()
+
+
+metrics.Gauge("ksu_db_pool_idle_connections", "Idle connections parked in each pool",
+              lambda: {("primary",): _idle_connections.qsize(), ("replica",): _idle_read_connections.qsize()},
+              ("pool",))
+
+
 #  test function
 if __name__ == '__main__':
     conn = get_db_connection()
@@ -29,4 +316,4 @@ if __name__ == '__main__':
         print(" Database connection successful!")
         conn.close()
     else:
-        print(" Database connection failed!")
\ No newline at end of file
+        print(" Database connection failed!")
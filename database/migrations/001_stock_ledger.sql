@@ -0,0 +1,52 @@
+-- =========================================================
+-- 001: Append-only stock movement ledger + balance snapshots
+-- =========================================================
+-- Every change to items.quantity_central or inventory_stock.quantity is also
+-- written here, in the same transaction, by StockManager.adjust_central_stock
+-- and RequestManager.adjust_college_custody.
+-- Deleting an item deletes its movements (ON DELETE CASCADE, as for stock_alerts in 006):
+-- the ledger only describes items that still exist.
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    movement_id     BIGSERIAL PRIMARY KEY,
+    item_id         INTEGER      NOT NULL REFERENCES items (item_id) ON DELETE CASCADE,
+    college_id      INTEGER,                 -- NULL = central warehouse
+    quantity_change INTEGER      NOT NULL,
+    reason          VARCHAR(100) NOT NULL,
+    request_no      INTEGER,                 -- request that caused the movement (if any)
+    created_at      TIMESTAMP    NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_location
+    ON stock_movements (college_id, item_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_request
+    ON stock_movements (request_no) WHERE request_no IS NOT NULL;
+
+-- A snapshot stores every balance at a point in the ledger (last_movement_id),
+-- so as-of queries only replay the movements written after it.
+CREATE TABLE IF NOT EXISTS stock_snapshots (
+    snapshot_id      SERIAL PRIMARY KEY,
+    taken_at         TIMESTAMP NOT NULL DEFAULT now(),
+    last_movement_id BIGINT    NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_snapshots_taken_at ON stock_snapshots (taken_at);
+
+CREATE TABLE IF NOT EXISTS stock_snapshot_balances (
+    snapshot_id INTEGER NOT NULL REFERENCES stock_snapshots (snapshot_id) ON DELETE CASCADE,
+    item_id     INTEGER NOT NULL,
+    college_id  INTEGER,                     -- NULL = central warehouse
+    quantity    INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_snapshot_balances_location
+    ON stock_snapshot_balances (snapshot_id, college_id, item_id);
+
+-- Opening balances: the ledger starts from the stock on hand when it is installed
+WITH opening AS (
+    INSERT INTO stock_snapshots (last_movement_id) VALUES (0) RETURNING snapshot_id
+)
+INSERT INTO stock_snapshot_balances (snapshot_id, item_id, college_id, quantity)
+SELECT opening.snapshot_id, i.item_id, NULL, i.quantity_central FROM opening, items i
+UNION ALL
+SELECT opening.snapshot_id, s.item_id, s.college_id, s.quantity FROM opening, inventory_stock s;
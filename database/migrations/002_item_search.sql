@@ -0,0 +1,20 @@
+-- =========================================================
+-- 002: Indexes for the Item Master search / filter / sort API
+-- =========================================================
+-- Used by StockManager.search_items.
+
+-- Substring (ILIKE '%term%') and fuzzy (name % term) search on item names
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_items_name_trgm ON items USING gin (name gin_trgm_ops);
+
+-- Keyset paging: one (sort key, item_id) index per sortable column.
+-- category and unit may be NULL and are sorted as COALESCE(col, ''), so those indexes are on the expression.
+CREATE INDEX IF NOT EXISTS idx_items_name_id ON items (name, item_id);
+CREATE INDEX IF NOT EXISTS idx_items_category_id ON items ((COALESCE(category, '')), item_id);
+CREATE INDEX IF NOT EXISTS idx_items_unit_id ON items ((COALESCE(unit, '')), item_id);
+CREATE INDEX IF NOT EXISTS idx_items_reorder_level_id ON items (reorder_level, item_id);
+CREATE INDEX IF NOT EXISTS idx_items_quantity_id ON items (quantity_central, item_id);
+
+-- "Below reorder level" filter only touches the (few) items that need restocking
+CREATE INDEX IF NOT EXISTS idx_items_below_reorder ON items (item_id)
+    WHERE quantity_central <= reorder_level;
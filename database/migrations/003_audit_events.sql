@@ -0,0 +1,21 @@
+-- =========================================================
+-- 003: Central audit trail
+-- =========================================================
+-- Filled in batches by services/audit_trail.py from the same call sites that
+-- write transactions.log, so the history no longer lives only on one desktop.
+
+CREATE TABLE IF NOT EXISTS audit_events (
+    event_id   BIGSERIAL PRIMARY KEY,
+    created_at TIMESTAMP    NOT NULL,
+    actor_id   INTEGER,
+    action     VARCHAR(100) NOT NULL,
+    item_id    INTEGER,
+    request_no INTEGER,
+    quantity   INTEGER      NOT NULL DEFAULT 0,
+    host       VARCHAR(100)              -- machine that performed the action
+);
+
+CREATE INDEX IF NOT EXISTS idx_audit_events_actor ON audit_events (actor_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_audit_events_request ON audit_events (request_no, created_at)
+    WHERE request_no IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_audit_events_created_at ON audit_events (created_at);
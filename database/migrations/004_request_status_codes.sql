@@ -0,0 +1,36 @@
+-- =========================================================
+-- 004: Store request status as a SMALLINT code
+-- =========================================================
+-- Codes and allowed transitions are defined in models/request_status.py.
+-- The text labels are no longer stored; the application maps codes to labels.
+
+BEGIN;
+
+ALTER TABLE requests ADD COLUMN IF NOT EXISTS status_code SMALLINT;
+
+UPDATE requests SET status_code = CASE status
+    WHEN 'Pending'                              THEN 0
+    WHEN 'Approved - Ready for Pickup'          THEN 1
+    WHEN 'Picked Up by Courier'                 THEN 2
+    WHEN 'Delivered to College'                 THEN 3
+    WHEN 'Approved - Ready for Pickup (Return)' THEN 4
+    WHEN 'In Transit to Inventory'              THEN 5
+    WHEN 'Received at Inventory'                THEN 6
+    WHEN 'Rejected'                             THEN 7
+END;
+
+ALTER TABLE requests
+    ALTER COLUMN status_code SET NOT NULL,
+    ALTER COLUMN status_code SET DEFAULT 0,
+    ADD CONSTRAINT requests_status_code_check CHECK (status_code BETWEEN 0 AND 7);
+
+ALTER TABLE requests DROP COLUMN status;  -- also drops any index built on it
+
+-- Small partial indexes for the work queues (only open requests are indexed)
+CREATE INDEX IF NOT EXISTS idx_requests_pending ON requests (request_no)
+    WHERE status_code = 0;
+CREATE INDEX IF NOT EXISTS idx_requests_courier_queue ON requests (status_code, request_no)
+    WHERE status_code IN (1, 2, 4, 5);
+CREATE INDEX IF NOT EXISTS idx_requests_college_history ON requests (college_id, request_type, request_date DESC);
+
+COMMIT;
@@ -0,0 +1,49 @@
+-- =========================================================
+-- 005: Per-college change counter
+-- =========================================================
+-- Every write to a college's requests or custody bumps its version, so the
+-- College window (services/college_cache.py) only re-runs its list queries
+-- when something actually changed. Triggers keep it correct for every writer
+-- (college users, manager, couriers, scripts).
+
+CREATE TABLE IF NOT EXISTS college_versions (
+    college_id INTEGER PRIMARY KEY,
+    version    BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_college_version() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO college_versions (college_id, version) VALUES (OLD.college_id, 1)
+        ON CONFLICT (college_id) DO UPDATE SET version = college_versions.version + 1;
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.college_id IS DISTINCT FROM OLD.college_id) THEN
+        INSERT INTO college_versions (college_id, version) VALUES (NEW.college_id, 1)
+        ON CONFLICT (college_id) DO UPDATE SET version = college_versions.version + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_requests_college_version ON requests;
+CREATE TRIGGER trg_requests_college_version
+    AFTER INSERT OR UPDATE OR DELETE ON requests
+    FOR EACH ROW EXECUTE FUNCTION bump_college_version();
+
+DROP TRIGGER IF EXISTS trg_inventory_stock_college_version ON inventory_stock;
+CREATE TRIGGER trg_inventory_stock_college_version
+    AFTER INSERT OR UPDATE OR DELETE ON inventory_stock
+    FOR EACH ROW EXECUTE FUNCTION bump_college_version();
+
+-- Item names / units are shown in every college list: renaming one invalidates all colleges
+CREATE OR REPLACE FUNCTION bump_all_college_versions() RETURNS trigger AS $$
+BEGIN
+    UPDATE college_versions SET version = version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_items_college_version ON items;
+CREATE TRIGGER trg_items_college_version
+    AFTER UPDATE OF name, unit ON items
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_all_college_versions();
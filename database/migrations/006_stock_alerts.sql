@@ -0,0 +1,29 @@
+-- =========================================================
+-- 006: Low-stock alert state and crossing events
+-- =========================================================
+-- stock_alerts holds one row per item currently at or below its reorder level.
+-- It is maintained by services/stock_alerts.py in the same transaction as every
+-- change to an item's central quantity or reorder level, so the dashboard reads
+-- this small table instead of scanning items.
+
+CREATE TABLE IF NOT EXISTS stock_alerts (
+    item_id          INTEGER PRIMARY KEY REFERENCES items (item_id) ON DELETE CASCADE,
+    quantity_central INTEGER   NOT NULL,
+    reorder_level    INTEGER   NOT NULL,
+    since            TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- One row each time an item crosses its reorder level ('crossed') or is restocked above it ('recovered')
+CREATE TABLE IF NOT EXISTS stock_alert_events (
+    event_id      BIGSERIAL PRIMARY KEY,
+    created_at    TIMESTAMP   NOT NULL DEFAULT now(),
+    item_id       INTEGER     NOT NULL REFERENCES items (item_id) ON DELETE CASCADE,
+    kind          VARCHAR(10) NOT NULL CHECK (kind IN ('crossed', 'recovered')),
+    quantity      INTEGER     NOT NULL,
+    reorder_level INTEGER     NOT NULL
+);
+
+-- Start from the current state
+INSERT INTO stock_alerts (item_id, quantity_central, reorder_level)
+SELECT item_id, quantity_central, reorder_level FROM items WHERE quantity_central <= reorder_level
+ON CONFLICT (item_id) DO NOTHING;
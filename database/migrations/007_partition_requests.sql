@@ -0,0 +1,108 @@
+-- =========================================================
+-- 007: Partition requests into hot and archived rows
+-- =========================================================
+-- requests becomes a table partitioned on a new `archived` flag:
+--   requests_hot      open requests, and closed ones still inside the retention window
+--   requests_archive  closed requests moved there by services/request_archive.py,
+--                     itself range-partitioned by request_date (one partition per year,
+--                     created by the archival job)
+-- Work queues and college lists filter on NOT archived, so they only touch requests_hot;
+-- date-bounded history queries only touch the archive years they cover.
+-- A plain range partitioning on request_date would let an old request that is still open
+-- fall out of the "recent" partitions, so the hot/archive split is made on the flag instead.
+-- The primary key becomes (request_no, archived): request_no is no longer unique on its own
+-- as far as the schema goes, only through its sequence. For the same reason no foreign key
+-- can point at requests (request_no) any more: the migration stops if one does.
+-- Foreign keys from requests to other tables are carried over as they were.
+-- Requires PostgreSQL 13 or later.
+
+BEGIN;
+
+DO $$
+DECLARE
+    incoming TEXT;
+BEGIN
+    SELECT string_agg(format('%s.%s', conrelid::regclass, conname), ', ') INTO incoming
+    FROM pg_constraint
+    WHERE contype = 'f' AND confrelid = 'requests'::regclass AND conrelid <> 'requests'::regclass;
+    IF incoming IS NOT NULL THEN
+        RAISE EXCEPTION 'Foreign keys reference requests (request_no): %. Drop them before running 007.', incoming;
+    END IF;
+END $$;
+
+-- Outgoing foreign keys, recreated on the partitioned table below
+CREATE TEMP TABLE requests_foreign_keys ON COMMIT DROP AS
+SELECT conname, pg_get_constraintdef(oid) AS definition
+FROM pg_constraint
+WHERE contype = 'f' AND conrelid = 'requests'::regclass;
+
+ALTER TABLE requests RENAME TO requests_unpartitioned;
+
+-- Keep the request_no sequence when the old table is dropped
+DO $$
+DECLARE
+    seq TEXT := pg_get_serial_sequence('requests_unpartitioned', 'request_no');
+BEGIN
+    IF seq IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY NONE', seq);
+    END IF;
+END $$;
+
+CREATE TABLE requests (
+    LIKE requests_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    archived BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (request_no, archived)
+) PARTITION BY LIST (archived);
+
+CREATE TABLE requests_hot PARTITION OF requests FOR VALUES IN (FALSE);
+CREATE TABLE requests_archive PARTITION OF requests FOR VALUES IN (TRUE) PARTITION BY RANGE (request_date);
+-- Only for requests without a date: NULL never matches a range partition. Dated rows always get a
+-- year partition first (RequestArchive._ensure_year_partition), and the CHECK lets PostgreSQL
+-- add those partitions without scanning this one.
+CREATE TABLE requests_archive_undated PARTITION OF requests_archive DEFAULT;
+ALTER TABLE requests_archive_undated ADD CONSTRAINT requests_archive_undated_no_date CHECK (request_date IS NULL);
+
+INSERT INTO requests SELECT *, FALSE FROM requests_unpartitioned;
+
+-- The copied column default still calls the same sequence: hand it to the new column
+DO $$
+DECLARE
+    seq TEXT;
+BEGIN
+    SELECT substring(pg_get_expr(d.adbin, d.adrelid) FROM 'nextval\(''([^'']+)''') INTO seq
+    FROM pg_attrdef d
+    JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum
+    WHERE d.adrelid = 'requests'::regclass AND a.attname = 'request_no';
+    IF seq IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY requests.request_no', seq);
+    END IF;
+END $$;
+
+DROP TABLE requests_unpartitioned;  -- also drops its indexes and triggers, recreated below
+
+DO $$
+DECLARE
+    fk RECORD;
+BEGIN
+    FOR fk IN SELECT conname, definition FROM requests_foreign_keys LOOP
+        EXECUTE format('ALTER TABLE requests ADD CONSTRAINT %I %s', fk.conname, fk.definition);
+    END LOOP;
+END $$;
+
+-- Indexes from 004 (the partial ones only ever match rows in requests_hot)
+CREATE INDEX IF NOT EXISTS idx_requests_pending ON requests (request_no)
+    WHERE status_code = 0;
+CREATE INDEX IF NOT EXISTS idx_requests_courier_queue ON requests (status_code, request_no)
+    WHERE status_code IN (1, 2, 4, 5);
+CREATE INDEX IF NOT EXISTS idx_requests_college_history ON requests (college_id, request_type, request_date DESC);
+
+-- Archival candidates: closed requests by age
+CREATE INDEX IF NOT EXISTS idx_requests_hot_closed ON requests_hot (request_date)
+    WHERE status_code IN (3, 6, 7);
+
+-- Trigger from 005 (moving a row to the archive bumps its college's version as well)
+CREATE TRIGGER trg_requests_college_version
+    AFTER INSERT OR UPDATE OR DELETE ON requests
+    FOR EACH ROW EXECUTE FUNCTION bump_college_version();
+
+COMMIT;
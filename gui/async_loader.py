@@ -0,0 +1,129 @@
+import contextvars
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from config.db_config import DB_POOL_SIZE, DB_LOAD_TIMEOUT_MS, CancelToken, query_scope
+from services.snapshot_store import SnapshotStore
+from monitoring import tracing
+
+# Shared worker threads for service reads. One worker per pooled connection,
+# so a fan-out never opens more connections than the pool keeps.
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="ksu-loader")
+
+
+class FanOutLoader:
+    """
+    Runs independent service reads concurrently and renders each result as soon as it arrives.
+
+    Fetch functions run on worker threads (each service call takes its own pooled connection).
+    Render functions always run on the Tk main loop, because Tk widgets are not thread safe.
+    Total latency of a load is therefore close to the slowest single query, not the sum of all.
+
+    Every load runs under its own CancelToken and a DB_LOAD_TIMEOUT_MS statement timeout. A load that
+    is superseded, or dropped with cancel() / reset(), is cancelled on the server and frees its connection.
+    """
+    POLL_MS = 20
+
+    def __init__(self, widget):
+        self.widget = widget
+        self._results = queue.Queue()
+        self._generations = {}  # panel key -> id of the latest load for that panel
+        self._tokens = {}  # panel key -> CancelToken of its load still in flight
+        self._fresh = set()  # panel keys that already show database results
+        self._in_flight = 0
+        self._polling = False
+
+    def load(self, tasks, snapshots=None):
+        """
+        Starts loading several panels at once.
+
+        Args:
+            tasks (dict): panel key -> (fetch_func, render_func).
+                fetch_func() returns the rows, render_func(rows) puts them on screen.
+            snapshots (dict): optional panel key -> SnapshotStore key. A panel that has not shown
+                database results yet is painted from its snapshot right away; the fresh result
+                then replaces it and is saved as the new snapshot.
+
+        A newer load of the same panel key supersedes an older one: the older query is cancelled
+        and late results are dropped.
+        """
+        snapshots = snapshots or {}
+        for key, (fetch_func, render_func) in tasks.items():
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            if key in self._tokens: self._tokens[key].cancel()
+            token = self._tokens[key] = CancelToken()
+            snapshot_key = snapshots.get(key)
+            if snapshot_key and key not in self._fresh:
+                cached = SnapshotStore.get(snapshot_key)
+                if cached is not None:
+                    render_func(cached)
+            self._in_flight += 1
+            # In a copy of the caller's context, so the fetch continues the caller's trace
+            _executor.submit(contextvars.copy_context().run, self._run_fetch, key, generation, token,
+                             fetch_func, render_func, snapshot_key)
+
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.POLL_MS, self._drain)
+
+    def cancel(self, keys=None):
+        """
+        Cancels the loads still in flight for `keys` (default: all panels); their results are dropped.
+        Returns the keys that were actually cancelled, so the caller can reload them later.
+        """
+        cancelled = [key for key in self._tokens if keys is None or key in keys]
+        for key in cancelled:
+            self._tokens.pop(key).cancel()
+            self._generations[key] += 1
+        return cancelled
+
+    def reset(self):
+        """
+        Forgets what the panels show (e.g. on logout): loads in flight are cancelled,
+        and the next load of each panel paints from its snapshot again.
+        """
+        self.cancel()
+        self._fresh.clear()
+
+    def _run_fetch(self, key, generation, token, fetch_func, render_func, snapshot_key=None):
+        # Worker thread: never touch widgets here
+        try:
+            if token.cancelled:
+                result = None  # Dropped before it started
+            else:
+                with query_scope(token=token, timeout_ms=DB_LOAD_TIMEOUT_MS), tracing.span(f"load.{key}"):
+                    result = fetch_func()
+            if token.failed and not token.cancelled:
+                # The service caught a DB error or timeout and returned a fallback (usually []):
+                # keep the rows on screen and the last snapshot instead
+                self._results.put((key, generation, render_func, None,
+                                   RuntimeError("query failed or timed out, keeping the last result")))
+                return
+            # A cancelled fetch usually returns an empty result: never save that as the snapshot
+            if snapshot_key and not token.cancelled: SnapshotStore.put(snapshot_key, result)
+            self._results.put((key, generation, render_func, result, None))
+        except Exception as e:
+            self._results.put((key, generation, render_func, None, e))
+
+    def _drain(self):
+        # Tk main loop: render every result that has arrived since the last poll
+        while True:
+            try:
+                key, generation, render_func, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight -= 1
+
+            if generation != self._generations.get(key):
+                continue  # Superseded by a newer load of the same panel, or cancelled
+            self._tokens.pop(key, None)
+            if error is not None:
+                print(f"Error loading '{key}': {error}")
+                continue
+            self._fresh.add(key)
+            render_func(result)
+
+        if self._in_flight > 0:
+            self.widget.after(self.POLL_MS, self._drain)
+        else:
+            self._polling = False
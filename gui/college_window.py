@@ -1,10 +1,17 @@
 import customtkinter as ctk
+import tkinter as tk
 import tkinter.ttk as ttk  # Required for the Table (Treeview)
 from CTkMessagebox import CTkMessagebox
 
 from services.request_manager import RequestManager
 from models.inventory_item import InventoryItem
 from models.college import College
+from models.catalog_search import CatalogSearchIndex
+from models.rows import index_by_id
+from services.college_cache import CollegeCache
+from gui.async_loader import FanOutLoader
+from gui.table_loader import TableLoader
+from monitoring.instrument import ui_action
 
 
 class CollegeWindow(ctk.CTkFrame):
@@ -14,6 +21,10 @@ class CollegeWindow(ctk.CTkFrame):
         # Initialize user_id to be set by the main controller after login
         self.user_id = None
 
+        # Catalog and lists load on worker threads, painted first from the last saved snapshot
+        self.loader = FanOutLoader(self)
+        self.tables = TableLoader(self)  # Long request histories are inserted in slices
+
         # --- Configure Grid for Layout ---
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
@@ -46,6 +57,13 @@ class CollegeWindow(ctk.CTkFrame):
         self.setup_my_returns_tab()
 
     def logout(self):
+        # Do not leave this college's lists on screen (or in flight) for the next user
+        self.loader.reset()
+        self.tables.abort()
+        self.include_archived_var.set(False)
+        self._render_lists({'custody': [], 'requests': [], 'returns': []})
+        self.cart = []
+        self._render_cart()
         self.controller.show_frame("SignUpWindow")
 
     # =========================================================================
@@ -59,18 +77,29 @@ class CollegeWindow(ctk.CTkFrame):
         ctk.CTkLabel(tab, text="Initiate New Item Request", font=("Arial", 16)).grid(row=0, column=0, columnspan=2,
                                                                                      pady=(10, 20))
 
-        # Item Catalog Dropdown
-        ctk.CTkLabel(tab, text="Select Item:").grid(row=1, column=0, padx=10, pady=5, sticky='w')
+        # Item Catalog Search (type-ahead over an in-memory index of the catalog)
+        ctk.CTkLabel(tab, text="Select Item:").grid(row=1, column=0, padx=10, pady=5, sticky='nw')
 
-        try:
-            self.catalog_items = InventoryItem.get_catalog()
-            # Use dot notation because get_catalog returns objects
-            item_names = [f"{item.id} - {item.name} ({item.unit})" for item in self.catalog_items]
-        except Exception:
-            item_names = ["No Items Available"]
+        self.catalog_items = []
+        self.catalog_index = CatalogSearchIndex(self.catalog_items)
+        self.selected_item = None  # The InventoryItem picked from the results
+        self.search_results = []
+
+        f_search = ctk.CTkFrame(tab, fg_color="transparent")
+        f_search.grid(row=1, column=1, padx=10, pady=5, sticky='ew')
+        f_search.grid_columnconfigure(0, weight=1)
+
+        self.entry_item_search = ctk.CTkEntry(f_search, width=300, placeholder_text="Type item name or ID...")
+        self.entry_item_search.grid(row=0, column=0, sticky='ew')
+        self.entry_item_search.bind("<KeyRelease>", self.update_item_results)
 
-        self.combo_items = ctk.CTkComboBox(tab, values=item_names, width=300)
-        self.combo_items.grid(row=1, column=1, padx=10, pady=5, sticky='ew')
+        self.list_item_results = tk.Listbox(f_search, height=6, exportselection=False)
+        self.list_item_results.grid(row=1, column=0, sticky='ew', pady=(2, 0))
+        self.list_item_results.bind("<<ListboxSelect>>", self.select_item_result)
+
+        self.label_selected_item = ctk.CTkLabel(f_search, text="No item selected")
+        self.label_selected_item.grid(row=2, column=0, sticky='w')
+        self.update_item_results()
 
         # Quantity
         ctk.CTkLabel(tab, text="Quantity:").grid(row=2, column=0, padx=10, pady=5, sticky='w')
@@ -82,34 +111,96 @@ class CollegeWindow(ctk.CTkFrame):
         self.entry_purpose = ctk.CTkEntry(tab, width=300)
         self.entry_purpose.grid(row=3, column=1, padx=10, pady=5, sticky='ew')
 
-        # Submit Button
-        btn_submit = ctk.CTkButton(tab, text="Submit Request", command=self.submit_request, fg_color="green")
-        btn_submit.grid(row=4, column=1, pady=30, sticky='e')
-
-    def submit_request(self):
-        selection = self.combo_items.get()
+        # Cart: several lines are collected and submitted together
+        self.cart = []  # [(InventoryItem, quantity, purpose), ...]
+        f_cart_btns = ctk.CTkFrame(tab, fg_color="transparent")
+        f_cart_btns.grid(row=4, column=1, pady=(15, 5), sticky='e')
+        ctk.CTkButton(f_cart_btns, text="Add to Cart", command=self.add_to_cart).pack(side='left', padx=5)
+        ctk.CTkButton(f_cart_btns, text="Remove Selected", command=self.remove_from_cart,
+                      fg_color="#E07A5F").pack(side='left', padx=5)
+        btn_submit = ctk.CTkButton(f_cart_btns, text="Submit Request", command=self.submit_request, fg_color="green")
+        btn_submit.pack(side='left', padx=5)
+
+        tab.grid_rowconfigure(5, weight=1)
+        self.tree_cart = ttk.Treeview(tab, columns=('ID', 'Item', 'Qty', 'Purpose'), show='headings', height=6)
+        for col in ('ID', 'Item', 'Qty', 'Purpose'):
+            self.tree_cart.heading(col, text=col)
+            self.tree_cart.column(col, width=200 if col in ('Item', 'Purpose') else 60)
+        self.tree_cart.grid(row=5, column=0, columnspan=2, sticky='nsew', padx=10, pady=(0, 10))
+
+        self.loader.load({'catalog': (InventoryItem.get_catalog, self._render_catalog)},
+                         snapshots={'catalog': 'catalog'})
+
+    def _render_catalog(self, items):
+        self.catalog_items = items
+        self.catalog_index = CatalogSearchIndex(items)
+        self.update_item_results()
+
+    def update_item_results(self, event=None):
+        """Re-ranks the catalog for the text typed so far."""
+        self.search_results = self.catalog_index.search(self.entry_item_search.get())
+        self.list_item_results.delete(0, 'end')
+        for item in self.search_results:
+            self.list_item_results.insert('end', CatalogSearchIndex.label(item))
+
+    def select_item_result(self, event=None):
+        sel = self.list_item_results.curselection()
+        if not sel: return
+        self.selected_item = self.search_results[sel[0]]
+        self.label_selected_item.configure(text=f"Selected: {CatalogSearchIndex.label(self.selected_item)}")
+
+    def _read_request_line(self):
+        """Validates the form. Returns (item, qty, purpose), or None after showing the error."""
+        item = self.selected_item
         qty_str = self.entry_qty.get()
         purpose = self.entry_purpose.get()
 
-        if not selection or not qty_str or not purpose:
+        if not item or not qty_str or not purpose:
             CTkMessagebox(title="Error", message="All fields are required!", icon="cancel")
-            return
+            return None
 
         try:
             qty = int(qty_str)
             if qty <= 0: raise ValueError
         except ValueError:
             CTkMessagebox(title="Error", message="Quantity must be a positive number.", icon="cancel")
-            return
-
-        try:
-            item_id = int(selection.split(' - ')[0])
-        except ValueError:
-            CTkMessagebox(title="Error", message="Please select a valid item.", icon="cancel")
-            return
+            return None
+        return item, qty, purpose
+
+    def add_to_cart(self):
+        line = self._read_request_line()
+        if not line: return
+        self.cart.append(line)
+        self._render_cart()
+        self.entry_qty.delete(0, 'end')
+
+    def remove_from_cart(self):
+        for iid in sorted(self.tree_cart.selection(), key=int, reverse=True):
+            del self.cart[int(iid)]
+        self._render_cart()
+
+    def _render_cart(self):
+        for i in self.tree_cart.get_children(): self.tree_cart.delete(i)
+        for idx, (item, qty, purpose) in enumerate(self.cart):
+            self.tree_cart.insert('', 'end', iid=str(idx), values=(item.id, item.name, qty, purpose))
+
+    @ui_action("college.submit_request")
+    def submit_request(self):
+        # An empty cart submits the line in the form, as a single request
+        if not self.cart:
+            line = self._read_request_line()
+            if not line: return
+            lines = [line]
+        else:
+            lines = self.cart
 
-        if RequestManager.create_request(self.user_id, item_id, qty, purpose, 'Request'):
-            CTkMessagebox(title="Success", message="Request Submitted Successfully!", icon="check")
+        request_nos = RequestManager.create_requests_bulk(
+            self.user_id, [(item.id, qty, purpose) for item, qty, purpose in lines], 'Request')
+        if request_nos:
+            CTkMessagebox(title="Success", message=f"{len(request_nos)} Request(s) Submitted Successfully!",
+                          icon="check")
+            self.cart = []
+            self._render_cart()
 
             # Auto-Refresh and Switch Tab
             self.load_my_requests()
@@ -141,24 +232,33 @@ class CollegeWindow(ctk.CTkFrame):
 
         self.tree_requests.grid(row=0, column=0, sticky='nsew', padx=10, pady=10)
 
-        # Add Refresh Button
-        ctk.CTkButton(tab, text="Refresh List", command=self.load_my_requests).grid(row=1, column=0, pady=10)
+        # Add Refresh Button, and the opt-in for requests that were archived (closed long ago)
+        f_btns = ctk.CTkFrame(tab, fg_color="transparent")
+        f_btns.grid(row=1, column=0, pady=10)
+        ctk.CTkButton(f_btns, text="Refresh List", command=self.load_my_requests).pack(side='left', padx=5)
+        self.include_archived_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(f_btns, text="Include archived", variable=self.include_archived_var,
+                        command=self.load_my_requests).pack(side='left', padx=5)
 
         # Initial Load
         self.load_my_requests()
 
-    def load_my_requests(self):
-        """Fetches data from DB and populates the table."""
-        for item in self.tree_requests.get_children():
-            self.tree_requests.delete(item)
+    def load_my_requests(self, rows=None):
+        """Shows `rows`, or fetches them on a loader thread (through the per-college cache) and then shows them."""
+        if self.user_id and (rows is None or self.include_archived_var.get()):
+            user_id = self.user_id
+            if self.include_archived_var.get():
+                fetch = lambda: College(user_id).get_my_requests(include_archived=True)  # Full history, not cached
+            else:
+                fetch = lambda: CollegeCache.get(user_id, 'requests')['requests']
+            self.loader.load({'requests': (fetch, self._render_my_requests)})
+            return
+        self._render_my_requests(rows if self.user_id else [])
 
-        if self.user_id:
-            college_model = College(self.user_id)
-            rows = college_model.get_my_requests()
-            for row in rows:
-                # Convert None to "" to avoid display errors
-                safe_row = [str(val) if val is not None else "" for val in row]
-                self.tree_requests.insert('', 'end', values=safe_row)
+    def _render_my_requests(self, rows):
+        # Convert None to "" to avoid display errors
+        self.tables.fill(self.tree_requests, rows,
+                         values=lambda row: [str(val) if val is not None else "" for val in row])
 
     # =========================================================================
     # TAB 3: RETURN ITEM
@@ -194,16 +294,22 @@ class CollegeWindow(ctk.CTkFrame):
         btn_submit = ctk.CTkButton(tab, text="Submit Return Request", command=self.submit_return, fg_color="#E07A5F")
         btn_submit.grid(row=4, column=1, pady=30, sticky='e')
 
-    def load_custody_options(self):
-        """Fetches items currently held by the college to populate the return dropdown."""
+    def load_custody_options(self, rows=None):
+        """Fetches items currently held by the college (on a loader thread) to populate the return dropdown."""
+        if self.user_id and rows is None:
+            user_id = self.user_id
+            self.loader.load({'custody': (lambda: CollegeCache.get(user_id, 'custody')['custody'],
+                                          self.load_custody_options)})
+            return
+        self.custody_by_id = {}
         if self.user_id:
             try:
-                college_model = College(self.user_id)
-                self.custody_items = college_model.get_current_custody()
+                self.custody_items = rows
+                self.custody_by_id = index_by_id(self.custody_items)
 
                 if self.custody_items:
                     self.custody_options = [
-                        f"{item[0]} - {item[1]} (Available: {item[2]} {item[3]})"
+                        f"{item.item_id} - {item.name} (Available: {item.quantity} {item.unit})"
                         for item in self.custody_items
                     ]
                 else:
@@ -236,9 +342,9 @@ class CollegeWindow(ctk.CTkFrame):
 
         try:
             item_id = int(selection.split(' - ')[0])
-            # Find max qty from the stored list
-            max_qty_available = next(item[2] for item in self.custody_items if item[0] == item_id)
-        except (ValueError, StopIteration):
+            # Look up the max qty in the id -> custody row map
+            max_qty_available = self.custody_by_id[item_id].quantity
+        except (ValueError, KeyError):
             CTkMessagebox(title="Error", message="Invalid item selection.", icon="cancel")
             return
 
@@ -286,22 +392,27 @@ class CollegeWindow(ctk.CTkFrame):
         # Initial Load
         self.load_my_returns()
 
-    def load_my_returns(self):
-        """Fetches return data from DB."""
-        for item in self.tree_returns.get_children():
-            self.tree_returns.delete(item)
-
-        if self.user_id:
-            college_model = College(self.user_id)
-            rows = college_model.get_my_returns()
-            for row in rows:
-                safe_row = [str(val) if val is not None else "" for val in row]
-                self.tree_returns.insert('', 'end', values=safe_row)
+    def load_my_returns(self, rows=None):
+        """Shows `rows`, or fetches return data on a loader thread (through the per-college cache)."""
+        if self.user_id and rows is None:
+            user_id = self.user_id
+            self.loader.load({'returns': (lambda: CollegeCache.get(user_id, 'returns')['returns'],
+                                          self.load_my_returns)})
+            return
+        self.tables.fill(self.tree_returns, rows if self.user_id else [],
+                         values=lambda row: [str(val) if val is not None else "" for val in row])
 
     def tkraise(self, aboveThis=None):
         super().tkraise(aboveThis)
-        # When the window is brought to front, reload data if user_id is set
+        # When the window is brought to front, reload data if user_id is set.
+        # The last saved lists are shown at once; the reload is one version check if nothing changed.
         if self.user_id:
-            self.load_custody_options()
-            self.load_my_requests()
-            self.load_my_returns()
\ No newline at end of file
+            user_id = self.user_id
+            self.loader.load({'lists': (lambda: CollegeCache.get(user_id, 'custody', 'requests', 'returns'),
+                                        self._render_lists)},
+                             snapshots={'lists': f"college/{user_id}/lists"})
+
+    def _render_lists(self, data):
+        self.load_custody_options(data['custody'])
+        self.load_my_requests(data['requests'])
+        self.load_my_returns(data['returns'])
\ No newline at end of file
@@ -2,14 +2,28 @@ import customtkinter as ctk
 import tkinter.ttk as ttk
 from CTkMessagebox import CTkMessagebox
 from services.courier_manager import CourierManager
+from services.delivery_scheduler import DeliveryScheduler
+from models.request_status import RequestStatus
+from gui.async_loader import FanOutLoader
+from gui.table_loader import TableLoader
+from monitoring.instrument import ui_action
 
 
 class CourierWindow(ctk.CTkFrame):
+    QUEUE_POLL_MS = 15000  # While the window is open, pick up other users' changes (cheap when none)
+
     def __init__(self, master, controller):
         super().__init__(master)
         self.controller = controller
         self.user_id = None
 
+        # All four tabs are filled from one work-queue query (see CourierManager.get_work_queue)
+        self.loader = FanOutLoader(self)
+        self.tables = TableLoader(self)
+        self.trees = {}  # stage -> Treeview
+        self._shown_queue = None
+        self._poll_job = None
+
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
@@ -30,17 +44,48 @@ class CourierWindow(ctk.CTkFrame):
         self.notebook.add("Deliver to College")
         self.notebook.add("Pick Up Return")
         self.notebook.add("Deliver Return")
+        self.notebook.add("My Runs")
 
         self.setup_pickup_tab()
         self.setup_delivery_tab()
         self.setup_pickup_return_tab()
         self.setup_deliver_return_tab()
+        self.setup_runs_tab()
 
     def logout(self):
+        if self._poll_job: self.after_cancel(self._poll_job)
+        self._poll_job = None
+        self.loader.reset()
+        self.tables.abort()
+        self._render_queue({stage: [] for stage in CourierManager.STAGES})
+        self._render_runs([])
         self.controller.show_frame("SignUpWindow")
 
+    # --- WORK QUEUE ---
+    def refresh_queue(self):
+        if not self.user_id: return
+        courier_id = self.user_id
+        self.loader.load({'queue': (lambda: CourierManager.get_work_queue(courier_id), self._render_queue)},
+                         snapshots={'queue': f"courier/{courier_id}/queue"})
+
+    def _render_queue(self, queue):
+        if queue is self._shown_queue: return  # Cached result: nothing changed
+        self._shown_queue = queue
+        for stage, tree in self.trees.items():
+            self.tables.fill(tree, queue.get(stage, []))
+
+    def _poll_queue(self):
+        self.refresh_queue()
+        self._poll_job = self.after(self.QUEUE_POLL_MS, self._poll_queue)
+
+    def tkraise(self, aboveThis=None):
+        super().tkraise(aboveThis)
+        if self.user_id and self._poll_job is None:
+            self._poll_queue()
+            self.refresh_runs()
+
     # --- HELPER: Generic Table Setup ---
-    def _setup_table_tab(self, tab_name, button_text, load_func, action_func):
+    def _setup_table_tab(self, tab_name, button_text, stage, action_func):
         tab = self.notebook.tab(tab_name)
         tab.grid_columnconfigure(0, weight=1)
         tab.grid_rowconfigure(1, weight=1)
@@ -56,17 +101,13 @@ class CourierWindow(ctk.CTkFrame):
         sb = ttk.Scrollbar(tab, orient="vertical", command=tree.yview)
         sb.grid(row=1, column=1, sticky="ns")
         tree.configure(yscrollcommand=sb.set)
+        self.trees[stage] = tree
 
         btn_frame = ctk.CTkFrame(tab)
         btn_frame.grid(row=2, column=0, pady=10)
 
-        # Load Data Wrapper
-        def refresh():
-            for item in tree.get_children(): tree.delete(item)
-            for row in load_func():
-                tree.insert('', 'end', values=row)
-
         # Action Wrapper
+        @ui_action(f"courier.confirm_{stage.name.lower()}")
         def confirm():
             selected = tree.selection()
             if not selected:
@@ -82,29 +123,90 @@ class CourierWindow(ctk.CTkFrame):
 
             if success:
                 CTkMessagebox(title="Success", message="Action Completed!", icon="check")
-                refresh()
+                self.refresh_queue()
             else:
                 CTkMessagebox(title="Error", message="Failed.", icon="cancel")
 
         ctk.CTkButton(btn_frame, text=button_text, command=confirm, fg_color="green").pack(side='left', padx=10)
-        ctk.CTkButton(btn_frame, text="Refresh", command=refresh).pack(side='left', padx=10)
-
-        # Initial Load
-        refresh()
+        ctk.CTkButton(btn_frame, text="Refresh", command=self.refresh_queue).pack(side='left', padx=10)
 
     # --- TAB SETUP CALLS ---
     def setup_pickup_tab(self):
         self._setup_table_tab("Pick Up Request", "Confirm Pickup",
-                              CourierManager.get_requests_for_pickup, CourierManager.pickup_request)
+                              RequestStatus.APPROVED, CourierManager.pickup_request)
 
     def setup_delivery_tab(self):
         self._setup_table_tab("Deliver to College", "Confirm Delivery",
-                              CourierManager.get_requests_for_delivery, CourierManager.deliver_request)
+                              RequestStatus.PICKED_UP, CourierManager.deliver_request)
 
     def setup_pickup_return_tab(self):
         self._setup_table_tab("Pick Up Return", "Confirm Return Pickup",
-                              CourierManager.get_returns_for_pickup, CourierManager.pickup_return)
+                              RequestStatus.RETURN_APPROVED, CourierManager.pickup_return)
 
     def setup_deliver_return_tab(self):
         self._setup_table_tab("Deliver Return", "Confirm Return Delivery",
-                              CourierManager.get_returns_for_delivery, CourierManager.deliver_return)
\ No newline at end of file
+                              RequestStatus.RETURN_IN_TRANSIT, CourierManager.deliver_return)
+
+    # --- RUNS: open pickups grouped by college and shared out between couriers ---
+    def setup_runs_tab(self):
+        tab = self.notebook.tab("My Runs")
+        tab.grid_columnconfigure(0, weight=1)
+        tab.grid_rowconfigure(0, weight=1)
+        tab.grid_rowconfigure(1, weight=1)
+
+        self.runs_by_iid = {}
+        self.tree_runs = ttk.Treeview(tab, columns=('Run', 'College', 'Load', 'Requests'), show='headings', height=6)
+        for col in ('Run', 'College', 'Load', 'Requests'):
+            self.tree_runs.heading(col, text=col)
+            self.tree_runs.column(col, width=80 if col in ('Run', 'Load') else 200)
+        self.tree_runs.grid(row=0, column=0, sticky="nsew", padx=10, pady=(10, 5))
+        self.tree_runs.bind("<<TreeviewSelect>>", self.show_run_manifest)
+
+        # Manifest of the selected run
+        columns = ('ID', 'College', 'Item', 'Qty', 'Type', 'Notes')
+        self.tree_manifest = ttk.Treeview(tab, columns=columns, show='headings', height=6)
+        for col in columns:
+            self.tree_manifest.heading(col, text=col)
+            self.tree_manifest.column(col, width=100)
+        self.tree_manifest.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
+
+        btn_frame = ctk.CTkFrame(tab)
+        btn_frame.grid(row=2, column=0, pady=10)
+        ctk.CTkButton(btn_frame, text="Confirm Run Pickup", command=self.confirm_run,
+                      fg_color="green").pack(side='left', padx=10)
+        ctk.CTkButton(btn_frame, text="Plan Runs", command=self.refresh_runs).pack(side='left', padx=10)
+
+    def refresh_runs(self):
+        if not self.user_id: return
+        courier_id = self.user_id
+        self.loader.load({'runs': (lambda: DeliveryScheduler.get_runs_for_courier(courier_id), self._render_runs)})
+
+    def _render_runs(self, runs):
+        self.runs_by_iid = {str(idx): run for idx, run in enumerate(runs)}
+        for i in self.tree_runs.get_children(): self.tree_runs.delete(i)
+        for i in self.tree_manifest.get_children(): self.tree_manifest.delete(i)
+        for iid, run in self.runs_by_iid.items():
+            self.tree_runs.insert('', 'end', iid=iid, values=(int(iid) + 1, run.college, run.load, len(run.lines)))
+
+    def show_run_manifest(self, event=None):
+        sel = self.tree_runs.selection()
+        for i in self.tree_manifest.get_children(): self.tree_manifest.delete(i)
+        if not sel: return
+        for line in self.runs_by_iid[sel[0]].lines:
+            self.tree_manifest.insert('', 'end', values=line)
+
+    @ui_action("courier.confirm_run")
+    def confirm_run(self):
+        sel = self.tree_runs.selection()
+        if not sel:
+            CTkMessagebox(title="Error", message="Select a run.", icon="cancel")
+            return
+        run = self.runs_by_iid[sel[0]]
+        if DeliveryScheduler.confirm_run(self.user_id, run.request_nos):
+            CTkMessagebox(title="Success", message=f"Picked up {len(run.request_nos)} request(s).", icon="check")
+        else:
+            CTkMessagebox(title="Error",
+                          message="Failed. This run is no longer in your plan or was partly picked up; plan again.",
+                          icon="cancel")
+        self.refresh_runs()
+        self.refresh_queue()
@@ -1,8 +1,14 @@
+import os
+import sys
+import threading
 import customtkinter as ctk
 from gui.sign_up_window import SignUpWindow
 from gui.manager_window import ManagerWindow
 from gui.college_window import CollegeWindow
 from gui.courier_window import CourierWindow
+from config.db_config import close_all_connections, warm_up_pool
+from services.job_scheduler import default_scheduler
+from monitoring import metrics, profiling, tracing
 
 # Set the appearance mode and default color theme
 ctk.set_appearance_mode("Dark")  # Options: "System", "Dark", "Light"
@@ -30,6 +36,13 @@ class KSUInventoryApp(ctk.CTk):
 
         self.frames = {}
 
+        # Open the pooled DB connections while the user is still typing their credentials
+        threading.Thread(target=warm_up_pool, name="db-warm-up", daemon=True).start()
+
+        # Periodic backups, snapshots, log rotation and alert checks. Off by default, so only the
+        # machine chosen for it runs them (or use `python -m services.job_scheduler` on a server).
+        self.jobs = default_scheduler().start() if os.getenv("KSU_RUN_JOBS") == "1" else None
+
         # Start the application on the Sign Up/Login page
         self.show_frame("SignUpWindow")
 
@@ -79,5 +92,10 @@ class KSUInventoryApp(ctk.CTk):
 
 
 if __name__ == "__main__":
+    profiling.enable_from_env(sys.argv)  # KSU_PROFILE=1 or --profile
+    tracing.enable_from_env(sys.argv)  # KSU_TRACE=1 or --trace
+    metrics.start_from_env()  # KSU_METRICS_PORT
     app = KSUInventoryApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    if app.jobs: app.jobs.stop()
+    close_all_connections()
\ No newline at end of file
@@ -4,16 +4,41 @@ import tkinter.ttk as ttk
 from tkinter import simpledialog
 from services.stock_manager import StockManager
 from services.request_manager import RequestManager
+from services.demand_analytics import DemandAnalytics
+from services.audit_trail import AuditTrail
+from services.stock_alerts import StockAlerts
 from models.college import College
+from models.rows import index_by_id
+from models.request_status import RequestStatus
+from gui.async_loader import FanOutLoader
+from gui.table_loader import TableLoader
+from monitoring.instrument import ui_action
 from CTkMessagebox import CTkMessagebox
 
 
 class ManagerWindow(ctk.CTkFrame):
+    ALERT_POLL_MS = 10000  # How often to check for items that crossed their reorder level
+
+    # Loader panel key -> tab that shows it (loads of hidden tabs are cancelled on a tab switch)
+    PANEL_TABS = {
+        'items': "Registers (Items/Colleges)", 'colleges': "Registers (Items/Colleges)",
+        'pending': "Pending Requests",
+        'alerts': "Dashboard", 'reorder': "Dashboard",
+        'audit': "Audit Trail",
+    }
+
     def __init__(self, master, controller):
         super().__init__(master)
         self.controller = controller
         self.user_id = None
 
+        # Independent table loads run concurrently and render as each one arrives
+        self.loader = FanOutLoader(self)
+        self.tables = TableLoader(self)  # Big tables are inserted in slices, the custody overview streamed
+        self._stale_tabs = set()  # Tabs whose load was cancelled before it finished
+        self.last_alert_event_id = None
+        self._alert_poll_job = None
+
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
@@ -28,19 +53,50 @@ class ManagerWindow(ctk.CTkFrame):
                                                                                             pady=10, sticky="e")
 
         # Tabs
-        self.notebook = ctk.CTkTabview(self)
+        self.notebook = ctk.CTkTabview(self, command=self.on_tab_change)
         self.notebook.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
         self.notebook.add("Registers (Items/Colleges)")
         self.notebook.add("Pending Requests")
         self.notebook.add("Dashboard")
+        self.notebook.add("Audit Trail")
 
         self.setup_registers_tab()
         self.setup_requests_tab()
         self.setup_dashboard_tab()
+        self.setup_audit_tab()
 
     def logout(self):
+        self.loader.reset()  # Cancel whatever is still loading
+        self.tables.abort()
+        if self._alert_poll_job: self.after_cancel(self._alert_poll_job)
+        self._alert_poll_job = None
         self.controller.show_frame("SignUpWindow")
 
+    def tkraise(self, aboveThis=None):
+        super().tkraise(aboveThis)
+        if self._alert_poll_job is None:
+            self._poll_alert_events()
+
+    def on_tab_change(self):
+        """Cancels loads for the tabs being left, and reloads the new tab if its load was cancelled."""
+        current = self.notebook.get()
+        cancelled = self.loader.cancel([key for key, tab in self.PANEL_TABS.items() if tab != current])
+        self._stale_tabs.update(self.PANEL_TABS[key] for key in cancelled)
+        # The custody overview streams through its own server-side cursor, outside the FanOutLoader
+        if current != "Dashboard" and self.tables.abort(self.tree_cust):
+            self._stale_tabs.add("Dashboard")
+        if current in self._stale_tabs:
+            self._stale_tabs.discard(current)
+            if current == "Registers (Items/Colleges)":
+                self.refresh_inventory()
+                self.refresh_colleges()
+            elif current == "Pending Requests":
+                self.refresh_reqs()
+            elif current == "Dashboard":
+                self.refresh_dashboard()
+            elif current == "Audit Trail":
+                self.refresh_audit()
+
     # --- TAB 1: REGISTERS (Item & College) ---
     def setup_registers_tab(self):
         tab = self.notebook.tab("Registers (Items/Colleges)")
@@ -67,14 +123,36 @@ class ManagerWindow(ctk.CTkFrame):
         self.ent_lvl.pack(side="left", padx=2)
         ctk.CTkButton(f_i_in, text="+", width=40, command=self.add_item).pack(side="left", padx=2)
 
-        # Table
+        # Search & Filters (evaluated by the database, see StockManager.search_items)
+        f_i_filter = ctk.CTkFrame(frame_items)
+        f_i_filter.pack(fill="x", padx=5, pady=(5, 0))
+        self.ent_search = ctk.CTkEntry(f_i_filter, placeholder_text="Search name...")
+        self.ent_search.pack(side="left", fill="x", expand=True, padx=2)
+        self.ent_search.bind("<KeyRelease>", self.schedule_inventory_search)
+        self.ent_filter_cat = ctk.CTkEntry(f_i_filter, placeholder_text="Category", width=80)
+        self.ent_filter_cat.pack(side="left", padx=2)
+        self.ent_filter_cat.bind("<Return>", lambda e: self.refresh_inventory())
+        self.ent_filter_unit = ctk.CTkEntry(f_i_filter, placeholder_text="Unit", width=60)
+        self.ent_filter_unit.pack(side="left", padx=2)
+        self.ent_filter_unit.bind("<Return>", lambda e: self.refresh_inventory())
+        self.below_reorder_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(f_i_filter, text="Low", width=50, variable=self.below_reorder_var,
+                        command=self.refresh_inventory).pack(side="left", padx=2)
+
+        # Table (click a heading to sort by it, click again to reverse)
+        self.inv_sort = ('item_id', False)
+        self.inv_next_cursor = None
+        self._inv_search_job = None
         self.tree_inv = ttk.Treeview(frame_items, columns=('ID', 'Name', 'Cat', 'Unit', 'Lvl', 'Qty'), show='headings',
                                      height=10)
-        for c in ('ID', 'Name', 'Cat', 'Unit', 'Lvl', 'Qty'):
-            self.tree_inv.heading(c, text=c);
+        for c, db_col in zip(('ID', 'Name', 'Cat', 'Unit', 'Lvl', 'Qty'), StockManager.ITEM_COLUMNS):
+            self.tree_inv.heading(c, text=c, command=lambda col=db_col: self.sort_inventory(col));
             self.tree_inv.column(c, width=40)
         self.tree_inv.column('Name', width=120)
         self.tree_inv.pack(fill="both", expand=True, padx=5, pady=5)
+        self.btn_inv_more = ctk.CTkButton(frame_items, text="Load More", command=self.load_more_inventory,
+                                          state="disabled")
+        self.btn_inv_more.pack(pady=(0, 5))
 
         # --- RIGHT: College Registry ---
         frame_colleges = ctk.CTkFrame(tab)
@@ -118,13 +196,53 @@ class ManagerWindow(ctk.CTkFrame):
         else:
             CTkMessagebox(title="Error", message="Failed to add college.", icon="cancel")
 
+    def _inventory_query(self, after=None):
+        # Widget values are read here, on the Tk thread; the query itself runs on a worker
+        sort_by, descending = self.inv_sort
+        criteria = dict(search=self.ent_search.get().strip() or None,
+                        category=self.ent_filter_cat.get().strip() or None,
+                        unit=self.ent_filter_unit.get().strip() or None,
+                        below_reorder=self.below_reorder_var.get(),
+                        sort_by=sort_by, descending=descending, after=after)
+        return lambda: StockManager.search_items(**criteria)
+
     def refresh_inventory(self):
-        for i in self.tree_inv.get_children(): self.tree_inv.delete(i)
-        for r in StockManager.get_all_items(): self.tree_inv.insert('', 'end', values=r)
+        """Loads the first page of items matching the current search, filters and sort."""
+        # Only the unfiltered default view is painted from (and saved to) the local snapshot
+        default_view = (self.inv_sort == ('item_id', False) and not self.below_reorder_var.get() and
+                        not any(e.get().strip() for e in (self.ent_search, self.ent_filter_cat, self.ent_filter_unit)))
+        self.loader.load({'items': (self._inventory_query(), lambda result: self._render_inventory(result, True))},
+                         snapshots={'items': 'manager/items'} if default_view else None)
+
+    def load_more_inventory(self):
+        if self.inv_next_cursor is None: return
+        self.loader.load({'items': (self._inventory_query(self.inv_next_cursor),
+                                    lambda result: self._render_inventory(result, False))})
+
+    def schedule_inventory_search(self, event=None):
+        # Wait for a short pause in typing instead of querying on every keystroke
+        if self._inv_search_job: self.after_cancel(self._inv_search_job)
+        self._inv_search_job = self.after(250, self.refresh_inventory)
+
+    def sort_inventory(self, column):
+        sort_by, descending = self.inv_sort
+        self.inv_sort = (column, not descending if sort_by == column else False)
+        self.refresh_inventory()
+
+    def _render_inventory(self, result, first_page):
+        rows, self.inv_next_cursor = result
+        if first_page:
+            self.tables.fill(self.tree_inv, rows)
+        else:
+            for r in rows: self.tree_inv.insert('', 'end', values=r)  # One page: small enough to add at once
+        self.btn_inv_more.configure(state="normal" if self.inv_next_cursor is not None else "disabled")
 
     def refresh_colleges(self):
-        for i in self.tree_col.get_children(): self.tree_col.delete(i)
-        for r in College.get_all_colleges(): self.tree_col.insert('', 'end', values=r)
+        self.loader.load({'colleges': (College.get_all_colleges, self._render_colleges)},
+                         snapshots={'colleges': 'manager/colleges'})
+
+    def _render_colleges(self, rows):
+        self.tables.fill(self.tree_col, rows)
 
     # --- TAB 2: PENDING REQUESTS ---
     def setup_requests_tab(self):
@@ -144,31 +262,40 @@ class ManagerWindow(ctk.CTkFrame):
         self.refresh_reqs()
 
     def refresh_reqs(self):
-        for i in self.tree_req.get_children(): self.tree_req.delete(i)
-        for r in RequestManager.get_pending_requests(): self.tree_req.insert('', 'end', values=r)
+        self.loader.load({'pending': (RequestManager.get_pending_requests, self._render_reqs)},
+                         snapshots={'pending': 'manager/pending'})
 
+    def _render_reqs(self, rows):
+        self.pending_by_no = index_by_id(rows)  # Tree rows use the request_no as their iid
+        self.tables.fill(self.tree_req, rows, iid=lambda r: r.request_no)
+
+    @ui_action("manager.approve")
     def approve(self):
         sel = self.tree_req.selection()
         if not sel: return
-        item = self.tree_req.item(sel[0])['values']
-        req_id, req_type = item[0], item[5]
-        status = "Approved - Ready for Pickup" if req_type == 'Request' else "Approved - Ready for Pickup (Return)"
+        req = self.pending_by_no[int(sel[0])]
+        req_id, req_type = req.request_no, req.request_type
+        status = RequestStatus.approval_for(req_type)
 
         if RequestManager.process_approval(req_id, status, self.user_id):
             CTkMessagebox(title="Success", message=f"{req_type} Approved", icon="check")
             self.refresh_reqs()
             self.refresh_inventory()  # Update stock view
         else:
-            CTkMessagebox(title="Error", message="Failed. Check stock.", icon="cancel")
+            CTkMessagebox(title="Error", message="Failed. Not enough stock, or the request was already processed.",
+                          icon="cancel")
 
+    @ui_action("manager.reject")
     def reject(self):
         sel = self.tree_req.selection()
         if not sel: return
-        req_id = self.tree_req.item(sel[0])['values'][0]
+        req_id = int(sel[0])
         reason = simpledialog.askstring("Reject", "Reason:")
         if reason:
-            RequestManager.update_request_status(req_id, "Rejected", reason)
+            if not RequestManager.process_rejection(req_id, reason, self.user_id):
+                CTkMessagebox(title="Error", message="Failed. The request was already processed.", icon="cancel")
             self.refresh_reqs()
+            self.refresh_inventory()  # A cancelled approval returns its stock
 
     # --- TAB 3: DASHBOARD ---
     def setup_dashboard_tab(self):
@@ -213,23 +340,111 @@ class ManagerWindow(ctk.CTkFrame):
         self.tree_cust.column('Qty', width=80, anchor='center')
 
         self.tree_cust.pack(fill="both", expand=True, padx=5)
+        self.lbl_cust_progress = ctk.CTkLabel(f_cust, text="")
+        self.lbl_cust_progress.pack(anchor="e", padx=5)
+
+        # 4. Reorder Level Recommendations (from request history)
+        f_reorder = ctk.CTkFrame(tab)
+        f_reorder.grid(row=2, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+        ctk.CTkLabel(f_reorder, text="Reorder Level Recommendations", font=("Arial", 16, "bold")).pack(pady=5)
+
+        columns = ('ID', 'Item', 'Current Lvl', 'Recommended', 'Daily Demand', 'Lead Days', 'Season', 'Main College')
+        self.tree_reorder = ttk.Treeview(f_reorder, columns=columns, show='headings', height=6)
+        for c in columns:
+            self.tree_reorder.heading(c, text=c)
+            self.tree_reorder.column(c, width=90, anchor='center')
+        self.tree_reorder.column('ID', width=40)
+        self.tree_reorder.column('Item', width=160, anchor='w')
+        self.tree_reorder.pack(fill="both", expand=True, padx=5)
+        ctk.CTkButton(f_reorder, text="Apply Recommended Level", command=self.apply_reorder_level).pack(pady=5)
 
         self.refresh_dashboard()
 
     def refresh_dashboard(self):
-        # 1. Refresh Alerts
-        for i in self.tree_alerts.get_children(): self.tree_alerts.delete(i)
-        for r in StockManager.get_low_stock_alerts():
-            self.tree_alerts.insert('', 'end', values=r)
-
-        # 2. Refresh Custody Overview
-        for i in self.tree_cust.get_children(): self.tree_cust.delete(i)
-
-        # Fetch data from StockManager
-        custody_data = StockManager.get_all_college_custody()
-        for r in custody_data:
-            self.tree_cust.insert('', 'end', values=r)
+        # The panels are fetched concurrently; each one is drawn as soon as its query returns
+        self.loader.load({
+            'alerts': (StockManager.get_low_stock_alerts, self._render_alerts),
+            'reorder': (DemandAnalytics.get_reorder_recommendations, self._render_reorder),
+        }, snapshots={key: f"manager/{key}" for key in ('alerts', 'reorder')})
+        # The custody overview is the largest list: rows are shown batch by batch as they are fetched
+        self.tables.stream(self.tree_cust, StockManager.iter_all_college_custody,
+                           progress=self.lbl_cust_progress, snapshot_key="manager/custody")
+
+    def _poll_alert_events(self):
+        last = self.last_alert_event_id
+
+        def fetch():
+            if last is None:  # First poll: only events from now on are reported
+                return StockAlerts.get_latest_event_id(), []
+            events = StockAlerts.get_events_after(last)
+            return (events[-1].event_id if events else last), events
+
+        self.loader.load({'alert_events': (fetch, self._render_alert_events)})
+        self._alert_poll_job = self.after(self.ALERT_POLL_MS, self._poll_alert_events)
+
+    def _render_alert_events(self, result):
+        self.last_alert_event_id, events = result
+        if not events: return
+        self.loader.load({'alerts': (StockManager.get_low_stock_alerts, self._render_alerts)},
+                         snapshots={'alerts': "manager/alerts"})
+        crossed = [f"{e.name} ({e.quantity} left, level {e.reorder_level})" for e in events if e.kind == 'crossed']
+        if crossed:
+            CTkMessagebox(title="Low Stock", message="Reached reorder level:\n" + "\n".join(crossed), icon="warning")
+
+    def _render_alerts(self, rows):
+        self.tables.fill(self.tree_alerts, rows)
+
+    def _render_reorder(self, rows):
+        self.reorder_by_item = index_by_id(rows)
+        self.tables.fill(self.tree_reorder, rows, iid=lambda r: r.item_id)
+
+    def apply_reorder_level(self):
+        sel = self.tree_reorder.selection()
+        if not sel: return
+        row = self.reorder_by_item[int(sel[0])]
+        item_id, recommended = row.item_id, row.recommended_level
+        if StockManager.update_reorder_level(item_id, recommended):
+            CTkMessagebox(title="Success", message=f"Reorder level set to {recommended}", icon="check")
+            self.refresh_inventory()
+            self.refresh_dashboard()
+        else:
+            CTkMessagebox(title="Error", message="Failed to update reorder level.", icon="cancel")
 
     def do_backup(self):
         success, msg = StockManager.backup_database()
-        CTkMessagebox(title="Backup", message=msg, icon="check" if success else "cancel")
\ No newline at end of file
+        CTkMessagebox(title="Backup", message=msg, icon="check" if success else "cancel")
+
+    # --- TAB 4: AUDIT TRAIL ---
+    def setup_audit_tab(self):
+        tab = self.notebook.tab("Audit Trail")
+        tab.grid_columnconfigure(0, weight=1)
+        tab.grid_rowconfigure(1, weight=1)
+
+        f_filter = ctk.CTkFrame(tab)
+        f_filter.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 0))
+        self.ent_audit_actor = ctk.CTkEntry(f_filter, placeholder_text="Actor ID", width=100)
+        self.ent_audit_actor.pack(side="left", padx=5)
+        self.ent_audit_req = ctk.CTkEntry(f_filter, placeholder_text="Request No", width=100)
+        self.ent_audit_req.pack(side="left", padx=5)
+        ctk.CTkButton(f_filter, text="Search", command=self.refresh_audit).pack(side="left", padx=5)
+
+        columns = ('Time', 'Actor', 'Action', 'Item', 'Request', 'Qty', 'Host')
+        self.tree_audit = ttk.Treeview(tab, columns=columns, show='headings')
+        for c in columns:
+            self.tree_audit.heading(c, text=c)
+            self.tree_audit.column(c, width=80)
+        self.tree_audit.column('Time', width=140)
+        self.tree_audit.column('Action', width=260)
+        self.tree_audit.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
+
+    def refresh_audit(self):
+        try:
+            actor_id = int(self.ent_audit_actor.get()) if self.ent_audit_actor.get().strip() else None
+            request_no = int(self.ent_audit_req.get()) if self.ent_audit_req.get().strip() else None
+        except ValueError:
+            CTkMessagebox(title="Error", message="Actor ID / Request No must be numbers", icon="cancel")
+            return
+        self.loader.load({'audit': (lambda: AuditTrail.get_events(actor_id, request_no), self._render_audit)})
+
+    def _render_audit(self, rows):
+        self.tables.fill(self.tree_audit, rows, values=lambda r: [str(v) if v is not None else "" for v in r])
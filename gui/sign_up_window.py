@@ -2,6 +2,7 @@ import customtkinter as ctk
 from models.user import User  # Used for DB interaction (check_if_registered, create_user)
 from config.validation import validate_signup_inputs  # Used for format checking
 from CTkMessagebox import CTkMessagebox
+from monitoring.instrument import ui_action
 
 
 class SignUpWindow(ctk.CTkFrame):
@@ -154,6 +155,7 @@ class SignUpWindow(ctk.CTkFrame):
             # Failed insertion due to database error (e.g., integrity error)
             self.signup_error_label.configure(text="Registration failed due to a server error.", text_color="red")
 
+    @ui_action("sign_up.login")
     def handle_login(self):
         """
         Handles the Login button click: Validation, DB check, and forwarding.
@@ -0,0 +1,182 @@
+import contextlib
+import contextvars
+import queue
+import time
+from collections import deque
+from config.db_config import DB_LOAD_TIMEOUT_MS, CancelToken, query_scope
+from services.snapshot_store import SnapshotStore
+from gui.async_loader import _executor
+from monitoring import tracing
+
+# End-of-stream markers put on a stream's batch queue by the worker thread
+_END = "end"
+_FAILED = "failed"
+
+
+class _Fill:
+    """State of one table being filled (see TableLoader)."""
+
+    def __init__(self, tree, values, iid, progress, on_done):
+        self.tree = tree
+        self.values = values
+        self.iid = iid
+        self.progress = progress
+        self.on_done = on_done
+        self.pending = deque()  # Rows waiting to be inserted
+        self.batches = None  # queue.Queue fed by the worker thread when streaming
+        self.token = None
+        self.source_done = True
+        self.replace_on_data = False  # Snapshot rows shown: clear them when the first fresh batch arrives
+        self.inserted = 0
+        self.aborted = False
+
+
+class TableLoader:
+    """
+    Fills Treeviews without freezing the window.
+
+    A long loop of tree.insert() calls in one Tk callback blocks the UI for as long as it runs.
+    Here rows are inserted in time slices of SLICE_MS, with control going back to the Tk main loop
+    between slices, so the window keeps responding and the first rows show up at once.
+
+    - fill() inserts a list that is already in memory.
+    - stream() runs a batch generator (a service reading a server-side cursor) on a worker thread
+      and inserts each batch as it arrives.
+    A newer fill/stream of the same tree aborts the older one (its query is cancelled), as does abort().
+    """
+    SLICE_MS = 15  # Main-loop time one slice of inserts may take
+    POLL_MS = 20  # Wait between checks while a stream has no rows ready
+
+    def __init__(self, widget):
+        self.widget = widget
+        self._fills = {}  # str(tree) -> _Fill in progress
+
+    def fill(self, tree, rows, values=None, iid=None, progress=None, on_done=None):
+        """
+        Replaces the contents of `tree` with `rows`.
+
+        Args:
+            values: optional row -> Treeview values (default: the row itself).
+            iid: optional row -> item id.
+            progress: optional label that shows the number of rows loaded.
+            on_done: optional callback once every row is in the tree.
+        """
+        job = self._start(tree, values, iid, progress, on_done)
+        job.pending.extend(rows)
+        self._step(job)
+
+    def stream(self, tree, fetch_batches, values=None, iid=None, progress=None, on_done=None, snapshot_key=None):
+        """
+        Replaces the contents of `tree` with the rows of `fetch_batches()`, a generator of row lists
+        that runs on a worker thread under its own CancelToken and the DB_LOAD_TIMEOUT_MS timeout.
+        With `snapshot_key`, an empty table is painted from the local snapshot first and the
+        complete result is saved as the new snapshot.
+        """
+        job = self._start(tree, values, iid, progress, on_done)
+        job.token = CancelToken()
+        job.batches = queue.Queue()
+        job.source_done = False
+        if snapshot_key:
+            cached = SnapshotStore.get(snapshot_key)
+            if cached:
+                job.pending.extend(cached)
+                job.replace_on_data = True
+        _executor.submit(contextvars.copy_context().run, self._run_stream, job.token, job.batches,
+                         fetch_batches, snapshot_key)
+        self._step(job)
+
+    def abort(self, tree=None):
+        """
+        Stops filling `tree` (default: every table); rows already inserted stay.
+        A stream's query is cancelled and its connection freed. Returns the trees that were still filling.
+        """
+        aborted = []
+        for key in [key for key, job in self._fills.items() if tree is None or job.tree is tree]:
+            job = self._fills.pop(key)
+            self._abort(job)
+            aborted.append(job.tree)
+        return aborted
+
+    # ---------------------------------------------------------
+    # PART 1: MAIN LOOP
+    # ---------------------------------------------------------
+
+    def _start(self, tree, values, iid, progress, on_done):
+        old = self._fills.get(str(tree))
+        if old: self._abort(old)
+        job = self._fills[str(tree)] = _Fill(tree, values, iid, progress, on_done)
+        tree.delete(*tree.get_children())  # One Tk call, however many rows
+        return job
+
+    @staticmethod
+    def _abort(job):
+        job.aborted = True
+        if job.token: job.token.cancel()
+
+    def _step(self, job):
+        if job.aborted: return
+        if job.batches is not None:
+            self._take_batches(job)
+
+        deadline = time.perf_counter() + self.SLICE_MS / 1000
+        tree, values, iid = job.tree, job.values, job.iid
+        while job.pending and time.perf_counter() < deadline:
+            for row in [job.pending.popleft() for _ in range(min(50, len(job.pending)))]:
+                tree.insert('', 'end', iid=str(iid(row)) if iid else None, values=values(row) if values else row)
+                job.inserted += 1
+
+        finished = job.source_done and not job.pending
+        if job.progress is not None:
+            job.progress.configure(text=f"{job.inserted} rows" if finished else f"Loading... {job.inserted} rows")
+        if not finished:
+            self.widget.after(1 if job.pending else self.POLL_MS, self._step, job)
+            return
+        if self._fills.get(str(tree)) is job: del self._fills[str(tree)]
+        if job.on_done: job.on_done()
+
+    def _take_batches(self, job):
+        while True:
+            try:
+                batch = job.batches.get_nowait()
+            except queue.Empty:
+                return
+            if batch is _END or batch is _FAILED:
+                if batch is _END and job.replace_on_data:
+                    job.pending.clear()  # The fresh result is empty
+                    job.tree.delete(*job.tree.get_children())
+                    job.inserted = 0
+                job.source_done = True  # After a failure the snapshot rows (if any) stay on screen
+                return
+            if job.replace_on_data:
+                # Fresh rows arrived: drop the snapshot rows (inserted or still waiting)
+                job.replace_on_data = False
+                job.pending.clear()
+                job.tree.delete(*job.tree.get_children())
+                job.inserted = 0
+            job.pending.extend(batch)
+
+    # ---------------------------------------------------------
+    # PART 2: WORKER THREAD
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def _run_stream(token, batches, fetch_batches, snapshot_key):
+        # Worker thread: never touch widgets here
+        rows = [] if snapshot_key else None
+        end = _FAILED
+        try:
+            with query_scope(token=token, timeout_ms=DB_LOAD_TIMEOUT_MS), tracing.span("load.stream"):
+                with contextlib.closing(fetch_batches()) as source:  # Closing it releases the connection
+                    for batch in source:
+                        if token.cancelled: break
+                        batches.put(batch)
+                        if rows is not None: rows.extend(batch)
+            if token.failed and not token.cancelled:
+                print("Error streaming table rows: query failed or timed out")  # The service caught it
+            elif not token.cancelled:
+                end = _END
+                if snapshot_key: SnapshotStore.put(snapshot_key, rows)
+        except Exception as e:
+            print(f"Error streaming table rows: {e}")
+        finally:
+            batches.put(end)
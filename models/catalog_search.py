@@ -0,0 +1,129 @@
+import bisect
+import heapq
+import re
+from collections import defaultdict
+
+
+class CatalogSearchIndex:
+    """
+    In-memory search index over the InventoryItem catalog, used for type-ahead in the Request Item tab.
+    1. Prefix index: every prefix of every word -> items containing such a word (in name order).
+    2. Bigram index over the word vocabulary: finds words close to a misspelled query word.
+    Results are ranked: exact ID > name starts with the query > all words prefix-match > fuzzy match.
+    """
+
+    MIN_SIMILARITY = 0.5  # Dice similarity (over bigrams) for a vocabulary word to match a misspelled word
+
+    def __init__(self, items):
+        # Positions follow name order, so "best first" lists are already alphabetical
+        self.items = sorted(items, key=lambda item: item.name.lower())
+        self._names = [item.name.lower() for item in self.items]
+        self._by_id = {str(item.id): pos for pos, item in enumerate(self.items)}
+
+        self._item_words = []  # position -> words of that item
+        word_items = defaultdict(list)  # word -> positions
+        for pos, item in enumerate(self.items):
+            words = tuple(sorted(set(self._split_words(f"{item.name} {item.category or ''} {item.unit or ''}"))))
+            self._item_words.append(words)
+            for word in words:
+                word_items[word].append(pos)
+
+        prefix_items = defaultdict(set)
+        self._bigram_words = defaultdict(list)  # bigram -> vocabulary words
+        self._word_bigrams = {}
+        for word, positions in word_items.items():
+            for end in range(1, len(word) + 1):
+                prefix_items[word[:end]].update(positions)
+            bigrams = self._bigrams(word)
+            self._word_bigrams[word] = len(bigrams)
+            for bigram in bigrams:
+                self._bigram_words[bigram].append(word)
+
+        self._word_items = dict(word_items)
+        self._prefix_items = {prefix: sorted(positions) for prefix, positions in prefix_items.items()}
+
+    @staticmethod
+    def _split_words(text):
+        return re.findall(r"\w+", text.lower())
+
+    @staticmethod
+    def _bigrams(word):
+        padded = f" {word} "  # Padding makes the first and last letters count
+        return set(padded[i:i + 2] for i in range(len(padded) - 1))
+
+    def _has_prefixes(self, pos, prefixes):
+        """True if every prefix starts one of the item's words."""
+        return all(any(word.startswith(prefix) for word in self._item_words[pos]) for prefix in prefixes)
+
+    def _similar_words(self, query_word):
+        """Vocabulary words similar to a (probably misspelled) query word, with their similarity."""
+        query_bigrams = self._bigrams(query_word)
+        overlap = defaultdict(int)
+        for bigram in query_bigrams:
+            for word in self._bigram_words.get(bigram, ()):
+                overlap[word] += 1
+        for word, count in overlap.items():
+            similarity = 2 * count / (len(query_bigrams) + self._word_bigrams[word])
+            if similarity >= self.MIN_SIMILARITY:
+                yield word, similarity
+
+    def search(self, query, limit=15):
+        """
+        Returns up to `limit` InventoryItem objects matching `query`, best first.
+        An empty query returns the first items of the catalog.
+        """
+        words = self._split_words(query)
+        if not words:
+            return self.items[:limit]
+        query_text = " ".join(words)
+
+        ranked = []
+        seen = set()
+
+        def add(position):
+            if position not in seen:
+                seen.add(position)
+                ranked.append(position)
+
+        # 1. Exact item ID typed in
+        if query_text in self._by_id:
+            add(self._by_id[query_text])
+
+        # 2. Names starting with the query: a contiguous range of the sorted names
+        pos = bisect.bisect_left(self._names, query_text)
+        while pos < len(self._names) and len(ranked) < limit and self._names[pos].startswith(query_text):
+            add(pos)
+            pos += 1
+
+        # 3. Every query word starts one of the item's words (e.g. "del opti"); scan the rarest word's list
+        known = [word for word in words if word in self._prefix_items]
+        if len(ranked) < limit and len(known) == len(words):
+            rarest = min(words, key=lambda word: len(self._prefix_items[word]))
+            others = [word for word in words if word != rarest]
+            for pos in self._prefix_items[rarest]:
+                if len(ranked) >= limit: break
+                if self._has_prefixes(pos, others):
+                    add(pos)
+
+        # 4. Fuzzy: words that match nothing are replaced by similar vocabulary words
+        unknown = [word for word in words if word not in self._prefix_items]
+        if len(ranked) < limit and unknown:
+            scores = None
+            for query_word in unknown:
+                best = {}
+                for word, similarity in self._similar_words(query_word):
+                    for pos in self._word_items[word]:
+                        if similarity > best.get(pos, 0):
+                            best[pos] = similarity
+                scores = best if scores is None else {p: s + best[p] for p, s in scores.items() if p in best}
+
+            candidates = (p for p in scores if p not in seen and self._has_prefixes(p, known))
+            for pos in heapq.nsmallest(limit - len(ranked), candidates, key=lambda p: (-scores[p], p)):
+                add(pos)
+
+        return [self.items[pos] for pos in ranked]
+
+    @staticmethod
+    def label(item):
+        """Text shown for an item in the results list."""
+        return f"{item.id} - {item.name} ({item.unit})"
@@ -1,5 +1,7 @@
 import psycopg2
 from config.db_config import get_db_connection
+from models.rows import CollegeRow, CustodyRow, CollegeRequestRow, row_cursor
+from models.request_status import RequestStatus
 
 class College:
     """
@@ -33,10 +35,10 @@ class College:
     @staticmethod
     def get_all_colleges():
         """Retrieves all colleges for the Manager's list."""
-        conn = get_db_connection()
+        conn = get_db_connection(read_only=True)
         if not conn: return []
         try:
-            cursor = conn.cursor()
+            cursor = row_cursor(conn, CollegeRow)
             cursor.execute("SELECT college_id, college_name FROM colleges ORDER BY college_id")
             return cursor.fetchall()
         finally:
@@ -60,11 +62,11 @@ class College:
     # ---------------------------------------------------------
     # PART 2: COLLEGE USER FUNCTIONS (For College Window)
     # ---------------------------------------------------------
-    def get_my_requests(self):
-        return self._get_transactions_by_type('Request')
+    def get_my_requests(self, include_archived=False):
+        return self._get_transactions_by_type('Request', include_archived)
 
-    def get_my_returns(self):
-        return self._get_transactions_by_type('Return')
+    def get_my_returns(self, include_archived=False):
+        return self._get_transactions_by_type('Return', include_archived)
 
     def get_current_custody(self):
         """
@@ -72,9 +74,9 @@ class College:
         """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return []
-            cursor = conn.cursor()
+            cursor = row_cursor(conn, CustodyRow)
 
             # Joined with inventory_stock and used correct item_id
             sql = """
@@ -91,24 +93,28 @@ class College:
         finally:
             if conn: conn.close()
 
-    def _get_transactions_by_type(self, trans_type):
-        """Helper to fetch requests/returns with correct schema."""
+    def _get_transactions_by_type(self, trans_type, include_archived=False):
+        """
+        Helper to fetch requests/returns with correct schema.
+        Archived requests (closed and past the retention window) are only read with include_archived.
+        """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return []
-            cursor = conn.cursor()
+            cursor = row_cursor(conn, CollegeRequestRow)
 
             # Using correct columns: request_no, request_type, item_id
             sql = """
-                SELECT r.request_no, i.name, r.quantity, r.status, r.request_date, r.rejection_reason
+                SELECT r.request_no, i.name, r.quantity, r.status_code, r.request_date, r.rejection_reason
                 FROM requests r
                 JOIN items i ON r.item_id = i.item_id
-                WHERE r.college_id = %s AND r.request_type = %s
+                WHERE r.college_id = %s AND r.request_type = %s AND (%s OR NOT r.archived)
                 ORDER BY r.request_date DESC
             """
-            cursor.execute(sql, (self.college_id, trans_type))
-            return cursor.fetchall()
+            cursor.execute(sql, (self.college_id, trans_type, include_archived))
+            # Show the status label instead of the stored code
+            return [row._replace(status=RequestStatus(row.status).label) for row in cursor.fetchall()]
         except psycopg2.Error as e:
             print(f"Error fetching {trans_type}s: {e}")
             return []
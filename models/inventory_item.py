@@ -6,6 +6,9 @@ class InventoryItem:
     Represents an Item in the KSU Inventory.
     Used for displaying the Catalog in College Window and managing items in Manager Window.
     """
+    # No per-object __dict__: the catalog keeps one of these per item in memory
+    __slots__ = ('id', 'name', 'category', 'unit', 'reorder_level', 'quantity_central')
+
     def __init__(self, item_id, name, category, unit, reorder_level, quantity_central):
         self.id = item_id
         self.name = name
@@ -24,7 +27,7 @@ class InventoryItem:
         conn = None
         items = []
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return []
             cursor = conn.cursor()
 
@@ -32,11 +35,8 @@ class InventoryItem:
             cursor.execute(sql)
             rows = cursor.fetchall()
 
-            for row in rows:
-                # Create an object for each row
-                # row order matches SQL: 0=id, 1=name, 2=cat, 3=unit, 4=reorder, 5=qty
-                item = InventoryItem(row[0], row[1], row[2], row[3], row[4], row[5])
-                items.append(item)
+            # row order matches SQL and the constructor: id, name, cat, unit, reorder, qty
+            items = [InventoryItem(*row) for row in rows]
 
             return items
 
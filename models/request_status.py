@@ -0,0 +1,133 @@
+from enum import IntEnum
+
+
+class RequestStatus(IntEnum):
+    """
+    Lifecycle of a request / return, stored as a SMALLINT in requests.status_code.
+    (see database/migrations/004_request_status_codes.sql)
+    """
+    PENDING = 0
+    APPROVED = 1            # Request approved, stock reserved, waiting for the courier
+    PICKED_UP = 2           # Request on its way to the college
+    DELIVERED = 3
+    RETURN_APPROVED = 4     # Return approved, waiting for the courier at the college
+    RETURN_IN_TRANSIT = 5   # Return on its way to the central inventory
+    RETURN_RECEIVED = 6
+    REJECTED = 7
+
+    @property
+    def label(self):
+        """Text shown to users (the values the old free-text status column held)."""
+        return STATUS_LABELS[self]
+
+    @staticmethod
+    def approval_for(request_type):
+        return RequestStatus.APPROVED if request_type == 'Request' else RequestStatus.RETURN_APPROVED
+
+
+STATUS_LABELS = {
+    RequestStatus.PENDING: 'Pending',
+    RequestStatus.APPROVED: 'Approved - Ready for Pickup',
+    RequestStatus.PICKED_UP: 'Picked Up by Courier',
+    RequestStatus.DELIVERED: 'Delivered to College',
+    RequestStatus.RETURN_APPROVED: 'Approved - Ready for Pickup (Return)',
+    RequestStatus.RETURN_IN_TRANSIT: 'In Transit to Inventory',
+    RequestStatus.RETURN_RECEIVED: 'Received at Inventory',
+    RequestStatus.REJECTED: 'Rejected',
+}
+
+# Allowed moves: current status -> statuses it may change to
+TRANSITIONS = {
+    RequestStatus.PENDING: {RequestStatus.APPROVED, RequestStatus.RETURN_APPROVED, RequestStatus.REJECTED},
+    RequestStatus.APPROVED: {RequestStatus.PICKED_UP, RequestStatus.REJECTED},
+    RequestStatus.PICKED_UP: {RequestStatus.DELIVERED},
+    RequestStatus.RETURN_APPROVED: {RequestStatus.RETURN_IN_TRANSIT, RequestStatus.REJECTED},
+    RequestStatus.RETURN_IN_TRANSIT: {RequestStatus.RETURN_RECEIVED},
+    RequestStatus.DELIVERED: set(),
+    RequestStatus.RETURN_RECEIVED: set(),
+    RequestStatus.REJECTED: set(),
+}
+
+# Statuses that only apply to one request_type
+STATUS_REQUEST_TYPE = {
+    RequestStatus.APPROVED: 'Request',
+    RequestStatus.PICKED_UP: 'Request',
+    RequestStatus.DELIVERED: 'Request',
+    RequestStatus.RETURN_APPROVED: 'Return',
+    RequestStatus.RETURN_IN_TRANSIT: 'Return',
+    RequestStatus.RETURN_RECEIVED: 'Return',
+}
+
+# A request in one of these states needs no further work
+CLOSED_STATUSES = (RequestStatus.DELIVERED, RequestStatus.RETURN_RECEIVED, RequestStatus.REJECTED)
+
+
+def transition(cursor, request_no, target, sources=None, set_columns=None, returning=('item_id', 'quantity')):
+    """
+    Moves one request to `target` with a single guarded UPDATE, inside the caller's transaction.
+
+    Only a request whose current status may lead to `target` (optionally narrowed to `sources`)
+    and whose request_type fits `target` is changed, so two users can never both perform the same step.
+    Extra columns can be set at the same time with `set_columns` ({column: value}).
+
+    Returns the `returning` columns plus the previous status, or None if the move was not allowed.
+    """
+    allowed = [status for status, targets in TRANSITIONS.items() if target in targets]
+    if sources is not None:
+        allowed = [status for status in allowed if status in sources]
+    if not allowed:
+        raise ValueError(f"No status may change to {target.name}")
+
+    set_columns = set_columns or {}
+    assignments = ", ".join(["status_code = %s"] + [f"{column} = %s" for column in set_columns])
+    # Only open requests can move, and those are never archived: NOT archived keeps it to requests_hot
+    conditions = "NOT r.archived AND r.request_no = old.request_no AND old.status_code = ANY(%s)"
+    params = [int(target)] + list(set_columns.values()) + [request_no, [int(status) for status in allowed]]
+    if target in STATUS_REQUEST_TYPE:
+        conditions += " AND r.request_type = %s"
+        params.append(STATUS_REQUEST_TYPE[target])
+
+    # The sub-select locks the row and exposes its previous status to RETURNING
+    sql = f"""
+        UPDATE requests r
+        SET {assignments}
+        FROM (SELECT request_no, status_code FROM requests WHERE request_no = %s AND NOT archived FOR UPDATE) old
+        WHERE {conditions}
+        RETURNING {", ".join("r." + column for column in returning)}{"," if returning else ""} old.status_code
+    """
+    cursor.execute(sql, params)
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return tuple(row[:-1]) + (RequestStatus(row[-1]),)
+
+
+def transition_many(cursor, request_nos, moves, set_columns=None):
+    """
+    Moves several requests with one guarded UPDATE, inside the caller's transaction.
+    moves: {current status: target status}; each request moves according to its own current status,
+    requests in any other status are left alone. Returns the request_nos that were changed.
+    """
+    for source, target in moves.items():
+        if target not in TRANSITIONS[source]:
+            raise ValueError(f"{source.name} may not change to {target.name}")
+
+    set_columns = set_columns or {}
+    cases = " ".join("WHEN %s THEN %s" for _ in moves)
+    assignments = ", ".join([f"status_code = CASE status_code {cases} END"] +
+                            [f"{column} = %s" for column in set_columns])
+    params = [int(code) for move in moves.items() for code in move] + list(set_columns.values())
+    params += [list(request_nos), [int(source) for source in moves]]
+
+    # Row locks are taken in request_no order, so two overlapping runs cannot deadlock
+    sql = f"""
+        UPDATE requests r
+        SET {assignments}
+        FROM (SELECT request_no FROM requests
+              WHERE request_no = ANY(%s) AND status_code = ANY(%s) AND NOT archived
+              ORDER BY request_no FOR UPDATE) locked
+        WHERE NOT r.archived AND r.request_no = locked.request_no
+        RETURNING r.request_no
+    """
+    cursor.execute(sql, params)
+    return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,69 @@
+from collections import namedtuple
+import psycopg2.extensions
+
+# ---------------------------------------------------------
+# Typed row models for service results.
+# namedtuples have no per-instance __dict__ (they use __slots__ = ()), so they cost the same
+# memory as the plain tuples they replace, still work as Treeview `values`, and add field names.
+# ---------------------------------------------------------
+
+# Items / Stock
+ItemRow = namedtuple('ItemRow', 'item_id name category unit reorder_level quantity_central')
+AlertRow = namedtuple('AlertRow', 'name quantity_central reorder_level')
+AlertEventRow = namedtuple('AlertEventRow', 'event_id created_at item_id name kind quantity reorder_level')
+ReorderRow = namedtuple('ReorderRow', 'item_id name reorder_level recommended_level daily_demand '
+                                      'lead_days season_factor main_college')
+BalanceRow = namedtuple('BalanceRow', 'item_id name quantity')
+MovementRow = namedtuple('MovementRow', 'movement_id created_at quantity_change reason request_no')
+
+# Colleges / Custody
+CollegeRow = namedtuple('CollegeRow', 'college_id college_name')
+CustodyRow = namedtuple('CustodyRow', 'item_id name quantity unit')
+CollegeCustodyRow = namedtuple('CollegeCustodyRow', 'name quantity')
+CustodyOverviewRow = namedtuple('CustodyOverviewRow', 'college name quantity')
+
+# Requests
+PendingRequestRow = namedtuple('PendingRequestRow', 'request_no college item quantity purpose request_type')
+CollegeRequestRow = namedtuple('CollegeRequestRow', 'request_no item quantity status request_date rejection_reason')
+CourierRequestRow = namedtuple('CourierRequestRow', 'request_no college item quantity request_type notes')
+DeliveryRun = namedtuple('DeliveryRun', 'courier_id college_id college load request_nos lines')
+
+# Audit
+AuditEventRow = namedtuple('AuditEventRow', 'created_at actor_id action item_id request_no quantity host')
+
+
+class RowCursor(psycopg2.extensions.cursor):
+    """
+    Cursor that builds `row_type` objects straight from the fetched tuples.
+    Create it with row_cursor(conn, SomeRow).
+    """
+    row_type = None
+
+    def fetchone(self):
+        row = super().fetchone()
+        return row if row is None else self.row_type._make(row)
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        return list(map(self.row_type._make, rows))
+
+    def fetchall(self):
+        return list(map(self.row_type._make, super().fetchall()))
+
+    def __iter__(self):
+        return map(self.row_type._make, super().__iter__())
+
+
+def row_cursor(conn, row_type, name=None):
+    """
+    Opens a cursor on `conn` whose rows come back as `row_type`.
+    With a `name` it is a server-side cursor: rows stay on the server until fetched.
+    """
+    cursor = conn.cursor(name, cursor_factory=RowCursor) if name else conn.cursor(cursor_factory=RowCursor)
+    cursor.row_type = row_type
+    return cursor
+
+
+def index_by_id(rows, key=0):
+    """Builds an id -> row lookup map (`key` is the position of the id field)."""
+    return {row[key]: row for row in rows}
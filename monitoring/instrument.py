@@ -0,0 +1,52 @@
+import importlib
+import inspect
+from monitoring import metrics, profiling, tracing
+
+# Service classes whose public static methods are wrapped by the monitoring tools (module, class name)
+SERVICE_CLASSES = [
+    ("services.request_manager", "RequestManager"),
+    ("services.stock_manager", "StockManager"),
+    ("services.courier_manager", "CourierManager"),
+    ("services.delivery_scheduler", "DeliveryScheduler"),
+    ("services.stock_alerts", "StockAlerts"),
+    ("services.stock_ledger", "StockLedger"),
+    ("services.demand_analytics", "DemandAnalytics"),
+    ("services.audit_trail", "AuditTrail"),
+    ("services.college_cache", "CollegeCache"),
+    ("services.request_archive", "RequestArchive"),
+    ("models.user", "User"),
+    ("models.college", "College"),
+    ("models.inventory_item", "InventoryItem"),
+]
+
+_applied = set()  # kinds of wrapper already installed
+
+
+def ui_action(name):
+    """
+    Decorator for GUI callbacks (button commands): the call becomes a root span of its trace,
+    a profiled action and a ksu_ui_action_seconds sample. Costs one flag check per tool while they are off.
+    """
+    def decorator(func):
+        return metrics.timed_action(name)(tracing.traced(name)(profiling.profiled(name)(func)))
+    return decorator
+
+
+def wrap_services(kind, make_wrapper, classes=None):
+    """
+    Replaces every public method (static or instance) of the service classes with
+    make_wrapper(label, func), where label is "Class.method". Generator functions are left alone (the wrapper would only see
+    the generator being created). Installing the same `kind` twice does nothing.
+    Methods are wrapped on the class, so callers that imported the class see the wrappers.
+    """
+    if kind in _applied: return
+    _applied.add(kind)
+    for module_name, class_name in classes or SERVICE_CLASSES:
+        cls = getattr(importlib.import_module(module_name), class_name)
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_'): continue
+            if isinstance(value, staticmethod):
+                if inspect.isgeneratorfunction(inspect.unwrap(value.__func__)): continue
+                setattr(cls, attr, staticmethod(make_wrapper(f"{class_name}.{attr}", value.__func__)))
+            elif inspect.isfunction(value) and not inspect.isgeneratorfunction(inspect.unwrap(value)):
+                setattr(cls, attr, make_wrapper(f"{class_name}.{attr}", value))  # Still binds as a method
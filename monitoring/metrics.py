@@ -0,0 +1,237 @@
+import bisect
+import contextvars
+import functools
+import http.server
+import os
+import threading
+import time
+
+# Local metrics endpoint in the Prometheus text format.
+# Set KSU_METRICS_PORT (e.g. 9464) to collect metrics and serve them on
+# http://KSU_METRICS_HOST:KSU_METRICS_PORT/metrics (host defaults to 127.0.0.1).
+# Without it nothing is collected: every hook returns after one check.
+
+METRICS_HOST = os.getenv("KSU_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("KSU_METRICS_PORT", "0"))
+
+# Latency buckets in seconds (upper bounds; +Inf is implied)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = False
+_server = None
+_registry = []  # every metric, in registration order
+
+# Service method running in this context ("" outside services), used to label SQL metrics
+_current_method = contextvars.ContextVar("metrics_method", default="")
+
+
+class Counter:
+    """A value that only goes up, per label set."""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        if not _enabled: return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, values, value) for values, value in self._values.items()]
+
+
+class Histogram:
+    """Observed durations per label set, counted into BUCKETS."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, seconds, *label_values):
+        if not _enabled: return
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                counts = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += seconds
+
+    def samples(self):
+        with self._lock:
+            snapshot = {values: list(counts) for values, counts in self._values.items()}
+        samples = []
+        for values, counts in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts[:-1]):
+                cumulative += count
+                samples.append((self.name + "_bucket", values + (("le", _format(bound)),), cumulative))
+            samples.append((self.name + "_count", values, cumulative))
+            samples.append((self.name + "_sum", values, counts[-1]))
+        return samples
+
+
+class Gauge:
+    """A value read when the endpoint is scraped: `read()` returns {label values tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, read, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.read = read
+        _registry.append(self)
+
+    def samples(self):
+        return [(self.name, values, value) for values, value in self.read().items()]
+
+
+# ---------------------------------------------------------
+# PART 1: APPLICATION METRICS
+# ---------------------------------------------------------
+
+CONNECTION_ACQUIRE = Histogram("ksu_db_connection_acquire_seconds",
+                               "Time to get a connection from the pool (or open one)", ("pool",))
+CONNECTIONS_OPENED = Counter("ksu_db_connections_opened_total", "New database connections opened", ("pool",))
+CONNECTION_FAILURES = Counter("ksu_db_connection_failures_total", "Failed attempts to get a connection", ("pool",))
+STATEMENT_SECONDS = Histogram("ksu_sql_statement_seconds", "SQL statement latency by service method and operation",
+                              ("method", "operation"))
+STATEMENT_ERRORS = Counter("ksu_sql_errors_total", "SQL statements that raised, by service method and error",
+                           ("method", "error"))
+SERVICE_SECONDS = Histogram("ksu_service_call_seconds", "Service method latency", ("method",))
+CACHE_REQUESTS = Counter("ksu_cache_requests_total", "Cache lookups by cache and result (hit/miss)",
+                         ("cache", "result"))
+UI_ACTION_SECONDS = Histogram("ksu_ui_action_seconds", "Duration of GUI actions (button callbacks)", ("action",))
+
+
+def enabled():
+    return _enabled
+
+
+def cache_lookup(cache, hit):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def service_method():
+    return _current_method.get()
+
+
+def timed_service(label):
+    """Decorator for service methods: records their latency and labels the SQL they run."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled: return func(*args, **kwargs)
+            reset = _current_method.set(label)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                SERVICE_SECONDS.observe(time.perf_counter() - start, label)
+                _current_method.reset(reset)
+        return wrapper
+    return decorator
+
+
+def timed_action(name):
+    """Decorator for GUI callbacks: records their duration in ksu_ui_action_seconds."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled: return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                UI_ACTION_SECONDS.observe(time.perf_counter() - start, name)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------
+# PART 2: ENDPOINT
+# ---------------------------------------------------------
+
+def _format(value):
+    if isinstance(value, str): return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, values, value in metric.samples():
+            pairs = [(label, v) for label, v in zip(metric.labels, values)]
+            pairs += [v for v in values[len(metric.labels):]]  # Extra pairs, e.g. the bucket's le
+            labels = ",".join(f'{label}="{_escape(v)}"' for label, v in pairs)
+            lines.append(f"{name}{{{labels}}} {_format(value)}" if labels else f"{name} {_format(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a console line each
+
+
+def start(port=None, host=None):
+    """Starts collecting and serves /metrics on a daemon thread. Returns the bound port, or None on failure."""
+    global _enabled, _server
+    if _server: return _server.server_address[1]
+    try:
+        _server = http.server.ThreadingHTTPServer((host or METRICS_HOST, port or METRICS_PORT), _MetricsHandler)
+    except OSError as e:
+        print(f"[metrics] could not listen on {host or METRICS_HOST}:{port or METRICS_PORT}: {e}")
+        return None
+    _server.daemon_threads = True
+    _enabled = True
+    threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    print(f"[metrics] serving http://{_server.server_address[0]}:{_server.server_address[1]}/metrics")
+    return _server.server_address[1]
+
+
+def start_from_env():
+    """Starts the endpoint when KSU_METRICS_PORT is set, and times every service method."""
+    if METRICS_PORT:
+        if start() is None: return
+        from monitoring.instrument import wrap_services
+        wrap_services("metrics", lambda label, func: timed_service(label)(func))
+
+
+def stop():
+    global _enabled, _server
+    if _server:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+    _enabled = False
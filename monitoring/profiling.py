@@ -0,0 +1,173 @@
+import argparse
+import cProfile
+import datetime
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+# Opt-in profiling of GUI actions and service calls.
+# Turn it on with KSU_PROFILE=1 (or `python -m gui.main_app --profile`). Each profiled call writes
+#   <n>-<action>.prof   cProfile data (open with pstats or snakeviz)
+#   <n>-<action>.alloc  the allocations it left behind, by source line (tracemalloc)
+# into a directory per session under KSU_PROFILE_DIR, plus one line per call in session.jsonl.
+# `python -m monitoring.profiling summarize` lists the hotspots of a session.
+
+PROFILE_DIR = os.getenv("KSU_PROFILE_DIR", "profiles")
+TRACEMALLOC_FRAMES = 10
+ALLOC_TOP = 25
+
+_session_dir = None  # Set by enable(); None means profiling is off
+_counter = 0
+_lock = threading.Lock()
+_profiler_busy = threading.Lock()  # cProfile allows one active profiler per process
+_active = threading.local()  # .depth: profiled calls running on this thread
+
+
+def enabled():
+    return _session_dir is not None
+
+
+def enable(directory=None):
+    """Starts a profiling session; later profiled calls write their data into a new session directory."""
+    global _session_dir
+    if _session_dir: return _session_dir
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    _session_dir = os.path.join(directory or PROFILE_DIR, stamp)
+    os.makedirs(_session_dir, exist_ok=True)
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    print(f"[profile] writing profiles to {_session_dir}")
+    return _session_dir
+
+
+def enable_from_env(argv=()):
+    """Enables profiling when KSU_PROFILE=1 or --profile was given, and instruments the services."""
+    if os.getenv("KSU_PROFILE") == "1" or "--profile" in argv:
+        enable()
+        instrument_services()
+
+
+def profiled(name):
+    """
+    Decorator: while profiling is enabled, each call of the function is profiled as action `name`.
+    Calls made inside another profiled call on the same thread are part of the outer profile.
+    When profiling is off the only cost is one check per call.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _session_dir is None or getattr(_active, 'depth', 0):
+                return func(*args, **kwargs)
+            return _run_profiled(name, func, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_services(classes=None):
+    """Profiles every public service method (see monitoring.instrument)."""
+    from monitoring.instrument import wrap_services
+    wrap_services("profile", lambda label, func: profiled(label)(func), classes)
+
+
+# ---------------------------------------------------------
+# PART 1: CAPTURE
+# ---------------------------------------------------------
+
+def _run_profiled(name, func, args, kwargs):
+    global _counter
+    with _lock:
+        _counter += 1
+        seq = _counter
+    _active.depth = 1
+    # Only one cProfile profiler can run at a time: a concurrent call (another thread) is only timed
+    profiler = cProfile.Profile() if _profiler_busy.acquire(blocking=False) else None
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    error = None
+    try:
+        if profiler: profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler: profiler.disable()
+    finally:
+        seconds = time.perf_counter() - start
+        _active.depth = 0
+        after = tracemalloc.take_snapshot()
+        if profiler: _profiler_busy.release()
+        _write(seq, name, seconds, profiler, before, after, error)
+
+
+def _write(seq, name, seconds, profiler, before, after, error):
+    base = os.path.join(_session_dir, f"{seq:05d}-{name}")
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+    allocated = sum(stat.size_diff for stat in diff)
+    try:
+        if profiler: profiler.dump_stats(base + ".prof")
+        with open(base + ".alloc", "w", encoding="utf-8") as f:
+            f.write(f"{name}: {allocated / 1024:+.1f} KiB retained\n")
+            for stat in diff[:ALLOC_TOP]:
+                f.write(f"{stat}\n")
+        with _lock, open(os.path.join(_session_dir, "session.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(dict(seq=seq, action=name, seconds=round(seconds, 6),
+                                    alloc_kib=round(allocated / 1024, 1), profiled=profiler is not None,
+                                    thread=threading.current_thread().name, error=error)) + "\n")
+    except OSError as e:
+        print(f"[profile] could not write {base}: {e}")
+
+
+# ---------------------------------------------------------
+# PART 2: SUMMARY
+# ---------------------------------------------------------
+
+def latest_session(directory=None):
+    directory = directory or PROFILE_DIR
+    sessions = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    return os.path.join(directory, sessions[-1]) if sessions else None
+
+
+def summarize(session_dir, top=20, sort="cumulative"):
+    """Prints the time per action and the top functions over every profile of a session."""
+    actions = {}  # action -> [seconds, ...]
+    with open(os.path.join(session_dir, "session.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            actions.setdefault(entry["action"], []).append(entry["seconds"])
+
+    print(f"Session {session_dir}: {sum(map(len, actions.values()))} profiled call(s)\n")
+    print(f"{'action':40} {'calls':>6} {'total s':>9} {'mean ms':>9} {'max ms':>9}")
+    for action, seconds in sorted(actions.items(), key=lambda kv: -sum(kv[1])):
+        print(f"{action:40} {len(seconds):6d} {sum(seconds):9.3f} "
+              f"{1000 * sum(seconds) / len(seconds):9.1f} {1000 * max(seconds):9.1f}")
+
+    profiles = sorted(os.path.join(session_dir, name) for name in os.listdir(session_dir) if name.endswith(".prof"))
+    if profiles:
+        print(f"\nTop {top} functions by {sort} time over {len(profiles)} profile(s):")
+        stats = pstats.Stats(*profiles)
+        stats.strip_dirs().sort_stats(sort).print_stats(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a KSU profiling session")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary = sub.add_parser("summarize", help="Time per action and top hotspots of a session")
+    summary.add_argument("session", nargs="?", help="Session directory (default: the latest one)")
+    summary.add_argument("--top", type=int, default=20)
+    summary.add_argument("--sort", default="cumulative", choices=("cumulative", "tottime", "calls"))
+    args = parser.parse_args()
+
+    session = args.session or latest_session()
+    if not session:
+        raise SystemExit(f"No profiling sessions in {PROFILE_DIR}")
+    summarize(session, args.top, args.sort)
+
+
+if __name__ == '__main__':
+    main()
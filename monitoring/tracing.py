@@ -0,0 +1,170 @@
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+# End-to-end tracing: UI action -> service method -> connection acquire -> SQL execute -> commit.
+# Turn it on with KSU_TRACE=1 (or --trace). Spans are written to KSU_TRACE_FILE in the Chrome
+# trace event format; open the file in chrome://tracing or https://ui.perfetto.dev.
+# The current span lives in a ContextVar, so work submitted with contextvars.copy_context()
+# (see gui/async_loader.py) continues the trace of the action that started it on another thread.
+
+TRACE_FILE = os.getenv("KSU_TRACE_FILE", "ksu_trace.json")
+FLUSH_EVERY = 200  # Buffered events written per file append
+
+_current = contextvars.ContextVar("trace_span", default=None)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_events = []  # Buffered trace events
+_named_threads = set()
+_file = None  # Open trace file; None means tracing is off
+_written = 0  # Events already in the file
+_pid = os.getpid()
+
+
+class _NullSpan:
+    """Returned by span() while tracing is off: entering and leaving it does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed operation. Use it through span(); set() adds attributes while it runs."""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        parent = _current.get()
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.tid = threading.get_ident()
+        self._reset = _current.set(self)
+        self.start_us = time.perf_counter_ns() // 1000
+        if parent and parent.tid != self.tid:
+            # Arrow in the viewer from the parent's thread to the work it handed off
+            _record({"name": "handoff", "cat": "flow", "ph": "s", "id": self.span_id,
+                     "ts": self.start_us, "pid": _pid, "tid": parent.tid})
+            _record({"name": "handoff", "cat": "flow", "ph": "f", "bp": "e", "id": self.span_id,
+                     "ts": self.start_us, "pid": _pid, "tid": self.tid})
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() // 1000 - self.start_us
+        _current.reset(self._reset)
+        args = dict(self.args, span_id=self.span_id, parent_id=self.parent_id, trace_id=self.trace_id)
+        if exc_type is not None:
+            args["error"] = f"{exc_type.__name__}: {exc}"
+        _record({"name": self.name, "cat": self.name.split(".")[0], "ph": "X", "ts": self.start_us,
+                 "dur": duration, "pid": _pid, "tid": self.tid, "args": args})
+        return False
+
+
+def enabled():
+    return _file is not None
+
+
+def span(name, **args):
+    """
+    Context manager timing the block as span `name`, nested under the current span (if any):
+
+        with tracing.span("sql.execute", statement="SELECT ...") as s:
+            ...
+    """
+    if _file is None: return _NULL_SPAN
+    return Span(name, args)
+
+
+def traced(name):
+    """Decorator: runs each call of the function inside span(name)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _file is None: return func(*args, **kwargs)
+            with Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id():
+    current = _current.get()
+    return current.trace_id if current else None
+
+
+# ---------------------------------------------------------
+# PART 1: SETUP
+# ---------------------------------------------------------
+
+def enable(path=None):
+    """Starts writing spans to `path` (default KSU_TRACE_FILE), replacing an older trace file."""
+    global _file
+    if _file: return
+    _file = open(path or TRACE_FILE, "w", encoding="utf-8")
+    _file.write("[\n")
+    atexit.register(close)
+    print(f"[trace] writing spans to {_file.name}")
+
+
+def enable_from_env(argv=()):
+    """Enables tracing when KSU_TRACE=1 or --trace was given, and traces every service method."""
+    if os.getenv("KSU_TRACE") == "1" or "--trace" in argv:
+        enable()
+        from monitoring.instrument import wrap_services
+        wrap_services("trace", lambda label, func: traced(label)(func))
+
+
+def close():
+    """Writes the buffered spans and completes the JSON array."""
+    global _file
+    with _lock:
+        if _file is None: return
+        _flush_locked()
+        _file.write("\n]\n")
+        _file.close()
+        _file = None
+
+
+# ---------------------------------------------------------
+# PART 2: OUTPUT
+# ---------------------------------------------------------
+
+def _record(event):
+    with _lock:
+        if _file is None: return
+        if event["tid"] not in _named_threads:
+            _named_threads.add(event["tid"])
+            name = next((t.name for t in threading.enumerate() if t.ident == event["tid"]), str(event["tid"]))
+            _events.append({"name": "thread_name", "ph": "M", "pid": _pid, "tid": event["tid"],
+                            "args": {"name": name}})
+        _events.append(event)
+        if len(_events) >= FLUSH_EVERY:
+            _flush_locked()
+
+
+def _flush_locked():
+    global _written
+    if not _events: return
+    _file.write((",\n" if _written else "") + ",\n".join(json.dumps(event, default=str) for event in _events))
+    _file.flush()
+    _written += len(_events)
+    _events.clear()
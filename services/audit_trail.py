@@ -0,0 +1,116 @@
+import atexit
+import datetime
+import os
+import socket
+import threading
+import psycopg2
+from psycopg2.extras import execute_values
+from config.db_config import get_db_connection
+from models.rows import AuditEventRow, row_cursor
+
+
+class AuditTrail:
+    """
+    Database-backed audit trail (table audit_events, see database/migrations/003_audit_events.sql).
+    Events are buffered in memory and written by a background thread with one multi-row INSERT
+    every BATCH_SIZE events or FLUSH_INTERVAL_MS milliseconds, whichever comes first.
+    """
+
+    BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+    FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_MS", "500"))
+    MAX_BUFFERED = 10000  # If the DB is unreachable, keep at most this many events in memory
+
+    HOST = socket.gethostname()
+
+    _buffer = []
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _thread = None
+
+    # ---------------------------------------------------------
+    # PART 1: BATCHED WRITER
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def record(actor_id, action, quantity=0, item_id=None, request_no=None):
+        """Queues one audit event (returns immediately)."""
+        event = (datetime.datetime.now(), actor_id, action, item_id, request_no, quantity, AuditTrail.HOST)
+        with AuditTrail._lock:
+            AuditTrail._buffer.append(event)
+            buffered = len(AuditTrail._buffer)
+            if AuditTrail._thread is None:
+                AuditTrail._thread = threading.Thread(target=AuditTrail._run, name="audit-writer", daemon=True)
+                AuditTrail._thread.start()
+        if buffered >= AuditTrail.BATCH_SIZE:
+            AuditTrail._wakeup.set()
+
+    @staticmethod
+    def flush():
+        """Writes every buffered event now. Returns False if the batch could not be written."""
+        with AuditTrail._lock:
+            batch, AuditTrail._buffer = AuditTrail._buffer, []
+        if not batch:
+            return True
+
+        conn = None
+        try:
+            conn = get_db_connection()
+            if conn is None: raise psycopg2.OperationalError("no connection")
+            cursor = conn.cursor()
+            sql = """
+                INSERT INTO audit_events (created_at, actor_id, action, item_id, request_no, quantity, host)
+                VALUES %s
+            """
+            execute_values(cursor, sql, batch, page_size=len(batch))
+            conn.commit()
+            return True
+        except psycopg2.Error as e:
+            print(f"DB Error writing audit events (will retry): {e}")
+            with AuditTrail._lock:
+                # Put the batch back in front of newer events, dropping the oldest beyond the cap
+                AuditTrail._buffer = (batch + AuditTrail._buffer)[-AuditTrail.MAX_BUFFERED:]
+            return False
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def _run():
+        while True:
+            AuditTrail._wakeup.wait(AuditTrail.FLUSH_INTERVAL_MS / 1000)
+            AuditTrail._wakeup.clear()
+            AuditTrail.flush()
+
+    # ---------------------------------------------------------
+    # PART 2: VIEWER QUERIES
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def get_events(actor_id=None, request_no=None, limit=500):
+        """Latest audit events, optionally for one actor and/or one request."""
+        AuditTrail.flush()  # Include this client's own recent actions
+
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return []
+            cursor = row_cursor(conn, AuditEventRow)
+
+            sql = """
+                SELECT created_at, actor_id, action, item_id, request_no, quantity, host
+                FROM audit_events
+                WHERE (%(actor)s IS NULL OR actor_id = %(actor)s)
+                  AND (%(request)s IS NULL OR request_no = %(request)s)
+                ORDER BY created_at DESC
+                LIMIT %(limit)s
+            """
+            cursor.execute(sql, {'actor': actor_id, 'request': request_no, 'limit': limit})
+            return cursor.fetchall()
+        except psycopg2.Error as e:
+            print(f"DB Error fetching audit events: {e}")
+            return []
+        finally:
+            if conn: conn.close()
+
+
+# Don't lose the last partial batch when the application closes
+atexit.register(AuditTrail.flush)
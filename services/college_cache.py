@@ -0,0 +1,80 @@
+import threading
+import psycopg2
+from config.db_config import get_db_connection
+from models.college import College
+from monitoring import metrics
+
+
+class CollegeCache:
+    """
+    Per-college cache of the College window lists (My Requests, My Returns, custody).
+    Each college has a version in college_versions that triggers bump on every change
+    (see database/migrations/005_college_versions.sql). A cached list is reused while the
+    version is unchanged, so re-opening the window costs one primary-key lookup.
+    """
+
+    # kind -> College method, looked up when called (so the monitoring wrappers apply, see monitoring/instrument.py)
+    LOADERS = {
+        'requests': 'get_my_requests',
+        'returns': 'get_my_returns',
+        'custody': 'get_current_custody',
+    }
+
+    _entries = {}  # college_id -> (version, {kind: rows})
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_version(college_id):
+        """Current change counter of a college (0 if it never changed), or None on a DB error."""
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return None
+            cursor = conn.cursor()
+            cursor.execute("SELECT version FROM college_versions WHERE college_id = %s", (college_id,))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        except psycopg2.Error as e:
+            print(f"DB Error checking college version: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def get(college_id, *kinds):
+        """
+        Returns {kind: rows} for the requested kinds ('requests', 'returns', 'custody'),
+        re-running only the queries whose cached result is older than the college's version.
+        """
+        kinds = kinds or tuple(CollegeCache.LOADERS)
+        # Read the version before the data: a write in between only causes one extra reload later
+        version = CollegeCache.get_version(college_id)
+
+        with CollegeCache._lock:
+            cached_version, cached = CollegeCache._entries.get(college_id, (None, {}))
+        # Work on a copy: other loader threads may be reading or filling the shared entry
+        cached = dict(cached) if version is not None and version == cached_version else {}
+
+        college = College(college_id)
+        result = {}
+        for kind in kinds:
+            metrics.cache_lookup(f"college_{kind}", kind in cached)
+            if kind not in cached:
+                cached[kind] = getattr(college, CollegeCache.LOADERS[kind])()
+            result[kind] = cached[kind]
+
+        if version is not None:
+            with CollegeCache._lock:
+                current = CollegeCache._entries.get(college_id)
+                if current is None or current[0] <= version:  # Never replace newer lists with older ones
+                    CollegeCache._entries[college_id] = (version, cached)
+        return result
+
+    @staticmethod
+    def invalidate(college_id=None):
+        """Drops the cached lists of one college (or of all colleges)."""
+        with CollegeCache._lock:
+            if college_id is None:
+                CollegeCache._entries.clear()
+            else:
+                CollegeCache._entries.pop(college_id, None)
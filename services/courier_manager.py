@@ -1,25 +1,103 @@
+import threading
 import psycopg2
 from config.db_config import get_db_connection
 from services.request_manager import RequestManager
 from services.stock_manager import StockManager  # Needed for deliver_return
+from models.rows import CourierRequestRow, row_cursor
+from models.request_status import RequestStatus, transition
+from monitoring import metrics
 
 
 class CourierManager:
+    # The four courier tabs, in workflow order
+    STAGES = (RequestStatus.APPROVED, RequestStatus.PICKED_UP,
+              RequestStatus.RETURN_APPROVED, RequestStatus.RETURN_IN_TRANSIT)
+
+    _queue_cache = {}  # courier_id -> (change counter, queue)
+    _cache_lock = threading.Lock()
+
+    # --- 0. WORK QUEUE (all four stages at once) ---
+    @staticmethod
+    def get_work_queue(courier_id=None):
+        """
+        Everything a courier can act on, from one query: {stage: [CourierRequestRow, ...]} for each of STAGES.
+        Pickups are open to every courier; items already picked up only show for the courier
+        who carries them (all couriers if courier_id is None).
+        The result is cached until any request changes (checked with one small query).
+        """
+        version = CourierManager._change_counter()
+        with CourierManager._cache_lock:
+            cached = CourierManager._queue_cache.get(courier_id)
+        hit = bool(cached and version is not None and cached[0] == version)
+        metrics.cache_lookup("courier_queue", hit)
+        if hit:
+            return cached[1]
+
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return {stage: [] for stage in CourierManager.STAGES}
+            cursor = conn.cursor()
+            sql = """
+                  SELECT r.status_code, r.request_no, u.first_name, i.name, r.quantity, r.request_type, r.purpose_notes
+                  FROM requests r
+                           JOIN users u ON r.college_id = u.id
+                           JOIN items i ON r.item_id = i.item_id
+                  WHERE NOT r.archived
+                    AND (r.status_code IN (%s, %s)
+                         OR (r.status_code IN (%s, %s) AND (%s IS NULL OR r.courier_id = %s)))
+                  ORDER BY r.request_no \
+                  """
+            cursor.execute(sql, (int(RequestStatus.APPROVED), int(RequestStatus.RETURN_APPROVED),
+                                 int(RequestStatus.PICKED_UP), int(RequestStatus.RETURN_IN_TRANSIT),
+                                 courier_id, courier_id))
+            queue = {stage: [] for stage in CourierManager.STAGES}
+            for row in cursor:
+                queue[RequestStatus(row[0])].append(CourierRequestRow._make(row[1:]))
+        except psycopg2.Error as e:
+            print(f"DB Error fetching courier work queue: {e}")
+            return {stage: [] for stage in CourierManager.STAGES}
+        finally:
+            if conn: conn.close()
+
+        if version is not None:
+            with CourierManager._cache_lock:
+                CourierManager._queue_cache[courier_id] = (version, queue)
+        return queue
+
+    @staticmethod
+    def _change_counter():
+        """
+        Grows whenever any request changes: the sum of the per-college versions that the
+        requests triggers bump (database/migrations/005_college_versions.sql). None on a DB error.
+        """
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return None
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(SUM(version), 0) FROM college_versions")
+            return cursor.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"DB Error checking courier queue version: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
     # --- 1. PICKUP REQUEST (Inventory -> Courier) ---
     @staticmethod
     def get_requests_for_pickup():
-        return CourierManager._fetch_requests_by_status('Approved - Ready for Pickup', 'Request')
+        return CourierManager._fetch_requests_by_status(RequestStatus.APPROVED)
 
     @staticmethod
     def pickup_request(request_id, courier_id):
-        return CourierManager._update_status_and_courier(request_id, courier_id,
-                                                         'Approved - Ready for Pickup', 'Picked Up by Courier')
+        return CourierManager._update_status_and_courier(request_id, courier_id, RequestStatus.PICKED_UP)
 
     # --- 2. DELIVER REQUEST (Courier -> College) ---
     @staticmethod
     def get_requests_for_delivery():
         """Get items currently with the courier, heading to college."""
-        return CourierManager._fetch_requests_by_status('Picked Up by Courier', 'Request')
+        return CourierManager._fetch_requests_by_status(RequestStatus.PICKED_UP)
 
     @staticmethod
     def deliver_request(request_id):
@@ -29,19 +107,17 @@ class CourierManager:
             if conn is None: return False
             cursor = conn.cursor()
 
-            # Fetch details to update custody
-            cursor.execute("SELECT item_id, quantity, college_id FROM requests WHERE request_no = %s", (request_id,))
-            req_data = cursor.fetchone()
-            if not req_data: return False
-            item_id, quantity, college_id = req_data
-
-            # Update Status
-            sql_status = "UPDATE requests SET status = 'Delivered to College' WHERE request_no = %s AND status = 'Picked Up by Courier'"
-            cursor.execute(sql_status, (request_id,))
-            if cursor.rowcount == 0: return False
-
-            # Increase College Custody
-            RequestManager.adjust_college_custody(college_id, item_id, quantity)
+            # Update Status (only from Picked Up) and fetch the details needed to update custody
+            result = transition(cursor, request_id, RequestStatus.DELIVERED,
+                                returning=('item_id', 'quantity', 'college_id'))
+            if not result: return False
+            item_id, quantity, college_id, _ = result
+
+            # Increase College Custody (same transaction as the status change)
+            if not RequestManager.adjust_college_custody(college_id, item_id, quantity, conn=conn,
+                                                         reason='Delivered to College', request_no=request_id):
+                conn.rollback()
+                return False
             conn.commit()
             return True
         except psycopg2.Error as e:
@@ -53,18 +129,16 @@ class CourierManager:
     # --- 3. PICKUP RETURN (College -> Courier) ---
     @staticmethod
     def get_returns_for_pickup():
-        return CourierManager._fetch_requests_by_status('Approved - Ready for Pickup (Return)', 'Return')
+        return CourierManager._fetch_requests_by_status(RequestStatus.RETURN_APPROVED)
 
     @staticmethod
     def pickup_return(request_id, courier_id):
-        return CourierManager._update_status_and_courier(request_id, courier_id,
-                                                         'Approved - Ready for Pickup (Return)',
-                                                         'In Transit to Inventory')
+        return CourierManager._update_status_and_courier(request_id, courier_id, RequestStatus.RETURN_IN_TRANSIT)
 
     # --- 4. DELIVER RETURN (Courier -> Inventory) ---
     @staticmethod
     def get_returns_for_delivery():
-        return CourierManager._fetch_requests_by_status('In Transit to Inventory', 'Return')
+        return CourierManager._fetch_requests_by_status(RequestStatus.RETURN_IN_TRANSIT)
 
     @staticmethod
     def deliver_return(request_id):
@@ -74,19 +148,16 @@ class CourierManager:
             if conn is None: return False
             cursor = conn.cursor()
 
-            # Fetch details
-            cursor.execute("SELECT item_id, quantity FROM requests WHERE request_no = %s", (request_id,))
-            req_data = cursor.fetchone()
-            if not req_data: return False
-            item_id, quantity = req_data
+            # Update Status (only from In Transit) and fetch the details
+            result = transition(cursor, request_id, RequestStatus.RETURN_RECEIVED)
+            if not result: return False
+            item_id, quantity, _ = result
 
-            # Update Status
-            sql = "UPDATE requests SET status = 'Received at Inventory' WHERE request_no = %s AND status = 'In Transit to Inventory'"
-            cursor.execute(sql, (request_id,))
-            if cursor.rowcount == 0: return False
-
-            # Increase Central Stock
-            StockManager.adjust_central_stock(item_id, quantity)
+            # Increase Central Stock (same transaction as the status change)
+            if not StockManager.adjust_central_stock(item_id, quantity, conn=conn,
+                                                     reason='Received at Inventory', request_no=request_id):
+                conn.rollback()
+                return False
 
             conn.commit()
             return True
@@ -98,22 +169,21 @@ class CourierManager:
 
     # --- HELPER FUNCTIONS ---
     @staticmethod
-    def _fetch_requests_by_status(status, req_type):
+    def _fetch_requests_by_status(status):
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return []
-            cursor = conn.cursor()
+            cursor = row_cursor(conn, CourierRequestRow)
             sql = """
                   SELECT r.request_no, u.first_name, i.name, r.quantity, r.request_type, r.purpose_notes
                   FROM requests r
                            JOIN users u ON r.college_id = u.id
                            JOIN items i ON r.item_id = i.item_id
-                  WHERE r.status = %s \
-                    AND r.request_type = %s
+                  WHERE NOT r.archived AND r.status_code = %s
                   ORDER BY r.request_no \
                   """
-            cursor.execute(sql, (status, req_type))
+            cursor.execute(sql, (int(status),))
             return cursor.fetchall()
         except psycopg2.Error:
             return []
@@ -121,15 +191,14 @@ class CourierManager:
             if conn: conn.close()
 
     @staticmethod
-    def _update_status_and_courier(request_id, courier_id, current_status, new_status):
+    def _update_status_and_courier(request_id, courier_id, new_status):
         conn = None
         try:
             conn = get_db_connection()
             if conn is None: return False
             cursor = conn.cursor()
-            sql = "UPDATE requests SET status = %s, courier_id = %s WHERE request_no = %s AND status = %s"
-            cursor.execute(sql, (new_status, courier_id, request_id, current_status))
-            if cursor.rowcount == 0: return False
+            if not transition(cursor, request_id, new_status, set_columns={'courier_id': courier_id}):
+                return False
             conn.commit()
             return True
         except psycopg2.Error:
@@ -0,0 +1,275 @@
+import heapq
+import os
+import threading
+from collections import defaultdict
+import psycopg2
+from config.db_config import get_db_connection
+from models.rows import CourierRequestRow, DeliveryRun
+from models.request_status import RequestStatus, transition_many
+from monitoring import metrics
+
+
+class DeliveryScheduler:
+    """
+    Groups open pickups into courier runs.
+    1. Approved requests (to deliver) and approved returns (to collect) are grouped by college,
+       so one trip serves every open request of that college.
+    2. A college whose work exceeds a vehicle load is split into several runs.
+    3. Runs are balanced over the couriers, largest first, each to the courier with the least load so far
+       (counting the units the courier already has in transit).
+    4. Replanning is sticky: a run of the previous plan whose requests are all still open keeps its
+       courier, and only new or left-over pickups are placed, so confirming a run or a new request
+       elsewhere does not reshuffle the other couriers' runs.
+    Planning is O(n log n) in the number of open requests, from one query.
+    The plan is deterministic, so every process derives the same one. It is shared by all callers
+    of current_plan() and recomputed only when a request or the courier list changed.
+    confirm_run() checks a run against it before picking it up.
+    """
+
+    # Units one courier can carry per trip (each way: deliveries out, returns back)
+    RUN_CAPACITY = int(os.getenv("COURIER_RUN_CAPACITY", "50"))
+
+    # Pickup status -> status after the courier confirmed the run
+    PICKUP_MOVES = {
+        RequestStatus.APPROVED: RequestStatus.PICKED_UP,
+        RequestStatus.RETURN_APPROVED: RequestStatus.RETURN_IN_TRANSIT,
+    }
+
+    _plan = None  # (plan version, [DeliveryRun]) of the last plan
+    _plan_lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    # PART 1: DATA
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def fetch_open_pickups():
+        """
+        Returns [(college_id, CourierRequestRow), ...] for every request waiting for a courier,
+        or None on a DB error.
+        """
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return None
+            cursor = conn.cursor()
+            sql = """
+                  SELECT r.college_id, r.request_no, u.first_name, i.name, r.quantity, r.request_type, r.purpose_notes
+                  FROM requests r
+                           JOIN users u ON r.college_id = u.id
+                           JOIN items i ON r.item_id = i.item_id
+                  WHERE NOT r.archived AND r.status_code = ANY(%s)
+                  ORDER BY r.request_no \
+                  """
+            cursor.execute(sql, ([int(status) for status in DeliveryScheduler.PICKUP_MOVES],))
+            return [(row[0], CourierRequestRow._make(row[1:])) for row in cursor]
+        except psycopg2.Error as e:
+            print(f"DB Error fetching open pickups: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def fetch_loads_in_transit():
+        """{courier_id: units picked up and not delivered yet}, or None on a DB error."""
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return None
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT courier_id, SUM(quantity)
+                FROM requests
+                WHERE NOT archived AND status_code = ANY(%s) AND courier_id IS NOT NULL
+                GROUP BY courier_id
+            """, ([int(status) for status in DeliveryScheduler.PICKUP_MOVES.values()],))
+            return {courier_id: int(units) for courier_id, units in cursor}
+        except psycopg2.Error as e:
+            print(f"DB Error fetching loads in transit: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def get_couriers():
+        """IDs of all registered couriers."""
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return []
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM users WHERE user_class = 'Courier' ORDER BY id")
+            return [row[0] for row in cursor]
+        except psycopg2.Error as e:
+            print(f"DB Error fetching couriers: {e}")
+            return []
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def get_plan_version():
+        """
+        (sum of the college versions, courier ids): changes whenever a request changes (the
+        college_versions triggers, see database/migrations/005_college_versions.sql) or a courier
+        is added or removed. None on a DB error.
+        """
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return None
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT (SELECT COALESCE(SUM(version), 0) FROM college_versions),
+                       ARRAY(SELECT id FROM users WHERE user_class = 'Courier' ORDER BY id)
+            """)
+            total, couriers = cursor.fetchone()
+            return total, tuple(couriers)
+        except psycopg2.Error as e:
+            print(f"DB Error checking plan version: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+    # ---------------------------------------------------------
+    # PART 2: PLANNING
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def _split_college(lines, capacity):
+        """
+        Splits one college's lines into runs of at most `capacity` units each way
+        (first-fit decreasing, separately for deliveries and returns; a run pairs one of each).
+        """
+        legs = []
+        for request_type in ('Request', 'Return'):
+            bins = []  # [load, lines]
+            for line in sorted((l for l in lines if l.request_type == request_type), key=lambda l: -l.quantity):
+                for b in bins:
+                    if b[0] + line.quantity <= capacity:
+                        b[0] += line.quantity
+                        b[1].append(line)
+                        break
+                else:
+                    bins.append([line.quantity, [line]])  # A line bigger than a vehicle gets a run of its own
+            legs.append(bins)
+
+        deliveries, returns = legs
+        runs = []
+        for i in range(max(len(deliveries), len(returns))):
+            out_load, out_lines = deliveries[i] if i < len(deliveries) else (0, [])
+            back_load, back_lines = returns[i] if i < len(returns) else (0, [])
+            runs.append((max(out_load, back_load), out_lines + back_lines))
+        return runs
+
+    @staticmethod
+    def plan_runs(couriers=None, capacity=None, pickups=None, in_transit=None, previous=None):
+        """
+        Plans runs for every open pickup and assigns them to `couriers` (default: all couriers).
+        in_transit: {courier_id: units} each courier already carries (see fetch_loads_in_transit).
+        previous: the last plan; its runs that are still fully open keep their courier.
+        Returns a list of DeliveryRun, ordered by courier and then by load (largest first).
+        """
+        capacity = capacity or DeliveryScheduler.RUN_CAPACITY
+        couriers = DeliveryScheduler.get_couriers() if couriers is None else [int(c) for c in couriers]
+        pickups = DeliveryScheduler.fetch_open_pickups() if pickups is None else pickups
+        if not couriers or not pickups: return []
+
+        loads = {courier_id: 0 for courier_id in couriers}
+        for courier_id, units in (in_transit or {}).items():
+            if courier_id in loads: loads[courier_id] += units
+
+        open_lines = {line.request_no: line for _, line in pickups}
+        planned = []
+        for run in previous or ():
+            if run.courier_id in loads and all(line.request_no in open_lines for line in run.lines):
+                planned.append(run._replace(lines=[open_lines.pop(line.request_no) for line in run.lines]))
+                loads[run.courier_id] += run.load
+
+        by_college = defaultdict(list)
+        for college_id, line in pickups:
+            if line.request_no in open_lines:
+                by_college[college_id].append(line)
+
+        runs = []  # (load, college_id, lines)
+        for college_id, lines in by_college.items():
+            for load, run_lines in DeliveryScheduler._split_college(lines, capacity):
+                runs.append((load, college_id, run_lines))
+        runs.sort(key=lambda run: -run[0])
+
+        # Longest-processing-time-first: each run goes to the least loaded courier
+        heap = [(loads[courier_id], index, courier_id) for index, courier_id in enumerate(couriers)]
+        heapq.heapify(heap)
+        for load, college_id, lines in runs:
+            total, index, courier_id = heapq.heappop(heap)
+            planned.append(DeliveryRun(courier_id, college_id, lines[0].college, load,
+                                       sorted(line.request_no for line in lines), lines))
+            heapq.heappush(heap, (total + load, index, courier_id))
+
+        order = {courier_id: index for index, courier_id in enumerate(couriers)}
+        planned.sort(key=lambda run: (order[run.courier_id], -run.load))
+        return planned
+
+    @staticmethod
+    def current_plan():
+        """
+        The runs of all couriers. The last plan is reused while get_plan_version() is unchanged,
+        so couriers refreshing their runs cost one small query instead of a replan each;
+        a replan starts from it (see plan_runs), so existing assignments stay put.
+        """
+        version = DeliveryScheduler.get_plan_version()
+        with DeliveryScheduler._plan_lock:
+            cached = DeliveryScheduler._plan
+        hit = version is not None and cached is not None and cached[0] == version
+        metrics.cache_lookup("delivery_plan", hit)
+        if hit: return cached[1]
+
+        pickups = DeliveryScheduler.fetch_open_pickups()
+        in_transit = DeliveryScheduler.fetch_loads_in_transit()
+        if pickups is None or in_transit is None: return []  # Not cached: the next call tries again
+        couriers = version[1] if version is not None else None
+        runs = DeliveryScheduler.plan_runs(couriers=couriers, pickups=pickups, in_transit=in_transit,
+                                           previous=cached[1] if cached else None)
+        if version is not None:
+            with DeliveryScheduler._plan_lock:
+                DeliveryScheduler._plan = (version, runs)
+        return runs
+
+    @staticmethod
+    def get_runs_for_courier(courier_id):
+        """The runs planned for one courier (the plan covers all couriers, so the work stays balanced)."""
+        courier_id = int(courier_id)
+        return [run for run in DeliveryScheduler.current_plan() if run.courier_id == courier_id]
+
+    # ---------------------------------------------------------
+    # PART 3: CONFIRMATION
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def confirm_run(courier_id, request_nos):
+        """
+        Picks up a whole run in one transaction. The requests must belong to runs the current plan
+        gives this courier, and must all still be waiting for pickup. Otherwise nothing changes
+        and False is returned (the plan changed, or another courier took part of the run).
+        """
+        if not request_nos: return False
+        courier_id = int(courier_id)
+        planned = {request_no for run in DeliveryScheduler.get_runs_for_courier(courier_id)
+                   for request_no in run.request_nos}
+        if not set(request_nos) <= planned: return False
+        conn = None
+        try:
+            conn = get_db_connection()
+            if conn is None: return False
+            cursor = conn.cursor()
+            moved = transition_many(cursor, request_nos, DeliveryScheduler.PICKUP_MOVES,
+                                    set_columns={'courier_id': courier_id})
+            if len(moved) != len(set(request_nos)):
+                conn.rollback()
+                return False
+            conn.commit()
+            return True
+        except psycopg2.Error as e:
+            print(f"DB Error confirming run: {e}")
+            return False
+        finally:
+            if conn: conn.close()
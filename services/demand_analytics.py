@@ -0,0 +1,198 @@
+import datetime
+import numpy as np
+import psycopg2
+from config.db_config import get_db_connection
+from models.rows import ReorderRow
+from models.request_status import RequestStatus
+
+
+class DemandAnalytics:
+    """
+    Demand statistics and reorder-level recommendations computed from request history.
+    The history is fetched in one bulk query and every statistic is computed with NumPy
+    array operations (bincount / unique), so years of requests are processed in seconds.
+    """
+
+    HISTORY_DAYS = 730          # How much request history to analyse
+    DEFAULT_LEAD_DAYS = 7.0     # Used for items that were never delivered yet
+    SERVICE_LEVEL_Z = 1.645     # ~95% chance of not running out during the lead time
+    MIN_REQUESTS_FOR_SEASON = 12  # Fewer requests than this -> no seasonal adjustment
+
+    # ---------------------------------------------------------
+    # PART 1: DATA
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def fetch_history(history_days=HISTORY_DAYS):
+        """
+        Pulls the request history of every item and college in bulk.
+        Returns a dict of NumPy arrays (one entry per request), or None on failure.
+        Lead times come from the stock ledger: request date -> delivery movement.
+        """
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return None
+            cursor = conn.cursor()
+
+            start = datetime.date.today() - datetime.timedelta(days=history_days)
+
+            # Day offsets, months and lead times are computed by the database, so the rows
+            # arrive as plain numbers and convert to one float matrix in a single call.
+            sql = """
+                SELECT r.item_id,
+                       r.college_id,
+                       r.quantity,
+                       (r.request_date::date - %s::date)                                AS day,
+                       EXTRACT(MONTH FROM r.request_date)                                AS month,
+                       EXTRACT(EPOCH FROM d.delivered_at - r.request_date) / 86400.0     AS lead_days
+                FROM requests r
+                LEFT JOIN (SELECT request_no, MIN(created_at) AS delivered_at
+                           FROM stock_movements
+                           WHERE reason = 'Delivered to College'
+                           GROUP BY request_no) d ON d.request_no = r.request_no
+                WHERE r.request_type = 'Request'
+                  AND r.status_code <> %s
+                  AND r.request_date >= %s
+            """
+            cursor.execute(sql, (start, int(RequestStatus.REJECTED), start))
+            rows = cursor.fetchall()
+
+            cursor.execute("SELECT item_id, name, reorder_level, quantity_central FROM items")
+            items = cursor.fetchall()
+        except psycopg2.Error as e:
+            print(f"DB Error fetching demand history: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+        data = np.array(rows, dtype=float).reshape(-1, 6)  # None (no delivery yet) becomes NaN
+        return {
+            'item_id': data[:, 0].astype(np.int64),
+            'college_id': data[:, 1].astype(np.int64),
+            'quantity': data[:, 2],
+            'day': data[:, 3].astype(np.int64),
+            'month': data[:, 4].astype(np.int64) - 1,  # 0 = January
+            'lead_days': data[:, 5],
+            'start': start,
+            'n_days': history_days,
+            'items': {row[0]: row[1:] for row in items},  # item_id -> (name, reorder_level, quantity_central)
+        }
+
+    # ---------------------------------------------------------
+    # PART 2: STATISTICS
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def compute_statistics(history, today=None):
+        """
+        Computes per-item demand statistics from fetch_history() output.
+        Returns a dict of arrays aligned with 'item_id' (one entry per item that has requests).
+        """
+        today = today or datetime.date.today()
+        n_days = history['n_days']
+        qty = history['quantity']
+
+        item_ids, item_idx = np.unique(history['item_id'], return_inverse=True)
+        n_items = len(item_ids)
+
+        # --- Demand rate: mean and variance of daily demand (days without requests count as 0) ---
+        total = np.bincount(item_idx, weights=qty, minlength=n_items)
+        day_keys, day_inv = np.unique(item_idx * (n_days + 1) + history['day'], return_inverse=True)
+        daily_totals = np.bincount(day_inv, weights=qty)
+        sum_sq = np.bincount(day_keys // (n_days + 1), weights=daily_totals ** 2, minlength=n_items)
+        daily_mean = total / n_days
+        daily_var = np.maximum(sum_sq / n_days - daily_mean ** 2, 0.0)
+
+        # --- Seasonality: demand per day in each calendar month relative to the overall rate ---
+        window = np.arange(np.datetime64(history['start']), np.datetime64(history['start']) + n_days)
+        days_per_month = np.bincount(window.astype('datetime64[M]').astype(np.int64) % 12, minlength=12)
+        monthly = np.bincount(item_idx * 12 + history['month'], weights=qty, minlength=n_items * 12)
+        monthly_rate = monthly.reshape(n_items, 12) / np.maximum(days_per_month, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            seasonal = np.where(daily_mean[:, None] > 0, monthly_rate / daily_mean[:, None], 1.0)
+        seasonal[:, days_per_month == 0] = 1.0
+        request_counts = np.bincount(item_idx, minlength=n_items)
+        seasonal[request_counts < DemandAnalytics.MIN_REQUESTS_FOR_SEASON] = 1.0
+        season_factor = seasonal[:, today.month - 1]
+
+        # --- Lead time: request date -> delivery to college ---
+        delivered = ~np.isnan(history['lead_days'])
+        lead = history['lead_days'][delivered]
+        lead_idx = item_idx[delivered]
+        lead_n = np.bincount(lead_idx, minlength=n_items)
+        lead_sum = np.bincount(lead_idx, weights=lead, minlength=n_items)
+        lead_sq = np.bincount(lead_idx, weights=lead ** 2, minlength=n_items)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lead_mean = np.where(lead_n > 0, lead_sum / np.maximum(lead_n, 1), np.nan)
+            lead_var = np.where(lead_n > 1, lead_sq / np.maximum(lead_n, 1) - lead_mean ** 2, 0.0)
+        fallback = np.median(lead) if lead.size else DemandAnalytics.DEFAULT_LEAD_DAYS
+        lead_mean = np.where(np.isnan(lead_mean), fallback, lead_mean)
+        lead_var = np.maximum(lead_var, 0.0)
+
+        # --- Main requesting college per item ---
+        college_ids, college_idx = np.unique(history['college_id'], return_inverse=True)
+        n_colleges = max(len(college_ids), 1)
+        pair_keys, pair_inv = np.unique(item_idx * n_colleges + college_idx, return_inverse=True)
+        pair_qty = np.bincount(pair_inv, weights=qty)
+        pair_item = pair_keys // n_colleges
+        order = np.lexsort((-pair_qty, pair_item))  # by item, biggest demand first
+        first = np.r_[True, pair_item[order][1:] != pair_item[order][:-1]] if order.size else order.astype(bool)
+        top = order[first]
+        top_college = np.zeros(n_items, dtype=np.int64)
+        top_share = np.zeros(n_items)
+        top_college[pair_item[top]] = college_ids[pair_keys[top] % n_colleges]
+        top_share[pair_item[top]] = pair_qty[top] / np.maximum(total[pair_item[top]], 1)
+
+        return {
+            'item_id': item_ids,
+            'daily_mean': daily_mean,
+            'daily_std': np.sqrt(daily_var),
+            'season_factor': season_factor,
+            'lead_mean': lead_mean,
+            'lead_std': np.sqrt(lead_var),
+            'top_college': top_college,
+            'top_share': top_share,
+        }
+
+    @staticmethod
+    def recommend_levels(stats):
+        """
+        Reorder level = expected demand during the lead time + safety stock:
+            d*L + z * sqrt(L*sd^2 + d^2*sL^2), with d adjusted for the current month.
+        """
+        demand = stats['daily_mean'] * stats['season_factor']
+        lead = stats['lead_mean']
+        safety = DemandAnalytics.SERVICE_LEVEL_Z * np.sqrt(
+            lead * stats['daily_std'] ** 2 + demand ** 2 * stats['lead_std'] ** 2)
+        return np.ceil(demand * lead + safety).astype(np.int64)
+
+    # ---------------------------------------------------------
+    # PART 3: DASHBOARD
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def get_reorder_recommendations(history_days=HISTORY_DAYS):
+        """
+        Returns rows for the Dashboard:
+        (item_id, name, current level, recommended level, daily demand, lead days, season factor, main college)
+        Items whose level should change the most come first.
+        """
+        history = DemandAnalytics.fetch_history(history_days)
+        if history is None or history['item_id'].size == 0:
+            return []
+
+        stats = DemandAnalytics.compute_statistics(history)
+        recommended = DemandAnalytics.recommend_levels(stats)
+
+        rows = []
+        for item_id, level, daily, lead, season, college in zip(
+                stats['item_id'].tolist(), recommended.tolist(), stats['daily_mean'].tolist(),
+                stats['lead_mean'].tolist(), stats['season_factor'].tolist(), stats['top_college'].tolist()):
+            if item_id not in history['items']: continue  # Item deleted since
+            name, current_level, _ = history['items'][item_id]
+            rows.append(ReorderRow(item_id, name, current_level, level, round(daily, 2), round(lead, 1),
+                                   round(season, 2), college))
+
+        rows.sort(key=lambda r: -abs(r.recommended_level - (r.reorder_level or 0)))
+        return rows
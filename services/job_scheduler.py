@@ -0,0 +1,247 @@
+import argparse
+import datetime
+import heapq
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+JobRun = namedtuple('JobRun', 'job started_at seconds ok result')
+
+
+class JobScheduler:
+    """
+    Runs periodic maintenance jobs on worker threads, inside the app or standalone
+    (`python -m services.job_scheduler`).
+    - A job never overlaps itself: a run that is still busy when the next one is due is skipped.
+    - The last HISTORY_SIZE runs of every job are kept with their duration and result (see stats()).
+    Intervals come from JOB_<NAME>_SECONDS environment variables; 0 disables a job's schedule.
+    """
+
+    HISTORY_SIZE = 50
+
+    def __init__(self, max_workers=2):
+        self._jobs = {}  # name -> (func, interval seconds)
+        self._running = {}  # name -> Lock held while the job runs
+        self._history = {}  # name -> deque of JobRun
+        self._due = []  # heap of (monotonic due time, name)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ksu-job")
+        self._thread = None
+
+    def add(self, name, func, interval_seconds):
+        """
+        Registers `func` to run every `interval_seconds` (first run one interval from now).
+        With an interval of 0 the job is only run on demand (run_now).
+        """
+        with self._lock:
+            self._jobs[name] = (func, interval_seconds)
+            self._running[name] = threading.Lock()
+            self._history[name] = deque(maxlen=self.HISTORY_SIZE)
+            if interval_seconds > 0:
+                heapq.heappush(self._due, (time.monotonic() + interval_seconds, name))
+        self._wakeup.set()
+
+    # ---------------------------------------------------------
+    # PART 1: RUNNING
+    # ---------------------------------------------------------
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self._executor.shutdown(wait=False)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                now = time.monotonic()
+                due = []
+                while self._due and self._due[0][0] <= now:
+                    _, name = heapq.heappop(self._due)
+                    heapq.heappush(self._due, (now + self._jobs[name][1], name))
+                    due.append(name)
+                wait = self._due[0][0] - now if self._due else None
+            for name in due:
+                self._executor.submit(self.run_now, name)
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def run_now(self, name):
+        """Runs a job on the calling thread. Returns its JobRun, or None if it is already running."""
+        func, _ = self._jobs[name]
+        guard = self._running[name]
+        if not guard.acquire(blocking=False):
+            print(f"[jobs] {name}: previous run still busy, skipped")
+            return None
+        started_at = datetime.datetime.now()
+        start = time.perf_counter()
+        try:
+            result, ok = func(), True
+        except Exception as e:
+            result, ok = f"{type(e).__name__}: {e}", False
+        finally:
+            guard.release()
+        run = JobRun(name, started_at, time.perf_counter() - start, ok, result)
+        with self._lock:
+            self._history[name].append(run)
+        print(f"[jobs] {name}: {'ok' if ok else 'FAILED'} in {run.seconds:.2f}s - {result}")
+        return run
+
+    # ---------------------------------------------------------
+    # PART 2: HISTORY
+    # ---------------------------------------------------------
+
+    def job_names(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def history(self, name):
+        with self._lock:
+            return list(self._history[name])
+
+    def stats(self):
+        """name -> dict(runs, failures, avg_seconds, max_seconds, last_run) over the kept history."""
+        with self._lock:
+            summary = {}
+            for name, runs in self._history.items():
+                seconds = [run.seconds for run in runs]
+                summary[name] = dict(runs=len(runs), failures=sum(not run.ok for run in runs),
+                                     avg_seconds=sum(seconds) / len(seconds) if seconds else 0.0,
+                                     max_seconds=max(seconds, default=0.0),
+                                     last_run=runs[-1].started_at if runs else None)
+            return summary
+
+
+# ---------------------------------------------------------
+# PART 3: MAINTENANCE JOBS
+# ---------------------------------------------------------
+
+TRANSACTION_LOG = "transactions.log"
+LOG_MAX_BYTES = int(os.getenv("JOB_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_KEEP = 5
+
+
+def _interval(name, default_seconds):
+    return int(os.getenv(f"JOB_{name.upper()}_SECONDS", str(default_seconds)))
+
+
+def run_backup():
+    from services.stock_manager import StockManager
+    success, msg = StockManager.backup_database()
+    if not success: raise RuntimeError(msg)
+    return msg
+
+
+def run_ledger_snapshot():
+    from services.stock_ledger import StockLedger
+    snapshot = StockLedger.snapshot_if_due()
+    return f"snapshot {snapshot} taken" if snapshot else "no snapshot needed"
+
+
+def refresh_dashboard_aggregates():
+    """
+    Recomputes the dashboard panels into this machine's snapshot file (services/snapshot_store.py),
+    so the next dashboard opened here starts from them. It only refreshes that local cache, so it is
+    scheduled inside the app and left out of the standalone scheduler (see default_scheduler).
+    """
+    from services.stock_manager import StockManager
+    from services.demand_analytics import DemandAnalytics
+    from services.snapshot_store import SnapshotStore
+    panels = {
+        'alerts': StockManager.get_low_stock_alerts,
+        'custody': StockManager.get_all_college_custody,
+        'reorder': DemandAnalytics.get_reorder_recommendations,
+    }
+    for key, fetch in panels.items():
+        SnapshotStore.put(f"manager/{key}", fetch())
+    return f"{len(panels)} panels refreshed"
+
+
+def rotate_transaction_log(path=TRANSACTION_LOG, max_bytes=None, keep=LOG_KEEP):
+    """
+    Renames the log to .1 (shifting older ones up to .keep) once it grows past max_bytes.
+    Each file's index (services/log_index.py) moves with it, so rotated history stays searchable
+    through query_history().
+    """
+    from services.log_index import TransactionLogIndex
+    max_bytes = LOG_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.exists(path) or os.path.getsize(path) < max_bytes:
+        return "not rotated"
+    index = TransactionLogIndex(path)
+    try:
+        index.update()  # Lines appended after this are picked up by the .1 index on its next query
+    finally:
+        index.close()
+    for i in range(keep - 1, 0, -1):
+        for suffix in ("", ".idx"):
+            if os.path.exists(f"{path}.{i}{suffix}"):
+                os.replace(f"{path}.{i}{suffix}", f"{path}.{i + 1}{suffix}")
+    os.replace(path, f"{path}.1")  # Writers reopen the log for every append, so nothing is lost
+    os.replace(f"{path}.idx", f"{path}.1.idx")
+    return f"rotated to {path}.1"
+
+
+def evaluate_low_stock():
+    """Re-checks every item's alert; writes are already evaluated per item, this catches drift."""
+    from services.stock_alerts import StockAlerts
+    events = StockAlerts.reconcile()
+    if events is None: raise RuntimeError("alert evaluation failed, see the DB error above")
+    return f"{events} alert change(s) found"
+
+
+def archive_closed_requests():
+    from services.request_archive import RequestArchive
+    moved = RequestArchive.archive_closed()
+    if moved is None: raise RuntimeError("archival failed, see the DB error above")
+    return f"{moved} closed request(s) archived"
+
+
+def default_scheduler(headless=False):
+    """
+    Scheduler with the standard maintenance jobs and their configured intervals.
+    headless: for `python -m services.job_scheduler` on a server, without the dashboard job
+    (it only refreshes the local snapshot, which no client would read).
+    """
+    scheduler = JobScheduler()
+    scheduler.add("backup", run_backup, _interval("backup", 24 * 3600))
+    scheduler.add("ledger_snapshot", run_ledger_snapshot, _interval("ledger_snapshot", 3600))
+    if not headless:
+        scheduler.add("dashboard", refresh_dashboard_aggregates, _interval("dashboard", 900))
+    scheduler.add("log_rotation", rotate_transaction_log, _interval("log_rotation", 3600))
+    scheduler.add("low_stock", evaluate_low_stock, _interval("low_stock", 300))
+    scheduler.add("request_archive", archive_closed_requests, _interval("request_archive", 24 * 3600))
+    return scheduler
+
+
+def main():
+    scheduler = default_scheduler(headless=True)
+    parser = argparse.ArgumentParser(description="Periodic maintenance jobs for the KSU inventory")
+    parser.add_argument("--once", metavar="JOB", choices=scheduler.job_names(),
+                        help="Run one job now and exit: " + ", ".join(scheduler.job_names()))
+    args = parser.parse_args()
+
+    if args.once:
+        run = scheduler.run_now(args.once)
+        raise SystemExit(0 if run and run.ok else 1)
+
+    from monitoring import metrics
+    metrics.start_from_env()  # KSU_METRICS_PORT: expose the jobs' database metrics as well
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == '__main__':
+    main()
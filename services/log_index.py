@@ -0,0 +1,171 @@
+import argparse
+import mmap
+import os
+import re
+import sqlite3
+
+# One record per line, as written by RequestManager._log_transaction:
+# [2025-12-06 21:06:50] Actor: 123456 | Action: Create Request | Item/Req: 5 | Qty: 10
+LOG_LINE = re.compile(
+    rb"^\[(?P<time>[\d\- :]+)\] Actor: (?P<actor>.*?) \| Action: (?P<action>.*?) \| "
+    rb"Item/Req: (?P<ref>.*?) \| Qty: (?P<qty>.*?)\r?$")
+
+
+class TransactionLogIndex:
+    """
+    Sidecar index for transactions.log, so audit lookups seek straight to matching records.
+    1. The index (an SQLite file next to the log) maps actor, action, item/request ref and
+       hour bucket to the byte offsets of the matching lines.
+    2. update() only parses the bytes appended since the last run.
+    3. query() intersects the postings and reads just those lines through mmap.
+    Rotated logs (transactions.log.1, .2, ...) keep their own index, renamed along with them
+    (see rotate_transaction_log in services/job_scheduler.py); query_history() searches all of them.
+    """
+
+    def __init__(self, log_path="transactions.log", index_path=None):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + ".idx"
+        self.db = sqlite3.connect(self.index_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 1),
+                                             indexed_bytes INTEGER NOT NULL, head BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS postings (kind TEXT NOT NULL, key TEXT NOT NULL, offset INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS idx_postings ON postings (kind, key, offset);
+        """)
+
+    def close(self):
+        self.db.close()
+
+    # ---------------------------------------------------------
+    # PART 1: INDEXING
+    # ---------------------------------------------------------
+
+    def _head(self):
+        """First bytes of the log; if they change the log was rotated and is re-indexed."""
+        with open(self.log_path, "rb") as f:
+            return f.read(64)
+
+    def update(self):
+        """Indexes the lines appended since the last update. Returns the number of new records."""
+        if not os.path.exists(self.log_path):
+            return 0
+
+        head = self._head()
+        row = self.db.execute("SELECT indexed_bytes, head FROM meta WHERE id = 1").fetchone()
+        start = 0
+        if row:
+            indexed_bytes, indexed_head = row
+            if os.path.getsize(self.log_path) >= indexed_bytes and head[:len(indexed_head)] == indexed_head:
+                start = indexed_bytes
+            else:
+                self.db.execute("DELETE FROM postings")  # Rotated or truncated: start over
+
+        postings = []
+        offset = start
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"): break  # Line still being written; pick it up next time
+                match = LOG_LINE.match(line.rstrip(b"\n"))
+                if match:
+                    time = match.group("time").decode()
+                    postings += [
+                        ("actor", match.group("actor").decode("utf-8", "replace"), offset),
+                        ("action", match.group("action").decode("utf-8", "replace"), offset),
+                        ("ref", match.group("ref").decode("utf-8", "replace"), offset),
+                        ("hour", time[:13], offset),  # "YYYY-MM-DD HH"
+                    ]
+                offset += len(line)
+
+        with self.db:
+            self.db.executemany("INSERT INTO postings (kind, key, offset) VALUES (?, ?, ?)", postings)
+            self.db.execute("INSERT OR REPLACE INTO meta (id, indexed_bytes, head) VALUES (1, ?, ?)",
+                            (offset, head[:min(64, offset)]))
+        return len(postings) // 4
+
+    # ---------------------------------------------------------
+    # PART 2: QUERYING
+    # ---------------------------------------------------------
+
+    def _matching_offsets(self, actor, action, ref, since, until):
+        parts, params = [], []
+        for kind, key in (("actor", actor), ("action", action), ("ref", ref)):
+            if key is not None:
+                parts.append("SELECT offset FROM postings WHERE kind = ? AND key = ?")
+                params += [kind, str(key)]
+        if since or until:
+            # Hour buckets narrow the range; exact times are checked on the records themselves
+            parts.append("SELECT offset FROM postings WHERE kind = 'hour' AND key BETWEEN ? AND ?")
+            params += [(since or "0000")[:13], (until or "9999")[:13] + "~"]  # "~" sorts after " HH"
+        if not parts:
+            parts.append("SELECT offset FROM postings WHERE kind = 'hour'")
+        sql = " INTERSECT ".join(parts) + " ORDER BY offset"
+        return [row[0] for row in self.db.execute(sql, params)]
+
+    def query(self, actor=None, action=None, ref=None, since=None, until=None):
+        """
+        Returns the matching log lines (oldest first). All filters are optional and combined with AND.
+        since / until are "YYYY-MM-DD[ HH:MM:SS]" strings.
+        """
+        self.update()
+        offsets = self._matching_offsets(actor, action, ref, since, until)
+        if not offsets:
+            return []
+
+        records = []
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in offsets:
+                end = mm.find(b"\n", offset)
+                line = mm[offset:end].decode("utf-8", "replace").rstrip("\r")
+                time = line[1:20]
+                if since and time < since: continue
+                if until and time[:len(until)] > until: continue
+                records.append(line)
+        return records
+
+
+def rotated_paths(log_path="transactions.log"):
+    """The rotated copies of the log (log_path.1, .2, ...) that exist, oldest first."""
+    directory, name = os.path.split(log_path)
+    numbers = [int(entry[len(name) + 1:]) for entry in os.listdir(directory or ".")
+               if entry.startswith(name + ".") and entry[len(name) + 1:].isdigit()]
+    return [f"{log_path}.{number}" for number in sorted(numbers, reverse=True)]
+
+
+def query_history(log_path="transactions.log", **filters):
+    """Same as TransactionLogIndex.query() over the rotated logs and the current one, oldest first."""
+    records = []
+    for path in rotated_paths(log_path) + [log_path]:
+        index = TransactionLogIndex(path)
+        try:
+            records += index.query(**filters)
+        finally:
+            index.close()
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed audit lookups over transactions.log")
+    parser.add_argument("command", choices=["update", "query"])
+    parser.add_argument("--log", default="transactions.log", help="Path of the transaction log")
+    parser.add_argument("--actor", help="User ID that performed the action")
+    parser.add_argument("--action", help='Exact action, e.g. "Create Request"')
+    parser.add_argument("--ref", help="Item ID or request number")
+    parser.add_argument("--since", help='"YYYY-MM-DD[ HH:MM:SS]"')
+    parser.add_argument("--until", help='"YYYY-MM-DD[ HH:MM:SS]"')
+    args = parser.parse_args()
+
+    index = TransactionLogIndex(args.log)
+    try:
+        if args.command == "update":
+            print(f"Indexed {index.update()} new records.")
+        else:
+            for line in query_history(args.log, actor=args.actor, action=args.action, ref=args.ref,
+                                      since=args.since, until=args.until):
+                print(line)
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import datetime
+import os
+import psycopg2
+from config.db_config import get_db_connection
+from models.request_status import CLOSED_STATUSES
+
+
+class RequestArchive:
+    """
+    Moves closed requests (Delivered / Received / Rejected) older than the retention window
+    from requests_hot to the yearly requests_archive partitions
+    (see database/migrations/007_partition_requests.sql).
+    Active queries filter on NOT archived and so never read archived rows;
+    pass include_archived=True to the history functions to see them.
+    """
+
+    RETENTION_DAYS = int(os.getenv("REQUEST_RETENTION_DAYS", "365"))
+    BATCH_SIZE = 5000  # Rows moved per transaction, so row locks are held briefly
+
+    @staticmethod
+    def archive_closed(retention_days=None, batch_size=None):
+        """
+        Archives every closed request dated before today - retention_days.
+        Returns the number of requests moved, or None on a DB error.
+        """
+        retention_days = RequestArchive.RETENTION_DAYS if retention_days is None else retention_days
+        batch_size = batch_size or RequestArchive.BATCH_SIZE
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+        closed = [int(status) for status in CLOSED_STATUSES]
+
+        conn = None
+        try:
+            conn = get_db_connection()
+            if conn is None: return None
+            cursor = conn.cursor()
+
+            # Every year that can reach the archive below, including requests closed while it runs:
+            # archived rows with a date must land in a year partition (the default one only takes NULL dates)
+            cursor.execute("""
+                SELECT DISTINCT EXTRACT(YEAR FROM request_date)::int
+                FROM requests
+                WHERE NOT archived AND request_date < %s
+            """, (cutoff,))
+            for (year,) in cursor.fetchall():
+                RequestArchive._ensure_year_partition(cursor, year)
+            conn.commit()
+
+            moved = 0
+            while True:
+                # SKIP LOCKED: a request someone is working on right now is archived next time
+                cursor.execute("""
+                    UPDATE requests SET archived = TRUE
+                    WHERE NOT archived AND request_no IN (
+                        SELECT request_no FROM requests
+                        WHERE NOT archived AND status_code = ANY(%s) AND request_date < %s
+                        ORDER BY request_no
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED)
+                """, (closed, cutoff, batch_size))
+                conn.commit()
+                moved += cursor.rowcount
+                if cursor.rowcount < batch_size: break
+            return moved
+        except psycopg2.Error as e:
+            print(f"DB Error archiving requests: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def _ensure_year_partition(cursor, year):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS requests_archive_{int(year)} PARTITION OF requests_archive
+            FOR VALUES FROM ('{int(year)}-01-01') TO ('{int(year) + 1}-01-01')
+        """)
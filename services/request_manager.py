@@ -1,31 +1,54 @@
 import psycopg2
 import datetime
+from psycopg2.extras import execute_values
 from config.db_config import get_db_connection
+from services.stock_ledger import StockLedger
+from services.audit_trail import AuditTrail
+from models.rows import PendingRequestRow, row_cursor
+from models.request_status import RequestStatus, transition
 
 
 class RequestManager:
     @staticmethod
     def create_request(college_id, item_id, quantity, purpose, request_type='Request'):
+        return bool(RequestManager.create_requests_bulk(college_id, [(item_id, quantity, purpose)], request_type))
+
+    @staticmethod
+    def create_requests_bulk(college_id, lines, request_type='Request'):
+        """
+        Creates several requests (a college's cart) with one multi-row INSERT in one transaction.
+        lines: [(item_id, quantity, purpose), ...]
+        Returns the new request_nos in line order, or [] if nothing was created.
+        """
+        if not lines: return []
         conn = None
         try:
             conn = get_db_connection()
-            if conn is None: return False
+            if conn is None: return []
             cursor = conn.cursor()
 
-            initial_status = 'Pending'
+            initial_status = int(RequestStatus.PENDING)
+            now = datetime.datetime.now()
             sql = """
-                  INSERT INTO requests (college_id, item_id, quantity, purpose_notes, status, request_type, \
+                  INSERT INTO requests (college_id, item_id, quantity, purpose_notes, status_code, request_type, \
                                         request_date)
-                  VALUES (%s, %s, %s, %s, %s, %s, %s) \
+                  VALUES %s
+                  RETURNING request_no \
                   """
-            now = datetime.datetime.now()
-            cursor.execute(sql, (college_id, item_id, quantity, purpose, initial_status, request_type, now))
+            values = [(college_id, item_id, quantity, purpose, initial_status, request_type, now)
+                      for item_id, quantity, purpose in lines]
+            # request_no is a serial, so sorting restores the VALUES order
+            request_nos = sorted(row[0] for row in execute_values(cursor, sql, values, page_size=len(values),
+                                                                  fetch=True))
             conn.commit()
-            RequestManager._log_transaction(college_id, "Create " + request_type, item_id, quantity)
-            return True
+            RequestManager._log_transactions([
+                (college_id, "Create " + request_type, item_id, quantity, item_id, request_no)
+                for (item_id, quantity, _), request_no in zip(lines, request_nos)
+            ])
+            return request_nos
         except psycopg2.Error as e:
             print(f"DB Error creating request: {e}")
-            return False
+            return []
         finally:
             if conn: conn.close()
 
@@ -33,17 +56,17 @@ class RequestManager:
     def get_pending_requests():
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return []
-            cursor = conn.cursor()
+            cursor = row_cursor(conn, PendingRequestRow)
             sql = """
                   SELECT r.request_no, u.first_name, i.name, r.quantity, r.purpose_notes, r.request_type
                   FROM requests r
                            JOIN users u ON r.college_id = u.id
                            JOIN items i ON r.item_id = i.item_id
-                  WHERE r.status = 'Pending' \
+                  WHERE NOT r.archived AND r.status_code = %s \
                   """
-            cursor.execute(sql)
+            cursor.execute(sql, (int(RequestStatus.PENDING),))
             return cursor.fetchall()
         except psycopg2.Error as e:
             print(f"DB Error fetching pending: {e}")
@@ -53,16 +76,21 @@ class RequestManager:
 
     @staticmethod
     def update_request_status(request_id, new_status, reason=None, manager_id=None):
+        """
+        Moves a request to `new_status` (a RequestStatus) if the lifecycle allows it.
+        No stock is touched; use process_approval / process_rejection for manager decisions.
+        """
         conn = None
         try:
             conn = get_db_connection()
             if conn is None: return False
             cursor = conn.cursor()
-            sql = "UPDATE requests SET status = %s, rejection_reason = %s WHERE request_no = %s"
-            cursor.execute(sql, (new_status, reason, request_id))
+            if not transition(cursor, request_id, new_status, set_columns={'rejection_reason': reason}):
+                return False
             conn.commit()
             if manager_id:
-                RequestManager._log_transaction(manager_id, f"Set Status: {new_status}", request_id, 0)
+                RequestManager._log_transaction(manager_id, f"Set Status: {new_status.label}", request_id, 0,
+                                                request_no=request_id)
             return True
         except psycopg2.Error as e:
             print(f"DB Error updating status: {e}")
@@ -72,37 +100,96 @@ class RequestManager:
 
     @staticmethod
     def process_approval(request_id, new_status, manager_id):
+        """
+        Approves a Pending request in a single transaction.
+        new_status is RequestStatus.APPROVED for requests, RequestStatus.RETURN_APPROVED for returns.
+        For item requests the stock is reserved with a conditional decrement; if there is not
+        enough stock (or the request was already processed) nothing is changed and False is returned.
+        """
         from services.stock_manager import StockManager
 
-        conn = get_db_connection()
-        if not conn: return False
+        conn = None
         try:
+            conn = get_db_connection()
+            if conn is None: return False
             cursor = conn.cursor()
-            cursor.execute("SELECT item_id, quantity, request_type FROM requests WHERE request_no = %s", (request_id,))
-            result = cursor.fetchone()
-            if not result: return False
-            item_id, qty, req_type = result
-
-            # Decrease Central Stock for Requests
-            if req_type == 'Request' and 'Approved' in new_status:
-                if not StockManager.adjust_central_stock(item_id, -qty):
-                    return False
 
-            # Update Status
-            if not RequestManager.update_request_status(request_id, new_status, manager_id=manager_id):
+            # Claim the request: only a Pending request can be approved, so it is never approved twice
+            result = transition(cursor, request_id, new_status, sources=[RequestStatus.PENDING],
+                                set_columns={'rejection_reason': None})
+            if not result:
+                conn.rollback()
                 return False
+            item_id, qty, _ = result
+
+            # Decrease Central Stock for Requests (fails instead of going negative)
+            if new_status == RequestStatus.APPROVED:
+                if not StockManager.reserve_central_stock(item_id, qty, conn=conn, request_no=request_id):
+                    conn.rollback()
+                    return False
+
+            conn.commit()
+            RequestManager._log_transaction(manager_id, f"Set Status: {new_status.label}", request_id, 0,
+                                            item_id=item_id, request_no=request_id)
             return True
+        except psycopg2.Error as e:
+            print(f"DB Error processing approval: {e}")
+            return False
         finally:
-            conn.close()
+            if conn: conn.close()
 
     @staticmethod
-    def adjust_college_custody(college_id, item_id, quantity_change):
+    def process_rejection(request_id, reason, manager_id):
+        """
+        Rejects a request that has not been picked up yet.
+        If an item request had already been approved, its reserved stock is released
+        in the same transaction.
+        """
+        from services.stock_manager import StockManager
+
         conn = None
         try:
             conn = get_db_connection()
             if conn is None: return False
             cursor = conn.cursor()
 
+            # Allowed from Pending or Approved (not yet picked up), see models/request_status.py
+            result = transition(cursor, request_id, RequestStatus.REJECTED,
+                                set_columns={'rejection_reason': reason})
+            if not result:
+                conn.rollback()
+                return False
+            item_id, qty, old_status = result
+
+            # Stock is only reserved once an item request is approved
+            if old_status == RequestStatus.APPROVED:
+                if not StockManager.release_central_stock(item_id, qty, conn=conn, request_no=request_id):
+                    conn.rollback()
+                    return False
+
+            conn.commit()
+            RequestManager._log_transaction(manager_id, f"Set Status: {RequestStatus.REJECTED.label}", request_id, 0,
+                                            item_id=item_id, request_no=request_id)
+            return True
+        except psycopg2.Error as e:
+            print(f"DB Error processing rejection: {e}")
+            return False
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def adjust_college_custody(college_id, item_id, quantity_change, conn=None, reason='Adjustment', request_no=None):
+        """
+        Updates a college's custody balance and records the movement in the stock ledger.
+        If `conn` is given, the update joins the caller's transaction (the caller commits).
+        """
+        own_conn = conn is None
+        try:
+            if own_conn:
+                conn = get_db_connection()
+                if conn is None: return False
+            cursor = conn.cursor()
+
             # FIX: Changed 'quantity_custody' to 'quantity'
             sql_update = """
                          UPDATE inventory_stock
@@ -120,27 +207,41 @@ class RequestManager:
                              """
                 cursor.execute(sql_insert, (college_id, item_id, quantity_change))
 
-            conn.commit()
+            StockLedger.record_movement(cursor, item_id, college_id, quantity_change, reason, request_no)
+            if own_conn: conn.commit()
             return True
         except psycopg2.Error as e:
             print(f"DB Error adjusting college custody: {e}")
             return False
         finally:
-            if conn: conn.close()
+            if own_conn and conn: conn.close()
+
+    @staticmethod
+    def _log_transaction(actor_id, action, item_ref, quantity, item_id=None, request_no=None):
+        """
+        Helper to append to transactions.log and queue the same event for the audit_events table.
+        item_ref is what the log line shows; item_id / request_no link the audit event.
+        """
+        RequestManager._log_transactions([(actor_id, action, item_ref, quantity, item_id, request_no)])
 
     @staticmethod
-    def _log_transaction(actor_id, action, item_ref, quantity):
+    def _log_transactions(entries):
         """
-        Helper to append to transactions.log
+        Same as _log_transaction for several events, written with one append to transactions.log.
+        entries: [(actor_id, action, item_ref, quantity, item_id, request_no), ...]
         """
+        for actor_id, action, _, quantity, item_id, request_no in entries:
+            AuditTrail.record(actor_id, action, quantity, item_id=item_id, request_no=request_no)
         try:
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_entry = f"[{timestamp}] Actor: {actor_id} | Action: {action} | Item/Req: {item_ref} | Qty: {quantity}\n"
+            log_entries = "".join(
+                f"[{timestamp}] Actor: {actor_id} | Action: {action} | Item/Req: {item_ref} | Qty: {quantity}\n"
+                for actor_id, action, item_ref, quantity, _, _ in entries)
 
             # Using 'utf-8' encoding is safer across different OSs
             with open("transactions.log", "a", encoding="utf-8") as f:
-                f.write(log_entry)
+                f.write(log_entries)
 
         except Exception as e:
             # Print the error instead of silently passing
-            print(f"CRITICAL ERROR: Failed to write to transaction log! Reason: {e}")
\ No newline at end of file
+            print(f"CRITICAL ERROR: Failed to write to transaction log! Reason: {e}")
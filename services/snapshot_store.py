@@ -0,0 +1,127 @@
+import datetime
+import decimal
+import json
+import os
+import threading
+from models import rows as row_models
+from models.inventory_item import InventoryItem
+from monitoring import metrics
+
+
+class SnapshotStore:
+    """
+    Last-seen results of the main lists, kept in a local JSON file so a window can paint
+    immediately on startup and then revalidate against the database (see FanOutLoader.load).
+    Keys are strings such as "manager/pending" or "college/<user id>/lists".
+    Rows keep their type: namedtuples from models.rows and InventoryItem objects are restored as such.
+    """
+
+    PATH = os.getenv("KSU_SNAPSHOT_PATH", "ksu_snapshot.json")
+
+    # Row classes that can be stored, by name. Each is rebuilt with cls(*values).
+    ROW_TYPES = {name: cls for name, cls in vars(row_models).items()
+                 if isinstance(cls, type) and issubclass(cls, tuple) and hasattr(cls, '_fields')}
+    ROW_TYPES['InventoryItem'] = InventoryItem
+
+    _data = None
+    _lock = threading.Lock()
+    _dirty = False
+    _writer = None
+
+    @staticmethod
+    def get(key):
+        """Returns the stored value for `key`, or None if there is none."""
+        with SnapshotStore._lock:
+            if SnapshotStore._data is None:
+                SnapshotStore._data = SnapshotStore._read()
+            encoded = SnapshotStore._data.get(key)
+        metrics.cache_lookup("snapshot", encoded is not None)
+        try:
+            return None if encoded is None else SnapshotStore._decode(encoded)
+        except (KeyError, TypeError, ValueError):
+            return None  # Written by an older version of the app
+
+    @staticmethod
+    def put(key, value):
+        """Stores `value` under `key`; the file is rewritten on a background thread."""
+        encoded = SnapshotStore._encode(value)
+        with SnapshotStore._lock:
+            if SnapshotStore._data is None:
+                SnapshotStore._data = SnapshotStore._read()
+            if SnapshotStore._data.get(key) == encoded: return  # Unchanged: no rewrite
+            SnapshotStore._data[key] = encoded
+            SnapshotStore._dirty = True
+            if SnapshotStore._writer is None:
+                SnapshotStore._writer = threading.Thread(target=SnapshotStore._write, name="snapshot-writer",
+                                                         daemon=True)
+                SnapshotStore._writer.start()
+
+    # ---------------------------------------------------------
+    # PART 1: FILE
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def _read():
+        try:
+            with open(SnapshotStore.PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}  # Missing or damaged snapshot: start empty, the DB is the source of truth
+
+    @staticmethod
+    def _write():
+        # Several puts in a row are written once; the file is replaced atomically
+        while True:
+            with SnapshotStore._lock:
+                if not SnapshotStore._dirty:
+                    SnapshotStore._writer = None
+                    return
+                SnapshotStore._dirty = False
+                text = json.dumps(SnapshotStore._data, separators=(",", ":"))
+            try:
+                tmp_path = SnapshotStore.PATH + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp_path, SnapshotStore.PATH)
+            except OSError as e:
+                print(f"Error writing snapshot file: {e}")
+
+    # ---------------------------------------------------------
+    # PART 2: ENCODING
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, tuple) and hasattr(value, '_fields'):
+            return {"row": type(value).__name__, "v": [SnapshotStore._encode(v) for v in value]}
+        if isinstance(value, InventoryItem):
+            return {"row": "InventoryItem", "v": [SnapshotStore._encode(getattr(value, name))
+                                                  for name in InventoryItem.__slots__]}
+        if isinstance(value, (list, tuple)):
+            return [SnapshotStore._encode(v) for v in value]
+        if isinstance(value, dict):
+            # As [key, value] pairs, so non-string keys keep their type
+            return {"dict": [[SnapshotStore._encode(k), SnapshotStore._encode(v)] for k, v in value.items()]}
+        if isinstance(value, datetime.datetime):
+            return {"dt": value.isoformat()}
+        if isinstance(value, datetime.date):
+            return {"d": value.isoformat()}
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+        return value
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, list):
+            return [SnapshotStore._decode(v) for v in value]
+        if isinstance(value, dict):
+            if "row" in value:
+                return SnapshotStore.ROW_TYPES[value["row"]](*[SnapshotStore._decode(v) for v in value["v"]])
+            if "dict" in value:
+                return {SnapshotStore._decode(k): SnapshotStore._decode(v) for k, v in value["dict"]}
+            if "dt" in value:
+                return datetime.datetime.fromisoformat(value["dt"])
+            if "d" in value:
+                return datetime.date.fromisoformat(value["d"])
+        return value
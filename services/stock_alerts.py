@@ -0,0 +1,114 @@
+import psycopg2
+from config.db_config import get_db_connection
+from models.rows import AlertEventRow, row_cursor
+
+
+class StockAlerts:
+    """
+    Low-stock alert state (tables stock_alerts / stock_alert_events, see
+    database/migrations/006_stock_alerts.sql).
+    evaluate() is called for the one item a transaction touched, so no code path scans all items;
+    the Manager window polls get_events_after() to be told when an item crosses its level.
+    reconcile() re-checks the whole catalog, as a periodic safety net (low_stock job).
+    """
+
+    RECONCILE_BATCH = 5000  # Items re-checked per statement by reconcile()
+
+    # One statement: upsert or clear the item's alert, and log an event only when its state flips
+    EVALUATE_SQL = """
+        WITH item AS (
+            SELECT item_id, quantity_central, reorder_level FROM items WHERE item_id = ANY(%s)
+        ),
+        low AS (
+            INSERT INTO stock_alerts (item_id, quantity_central, reorder_level)
+            SELECT item_id, quantity_central, reorder_level FROM item WHERE quantity_central <= reorder_level
+            ON CONFLICT (item_id) DO UPDATE
+                SET quantity_central = EXCLUDED.quantity_central, reorder_level = EXCLUDED.reorder_level
+            RETURNING item_id, quantity_central, reorder_level, (xmax = 0) AS is_new
+        ),
+        recovered AS (
+            DELETE FROM stock_alerts a USING item
+            WHERE a.item_id = item.item_id AND item.quantity_central > item.reorder_level
+            RETURNING a.item_id, item.quantity_central, item.reorder_level
+        )
+        INSERT INTO stock_alert_events (item_id, kind, quantity, reorder_level)
+        SELECT item_id, 'crossed', quantity_central, reorder_level FROM low WHERE is_new
+        UNION ALL
+        SELECT item_id, 'recovered', quantity_central, reorder_level FROM recovered
+    """
+
+    @staticmethod
+    def evaluate(cursor, item_id):
+        """Re-checks one item inside the caller's transaction (after its quantity or level changed)."""
+        cursor.execute(StockAlerts.EVALUATE_SQL, ([item_id],))
+
+    @staticmethod
+    def evaluate_many(cursor, item_ids):
+        """Same as evaluate() for several items, still with one statement (bulk imports, restores)."""
+        if item_ids: cursor.execute(StockAlerts.EVALUATE_SQL, (list(item_ids),))
+
+    @staticmethod
+    def reconcile():
+        """
+        Re-evaluates every item, fixing alerts that drifted from the items table (changes made
+        outside the services, e.g. by hand in psql). Returns the number of alert events written
+        (items that crossed below their reorder level or recovered above it), or None on a DB error.
+        """
+        conn = None
+        try:
+            conn = get_db_connection()
+            if conn is None: return None
+            cursor = conn.cursor()
+            cursor.execute("SELECT item_id FROM items ORDER BY item_id")
+            item_ids = [row[0] for row in cursor.fetchall()]
+            events = 0
+            for start in range(0, len(item_ids), StockAlerts.RECONCILE_BATCH):
+                StockAlerts.evaluate_many(cursor, item_ids[start:start + StockAlerts.RECONCILE_BATCH])
+                events += cursor.rowcount
+                conn.commit()
+            return events
+        except psycopg2.Error as e:
+            print(f"DB Error reconciling stock alerts: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def get_latest_event_id():
+        """ID of the newest alert event (0 if none), used as the starting point for polling."""
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return None
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(event_id), 0) FROM stock_alert_events")
+            return cursor.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"DB Error fetching latest alert event: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def get_events_after(event_id, limit=100):
+        """Alert events newer than `event_id`, oldest first (a primary-key range scan)."""
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return []
+            cursor = row_cursor(conn, AlertEventRow)
+            sql = """
+                SELECT e.event_id, e.created_at, e.item_id, i.name, e.kind, e.quantity, e.reorder_level
+                FROM stock_alert_events e
+                JOIN items i ON i.item_id = e.item_id
+                WHERE e.event_id > %s
+                ORDER BY e.event_id
+                LIMIT %s
+            """
+            cursor.execute(sql, (event_id, limit))
+            return cursor.fetchall()
+        except psycopg2.Error as e:
+            print(f"DB Error fetching alert events: {e}")
+            return []
+        finally:
+            if conn: conn.close()
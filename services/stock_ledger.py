@@ -0,0 +1,252 @@
+import psycopg2
+from psycopg2.extras import execute_values
+from config.db_config import get_db_connection
+from models.rows import BalanceRow, CustodyOverviewRow, MovementRow, row_cursor
+
+
+class StockLedger:
+    """
+    Append-only history of stock movements (see database/migrations/001_stock_ledger.sql).
+    1. Movements are recorded by the stock adjusting methods, inside their own transaction.
+    2. Balance snapshots are taken periodically, so as-of queries only replay recent movements.
+    """
+
+    # A new snapshot is due once this many movements were written after the last one
+    SNAPSHOT_EVERY_MOVEMENTS = 5000
+
+    # ---------------------------------------------------------
+    # PART 1: WRITING
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def record_movement(cursor, item_id, college_id, quantity_change, reason, request_no=None):
+        """
+        Appends one movement using the caller's cursor (same transaction as the balance update).
+        college_id=None means the central warehouse.
+        """
+        sql = """
+            INSERT INTO stock_movements (item_id, college_id, quantity_change, reason, request_no)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        cursor.execute(sql, (item_id, college_id, quantity_change, reason, request_no))
+
+    @staticmethod
+    def record_movements(cursor, movements):
+        """
+        Appends several movements with one multi-row INSERT, using the caller's cursor.
+        movements: [(item_id, college_id, quantity_change, reason, request_no), ...]
+        """
+        if not movements: return
+        sql = """
+            INSERT INTO stock_movements (item_id, college_id, quantity_change, reason, request_no)
+            VALUES %s
+        """
+        execute_values(cursor, sql, movements, page_size=1000)
+
+    @staticmethod
+    def take_snapshot():
+        """
+        Stores the current balance of every item in the warehouse and at every college.
+        Returns the new snapshot_id, or None on failure.
+        """
+        conn = None
+        try:
+            conn = get_db_connection()
+            if conn is None: return None
+            cursor = conn.cursor()
+
+            # SHARE mode waits for in-flight stock changes to commit and holds new ones back
+            # for the duration of the copy, so the balances match last_movement_id exactly.
+            # taken_at is read after the lock (clock_timestamp, not the transaction start that now()
+            # returns): movements committed while we waited are then never later than the snapshot.
+            cursor.execute("LOCK TABLE stock_movements IN SHARE MODE")
+            cursor.execute("""
+                INSERT INTO stock_snapshots (taken_at, last_movement_id)
+                SELECT clock_timestamp(), COALESCE(MAX(movement_id), 0) FROM stock_movements
+                RETURNING snapshot_id
+            """)
+            snapshot_id = cursor.fetchone()[0]
+
+            sql = """
+                INSERT INTO stock_snapshot_balances (snapshot_id, item_id, college_id, quantity)
+                SELECT %s, item_id, NULL, quantity_central FROM items
+                UNION ALL
+                SELECT %s, item_id, college_id, quantity FROM inventory_stock
+            """
+            cursor.execute(sql, (snapshot_id, snapshot_id))
+            conn.commit()
+            return snapshot_id
+        except psycopg2.Error as e:
+            print(f"DB Error taking stock snapshot: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def snapshot_if_due():
+        """
+        Takes a snapshot when enough movements piled up since the last one.
+        Meant to be run periodically (e.g. `python -m services.stock_ledger` from cron).
+        """
+        conn = None
+        try:
+            conn = get_db_connection()
+            if conn is None: return None
+            cursor = conn.cursor()
+
+            sql = """
+                SELECT COUNT(*) FROM stock_movements
+                WHERE movement_id > (SELECT COALESCE(MAX(last_movement_id), 0) FROM stock_snapshots)
+            """
+            cursor.execute(sql)
+            pending = cursor.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"DB Error checking stock snapshot: {e}")
+            return None
+        finally:
+            if conn: conn.close()
+
+        if pending < StockLedger.SNAPSHOT_EVERY_MOVEMENTS:
+            return None
+        return StockLedger.take_snapshot()
+
+    # ---------------------------------------------------------
+    # PART 2: AS-OF QUERIES
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def get_balances_as_of(as_of, college_id=None, item_id=None):
+        """
+        Returns (item_id, name, quantity) held at a location on a given date/time.
+        college_id=None means the central warehouse; item_id narrows the result to one item.
+        Starts from the nearest snapshot taken before `as_of` and replays only the movements after it.
+        """
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return []
+            cursor = row_cursor(conn, BalanceRow)
+
+            sql = """
+                WITH snap AS (
+                    SELECT snapshot_id, last_movement_id
+                    FROM stock_snapshots
+                    WHERE taken_at <= %(as_of)s
+                    ORDER BY taken_at DESC
+                    LIMIT 1
+                ),
+                base AS (
+                    SELECT b.item_id, b.quantity
+                    FROM stock_snapshot_balances b
+                    JOIN snap ON b.snapshot_id = snap.snapshot_id
+                    WHERE b.college_id IS NOT DISTINCT FROM %(college_id)s
+                ),
+                delta AS (
+                    SELECT m.item_id, SUM(m.quantity_change) AS quantity
+                    FROM stock_movements m
+                    WHERE m.movement_id > COALESCE((SELECT last_movement_id FROM snap), 0)
+                      AND m.created_at <= %(as_of)s
+                      AND m.college_id IS NOT DISTINCT FROM %(college_id)s
+                    GROUP BY m.item_id
+                )
+                SELECT i.item_id, i.name, COALESCE(base.quantity, 0) + COALESCE(delta.quantity, 0)
+                FROM items i
+                LEFT JOIN base ON base.item_id = i.item_id
+                LEFT JOIN delta ON delta.item_id = i.item_id
+                WHERE (base.item_id IS NOT NULL OR delta.item_id IS NOT NULL)
+                  AND (%(item_id)s IS NULL OR i.item_id = %(item_id)s)
+                ORDER BY i.name
+            """
+            cursor.execute(sql, {'as_of': as_of, 'college_id': college_id, 'item_id': item_id})
+            return cursor.fetchall()
+        except psycopg2.Error as e:
+            print(f"DB Error fetching balances as of {as_of}: {e}")
+            return []
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def get_custody_as_of(as_of):
+        """
+        Same rows as StockManager.get_all_college_custody() (college, item, quantity), as they stood
+        at `as_of`: every college's non-zero balances, from the nearest snapshot plus the movements after it.
+        """
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return []
+            cursor = row_cursor(conn, CustodyOverviewRow)
+
+            sql = """
+                WITH snap AS (
+                    SELECT snapshot_id, last_movement_id
+                    FROM stock_snapshots
+                    WHERE taken_at <= %(as_of)s
+                    ORDER BY taken_at DESC
+                    LIMIT 1
+                ),
+                base AS (
+                    SELECT b.college_id, b.item_id, b.quantity
+                    FROM stock_snapshot_balances b
+                    JOIN snap ON b.snapshot_id = snap.snapshot_id
+                    WHERE b.college_id IS NOT NULL
+                ),
+                delta AS (
+                    SELECT m.college_id, m.item_id, SUM(m.quantity_change) AS quantity
+                    FROM stock_movements m
+                    WHERE m.movement_id > COALESCE((SELECT last_movement_id FROM snap), 0)
+                      AND m.created_at <= %(as_of)s
+                      AND m.college_id IS NOT NULL
+                    GROUP BY m.college_id, m.item_id
+                ),
+                balance AS (
+                    SELECT COALESCE(base.college_id, delta.college_id) AS college_id,
+                           COALESCE(base.item_id, delta.item_id) AS item_id,
+                           COALESCE(base.quantity, 0) + COALESCE(delta.quantity, 0) AS quantity
+                    FROM base
+                    FULL JOIN delta ON delta.college_id = base.college_id AND delta.item_id = base.item_id
+                )
+                SELECT u.first_name, i.name, balance.quantity
+                FROM balance
+                JOIN users u ON u.id = balance.college_id
+                JOIN items i ON i.item_id = balance.item_id
+                WHERE balance.quantity > 0
+                ORDER BY u.first_name, i.name
+            """
+            cursor.execute(sql, {'as_of': as_of})
+            return cursor.fetchall()
+        except psycopg2.Error as e:
+            print(f"DB Error fetching custody as of {as_of}: {e}")
+            return []
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def get_movements(item_id, college_id=None, since=None, until=None):
+        """Returns the movement history of one item at one location, oldest first."""
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return []
+            cursor = row_cursor(conn, MovementRow)
+
+            sql = """
+                SELECT movement_id, created_at, quantity_change, reason, request_no
+                FROM stock_movements
+                WHERE item_id = %s AND college_id IS NOT DISTINCT FROM %s
+                  AND (%s IS NULL OR created_at >= %s)
+                  AND (%s IS NULL OR created_at <= %s)
+                ORDER BY movement_id
+            """
+            cursor.execute(sql, (item_id, college_id, since, since, until, until))
+            return cursor.fetchall()
+        except psycopg2.Error as e:
+            print(f"DB Error fetching stock movements: {e}")
+            return []
+        finally:
+            if conn: conn.close()
+
+
+if __name__ == '__main__':
+    snapshot = StockLedger.snapshot_if_due()
+    print(f" Snapshot {snapshot} taken." if snapshot else " No snapshot needed.")
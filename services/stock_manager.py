@@ -1,6 +1,10 @@
 import psycopg2
 import csv
+from psycopg2.extras import execute_values
 from config.db_config import get_db_connection
+from services.stock_ledger import StockLedger
+from services.stock_alerts import StockAlerts
+from models.rows import ItemRow, AlertRow, CollegeCustodyRow, CustodyOverviewRow, row_cursor
 
 
 class StockManager:
@@ -30,8 +34,13 @@ class StockManager:
             sql = """
                 INSERT INTO items (name, category, unit, quantity_central, reorder_level)
                 VALUES (%s, %s, %s, %s, %s)
+                RETURNING item_id
             """
             cursor.execute(sql, (name, category, unit, initial_quantity, reorder_level))
+            item_id = cursor.fetchone()[0]
+            if initial_quantity:
+                StockLedger.record_movement(cursor, item_id, None, initial_quantity, 'Initial stock')
+            StockAlerts.evaluate(cursor, item_id)
             conn.commit()
             return True
         except psycopg2.Error as e:
@@ -41,15 +50,46 @@ class StockManager:
             if conn: conn.close()
 
     @staticmethod
-    def get_all_items(filter_category=None):
+    def add_items_bulk(items):
         """
-        Retrieves items for the list or dashboard.
+        Adds several items in one transaction (all or nothing), e.g. from a CSV import.
+        items: [(name, category, unit, initial_quantity, reorder_level), ...]
+        Returns the new item_ids in input order, or [] on failure.
         """
+        if not items: return []
         conn = None
         try:
             conn = get_db_connection()
             if conn is None: return []
             cursor = conn.cursor()
+            sql = """
+                INSERT INTO items (name, category, unit, quantity_central, reorder_level)
+                VALUES %s
+                RETURNING item_id
+            """
+            # item_id is a serial, so sorting restores the VALUES order
+            item_ids = sorted(row[0] for row in execute_values(cursor, sql, items, page_size=len(items), fetch=True))
+            StockLedger.record_movements(cursor, [(item_id, None, item[3], 'Initial stock', None)
+                                                  for item_id, item in zip(item_ids, items) if item[3]])
+            StockAlerts.evaluate_many(cursor, item_ids)
+            conn.commit()
+            return item_ids
+        except psycopg2.Error as e:
+            print(f"DB Error adding items: {e}")
+            return []
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def get_all_items(filter_category=None):
+        """
+        Retrieves items for the list or dashboard.
+        """
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return []
+            cursor = row_cursor(conn, ItemRow)
 
             # FIX: Explicitly selecting columns to match Manager Window treeview order
             # (ID, Name, Cat, Unit, Lvl, Qty)
@@ -67,10 +107,103 @@ class StockManager:
         finally:
             if conn: conn.close()
 
+    # Columns the Item Master can be sorted by (whitelist: names are put into the SQL text)
+    ITEM_COLUMNS = ('item_id', 'name', 'category', 'unit', 'reorder_level', 'quantity_central')
+    # Nullable text columns sort (and page) as '' so a NULL never ends up in the keyset cursor
+    ITEM_NULLABLE_COLUMNS = ('category', 'unit')
+    ITEM_PAGE_SIZE = 200
+
+    @staticmethod
+    def search_items(search=None, category=None, unit=None, below_reorder=False,
+                     sort_by='item_id', descending=False, after=None, page_size=ITEM_PAGE_SIZE):
+        """
+        Server-side search, filter, sort and paging for the Item Master.
+        - search: substring or fuzzy (pg_trgm) match on the item name.
+        - category / unit: exact filters; below_reorder: only items at or below their reorder level.
+        - Paging is keyset based: pass the `after` cursor returned with the previous page.
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
+        if sort_by not in StockManager.ITEM_COLUMNS:
+            raise ValueError(f"Cannot sort items by '{sort_by}'")
+
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return [], None
+            cursor = row_cursor(conn, ItemRow)
+
+            conditions = []
+            params = []
+            if search:
+                # ILIKE and the similarity operator (%) are both served by the trigram index
+                pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                conditions.append("(name ILIKE %s OR name %% %s)")
+                params += [pattern, search]
+            if category:
+                conditions.append("category = %s")
+                params.append(category)
+            if unit:
+                conditions.append("unit = %s")
+                params.append(unit)
+            if below_reorder:
+                conditions.append("quantity_central <= reorder_level")
+            nullable = sort_by in StockManager.ITEM_NULLABLE_COLUMNS
+            sort_key = f"COALESCE({sort_by}, '')" if nullable else sort_by
+            if after is not None:
+                # (NULL, id) > (x, id) is NULL, not true: the sort key must never be NULL
+                conditions.append(f"({sort_key}, item_id) {'<' if descending else '>'} (%s, %s)")
+                params += list(after)
+
+            direction = "DESC" if descending else "ASC"
+            sql = f"""
+                SELECT item_id, name, category, unit, reorder_level, quantity_central
+                FROM items
+                {"WHERE " + " AND ".join(conditions) if conditions else ""}
+                ORDER BY {sort_key} {direction}, item_id {direction}
+                LIMIT %s
+            """
+            cursor.execute(sql, params + [page_size + 1])  # One extra row tells if there is a next page
+            rows = cursor.fetchall()
+
+            if len(rows) <= page_size:
+                return rows, None
+            rows = rows[:page_size]
+            last = rows[-1]
+            value = getattr(last, sort_by)
+            return rows, ('' if nullable and value is None else value, last.item_id)
+        except psycopg2.Error as e:
+            print(f"DB Error searching items: {e}")
+            return [], None
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def update_reorder_level(item_id, reorder_level):
+        """
+        Sets a new reorder level for an item (e.g. from the Dashboard recommendations).
+        """
+        conn = None
+        try:
+            conn = get_db_connection()
+            if conn is None: return False
+            cursor = conn.cursor()
+            cursor.execute("UPDATE items SET reorder_level = %s WHERE item_id = %s", (reorder_level, item_id))
+            if cursor.rowcount == 0: return False
+            StockAlerts.evaluate(cursor, item_id)
+            conn.commit()
+            return True
+        except psycopg2.Error as e:
+            print(f"DB Error updating reorder level: {e}")
+            return False
+        finally:
+            if conn: conn.close()
+
     @staticmethod
     def delete_item(item_id):
         """
         Deletes an item from the master list.
+        Its stock movements go with it (ON DELETE CASCADE) and its snapshot balances are removed
+        here, so as-of queries no longer report it.
         """
         conn = None
         try:
@@ -80,6 +213,7 @@ class StockManager:
 
             # FIX: Changed 'id' to 'item_id'
             cursor.execute("DELETE FROM items WHERE item_id = %s", (item_id,))
+            cursor.execute("DELETE FROM stock_snapshot_balances WHERE item_id = %s", (item_id,))
             conn.commit()
             return True
         except psycopg2.Error as e:
@@ -93,39 +227,89 @@ class StockManager:
     # ---------------------------------------------------------
 
     @staticmethod
-    def adjust_central_stock(item_id, quantity_change):
+    def adjust_central_stock(item_id, quantity_change, conn=None, reason='Adjustment', request_no=None):
         """
-        Updates the quantity in the central warehouse.
+        Updates the quantity in the central warehouse and records the movement in the stock ledger.
+        If `conn` is given, the update joins the caller's transaction (the caller commits).
         """
-        conn = None
+        own_conn = conn is None
         try:
-            conn = get_db_connection()
-            if conn is None: return False
+            if own_conn:
+                conn = get_db_connection()
+                if conn is None: return False
             cursor = conn.cursor()
 
             # FIX: Changed 'id' to 'item_id'
             sql = "UPDATE items SET quantity_central = quantity_central + %s WHERE item_id = %s"
             cursor.execute(sql, (quantity_change, item_id))
-            conn.commit()
+            if cursor.rowcount == 0: return False
+            StockLedger.record_movement(cursor, item_id, None, quantity_change, reason, request_no)
+            StockAlerts.evaluate(cursor, item_id)
+            if own_conn: conn.commit()
             return True
         except psycopg2.Error as e:
             print(f"DB Error adjusting central stock: {e}")
             return False
         finally:
-            if conn: conn.close()
+            if own_conn and conn: conn.close()
+
+    @staticmethod
+    def reserve_central_stock(item_id, quantity, conn=None, request_no=None):
+        """
+        Takes `quantity` out of central stock only if that much is on hand.
+        The check and the decrement are one conditional UPDATE, so concurrent approvals of the
+        same item queue on the item's row lock and can never drive the balance negative.
+        Returns False when stock is insufficient.
+        """
+        own_conn = conn is None
+        try:
+            if own_conn:
+                conn = get_db_connection()
+                if conn is None: return False
+            cursor = conn.cursor()
+
+            sql = """
+                UPDATE items SET quantity_central = quantity_central - %s
+                WHERE item_id = %s AND quantity_central >= %s
+            """
+            cursor.execute(sql, (quantity, item_id, quantity))
+            if cursor.rowcount == 0: return False
+            StockLedger.record_movement(cursor, item_id, None, -quantity, 'Reserved for approval', request_no)
+            StockAlerts.evaluate(cursor, item_id)
+            if own_conn: conn.commit()
+            return True
+        except psycopg2.Error as e:
+            print(f"DB Error reserving central stock: {e}")
+            return False
+        finally:
+            if own_conn and conn: conn.close()
+
+    @staticmethod
+    def release_central_stock(item_id, quantity, conn=None, request_no=None):
+        """
+        Puts previously reserved stock back into the central warehouse (e.g. approval cancelled).
+        """
+        return StockManager.adjust_central_stock(item_id, quantity, conn=conn,
+                                                 reason='Reservation released', request_no=request_no)
 
     @staticmethod
     def get_low_stock_alerts():
         """
         Returns items where current quantity is below reorder level.
+        Reads the alert state table kept up to date by StockAlerts.evaluate (no scan of items).
         """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return []
-            cursor = conn.cursor()
+            cursor = row_cursor(conn, AlertRow)
 
-            sql = "SELECT name, quantity_central, reorder_level FROM items WHERE quantity_central <= reorder_level"
+            sql = """
+                SELECT i.name, a.quantity_central, a.reorder_level
+                FROM stock_alerts a
+                JOIN items i ON i.item_id = a.item_id
+                ORDER BY a.since
+            """
             cursor.execute(sql)
             return cursor.fetchall()
         except psycopg2.Error as e:
@@ -141,9 +325,9 @@ class StockManager:
         """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return []
-            cursor = conn.cursor()
+            cursor = row_cursor(conn, CollegeCustodyRow)
 
             # FIX: Joined with inventory_stock and used 'item_id'
             sql = """
@@ -164,23 +348,24 @@ class StockManager:
     # PART 3: BACKUP
     # ---------------------------------------------------------
 
+    # Tables in the backup file, in an order that satisfies their foreign keys on restore
+    BACKUP_TABLES = ['users', 'items', 'requests', 'inventory_stock']
+
     @staticmethod
-    def backup_database():
+    def backup_database(path='backup.csv'):
         """
         Exports the entire central DB tables to CSV.
         """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return False, "Connection Failed"
             cursor = conn.cursor()
 
-            tables = ['users', 'items', 'requests', 'inventory_stock']
-
-            with open('backup.csv', 'w', newline='') as f:
+            with open(path, 'w', newline='') as f:
                 writer = csv.writer(f)
 
-                for table in tables:
+                for table in StockManager.BACKUP_TABLES:
                     try:
                         cursor.execute(f"SELECT * FROM {table}")
                         rows = cursor.fetchall()
@@ -193,13 +378,104 @@ class StockManager:
                     except psycopg2.Error:
                         continue
 
-            return True, "Backup created successfully as backup.csv"
+            return True, f"Backup created successfully as {path}"
 
         except Exception as e:
             return False, f"Backup Error: {e}"
         finally:
             if conn: conn.close()
 
+    @staticmethod
+    def restore_database(path='backup.csv'):
+        """
+        Loads a file written by backup_database() into a fresh database (schema and migrations applied,
+        backup tables empty), in one transaction. Archived requests come back as hot rows and are
+        archived again by the next request_archive job. The restored balances are entered in the
+        stock ledger as opening movements and the low-stock alerts are recomputed.
+        Returns (success, message).
+        """
+        try:
+            sections = StockManager._read_backup(path)
+        except (OSError, csv.Error, ValueError) as e:
+            return False, f"Restore Error: {e}"
+
+        conn = None
+        try:
+            conn = get_db_connection()
+            if conn is None: return False, "Connection Failed"
+            cursor = conn.cursor()
+
+            tables = [table for table in StockManager.BACKUP_TABLES if sections.get(table)]
+            for table in tables:
+                cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+                if cursor.fetchone()[0]:
+                    return False, f"Table {table} is not empty: restore only into a fresh database"
+
+            restored = []
+            for table in tables:
+                columns, rows = sections[table]
+                rows = [[None if value == '' else value for value in row] for row in rows]
+                if table == 'requests' and 'archived' in columns:
+                    archived = columns.index('archived')
+                    for row in rows: row[archived] = False
+                sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+                execute_values(cursor, sql, rows, page_size=1000)
+                # Serial ids continue after the restored ones
+                cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", (table, columns[0]))
+                sequence = cursor.fetchone()[0]
+                if sequence and rows:
+                    cursor.execute(f"SELECT setval(%s, (SELECT MAX({columns[0]}) FROM {table}))", (sequence,))
+                restored.append(f"{len(rows)} {table}")
+
+            cursor.execute("""
+                SELECT item_id, NULL::integer, quantity_central, 'Restored from backup', NULL::integer
+                FROM items WHERE quantity_central <> 0
+                UNION ALL
+                SELECT item_id, college_id, quantity, 'Restored from backup', NULL::integer
+                FROM inventory_stock WHERE quantity <> 0
+            """)
+            StockLedger.record_movements(cursor, cursor.fetchall())
+            cursor.execute("SELECT item_id FROM items")
+            StockAlerts.evaluate_many(cursor, [row[0] for row in cursor.fetchall()])
+            conn.commit()
+            return True, "Restored " + ", ".join(restored)
+        except psycopg2.Error as e:
+            return False, f"Restore Error: {e}"
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def _read_backup(path):
+        """Parses a backup file into {table: (columns, rows)}; only the known backup tables are accepted."""
+        sections = {}
+        table = None
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                if len(row) == 1 and row[0].startswith("--- TABLE: ") and row[0].endswith(" ---"):
+                    table = row[0][len("--- TABLE: "):-len(" ---")]
+                    if table not in StockManager.BACKUP_TABLES:
+                        raise ValueError(f"unknown table {table!r} in backup")
+                    sections[table] = None
+                elif not row or table is None:
+                    continue
+                elif sections[table] is None:
+                    if not all(column.isidentifier() for column in row):
+                        raise ValueError(f"bad column list for {table}")
+                    sections[table] = (row, [])
+                else:
+                    sections[table][1].append(row)
+        return {table: section for table, section in sections.items() if section}
+
+    # Join to get College Name (from users) and Item Name
+    CUSTODY_OVERVIEW_SQL = """
+          SELECT u.first_name, i.name, s.quantity
+          FROM inventory_stock s
+                   JOIN users u ON s.college_id = u.id
+                   JOIN items i ON s.item_id = i.item_id
+          WHERE s.quantity > 0
+          ORDER BY u.first_name \
+          """
+
     @staticmethod
     def get_all_college_custody():
         """
@@ -208,23 +484,34 @@ class StockManager:
         """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(read_only=True)
             if conn is None: return []
-            cursor = conn.cursor()
-
-            # Join to get College Name (from users) and Item Name
-            sql = """
-                  SELECT u.first_name, i.name, s.quantity
-                  FROM inventory_stock s
-                           JOIN users u ON s.college_id = u.id
-                           JOIN items i ON s.item_id = i.item_id
-                  WHERE s.quantity > 0
-                  ORDER BY u.first_name \
-                  """
-            cursor.execute(sql)
+            cursor = row_cursor(conn, CustodyOverviewRow)
+            cursor.execute(StockManager.CUSTODY_OVERVIEW_SQL)
             return cursor.fetchall()
         except psycopg2.Error as e:
             print(f"DB Error fetching all custody: {e}")
             return []
+        finally:
+            if conn: conn.close()
+
+    @staticmethod
+    def iter_all_college_custody(batch_size=500):
+        """
+        Same rows as get_all_college_custody(), yielded in lists of `batch_size` from a server-side
+        cursor, so the first rows can be shown before the rest is transferred (see TableLoader.stream).
+        """
+        conn = None
+        try:
+            conn = get_db_connection(read_only=True)
+            if conn is None: return
+            cursor = row_cursor(conn, CustodyOverviewRow, name="custody_overview")
+            cursor.execute(StockManager.CUSTODY_OVERVIEW_SQL)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows: break
+                yield rows
+        except psycopg2.Error as e:
+            print(f"DB Error streaming all custody: {e}")
         finally:
             if conn: conn.close()
\ No newline at end of file
@@ -0,0 +1,43 @@
+import pytest
+
+from services.stock_manager import StockManager
+
+
+def write(tmp_path, text):
+    path = tmp_path / "backup.csv"
+    path.write_text(text)
+    return str(path)
+
+
+def test_sections_are_parsed_per_table(tmp_path):
+    path = write(tmp_path, "--- TABLE: items ---\n"
+                           "item_id,name,category,unit,reorder_level,quantity_central\n"
+                           '1,"Pens, blue",Office,box,10,40\n'
+                           "2,Desk,,piece,5,3\n"
+                           "\n"
+                           "--- TABLE: requests ---\n"
+                           "request_no,item_id\n"
+                           "\n")
+    sections = StockManager._read_backup(path)
+    columns, rows = sections["items"]
+    assert columns == ["item_id", "name", "category", "unit", "reorder_level", "quantity_central"]
+    assert rows == [["1", "Pens, blue", "Office", "box", "10", "40"], ["2", "Desk", "", "piece", "5", "3"]]
+    assert sections["requests"] == (["request_no", "item_id"], [])
+
+
+def test_table_without_a_column_list_is_left_out(tmp_path):
+    path = write(tmp_path, "--- TABLE: users ---\n\n--- TABLE: items ---\nitem_id\n7\n")
+    assert StockManager._read_backup(path) == {"items": (["item_id"], [["7"]])}
+
+
+def test_unknown_table_is_rejected(tmp_path):
+    path = write(tmp_path, "--- TABLE: pg_authid ---\nrolname\npostgres\n")
+    with pytest.raises(ValueError, match="unknown table"):
+        StockManager._read_backup(path)
+
+
+def test_column_names_must_be_identifiers(tmp_path):
+    # Column names are put into the INSERT text, so anything else is refused
+    path = write(tmp_path, "--- TABLE: items ---\nitem_id,name); DROP TABLE items; --\n1,x\n")
+    with pytest.raises(ValueError, match="bad column list"):
+        StockManager._read_backup(path)
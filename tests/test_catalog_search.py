@@ -0,0 +1,65 @@
+from collections import namedtuple
+
+from models.catalog_search import CatalogSearchIndex
+
+# Only the attributes the index reads (InventoryItem has the same ones)
+Item = namedtuple('Item', 'id name category unit')
+
+CATALOG = [
+    Item(1, "Dell Optiplex Desktop", "IT", "piece"),
+    Item(2, "Desk Lamp", "Furniture", "piece"),
+    Item(3, "Office Desk", "Furniture", "piece"),
+    Item(4, "Printer Paper A4", "Stationery", "box"),
+    Item(5, "Projector", "IT", "piece"),
+    Item(12, "Whiteboard Marker", "Stationery", "box"),
+]
+
+
+def names(items):
+    return [item.name for item in items]
+
+
+def test_empty_query_lists_catalog_in_name_order():
+    index = CatalogSearchIndex(CATALOG)
+    assert names(index.search("", limit=3)) == ["Dell Optiplex Desktop", "Desk Lamp", "Office Desk"]
+
+
+def test_exact_id_comes_first():
+    index = CatalogSearchIndex(CATALOG)
+    assert index.search("12")[0].id == 12
+
+
+def test_name_prefix_ranks_before_word_prefix():
+    # "Desk Lamp" starts with the query; "Office Desk" and "Dell Optiplex Desktop" only have a word starting with it
+    index = CatalogSearchIndex(CATALOG)
+    result = names(index.search("desk"))
+    assert result[0] == "Desk Lamp"
+    assert set(result[1:]) == {"Office Desk", "Dell Optiplex Desktop"}
+
+
+def test_every_query_word_must_prefix_a_word():
+    index = CatalogSearchIndex(CATALOG)
+    assert names(index.search("del opti")) == ["Dell Optiplex Desktop"]
+    assert names(index.search("desk furn")) == ["Desk Lamp", "Office Desk"]  # Category words count too
+
+
+def test_misspelled_word_matches_fuzzily():
+    index = CatalogSearchIndex(CATALOG)
+    assert names(index.search("projecter"))[0] == "Projector"
+    assert names(index.search("whitebord")) == ["Whiteboard Marker"]
+
+
+def test_fuzzy_matches_rank_by_similarity():
+    index = CatalogSearchIndex(CATALOG)
+    result = names(index.search("printr papper"))
+    assert result[0] == "Printer Paper A4"
+
+
+def test_no_match_returns_nothing():
+    index = CatalogSearchIndex(CATALOG)
+    assert index.search("zzzz") == []
+
+
+def test_limit_is_respected():
+    index = CatalogSearchIndex(CATALOG)
+    assert len(index.search("d", limit=2)) == 2
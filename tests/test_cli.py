@@ -0,0 +1,63 @@
+import datetime
+from collections import namedtuple
+
+import pytest
+
+import cli
+
+Row = namedtuple('Row', 'name quantity')
+
+
+def exit_code(argv):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(argv)
+    return exc.value.code
+
+
+def test_usage_errors_exit_2():
+    assert exit_code([]) == 2
+    assert exit_code(["approve", "--manager", "1"]) == 2  # Neither request numbers nor --all-pending
+    assert exit_code(["reject", "5", "--manager", "1"]) == 2  # --reason is required
+    assert exit_code(["report", "movements"]) == 2  # --item is required
+    assert exit_code(["report", "items", "--as-of", "2025-06-30"]) == 2
+    assert exit_code(["report", "custody", "--as-of", "2025-13-01"]) == 2
+
+
+def test_dates_cover_whole_days():
+    args = cli.build_parser().parse_args(["report", "movements", "--item", "1",
+                                          "--since", "2025-06-30", "--until", "2025-07-01"])
+    assert args.since == datetime.datetime(2025, 6, 30, 0, 0)
+    assert args.until == datetime.datetime.combine(datetime.date(2025, 7, 1), datetime.time.max)
+    args = cli.build_parser().parse_args(["report", "custody", "--as-of", "2025-06-30 12:30"])
+    assert args.as_of == datetime.datetime(2025, 6, 30, 12, 30)
+
+
+def test_import_rejects_bad_rows_before_touching_the_database(tmp_path, capsys):
+    path = tmp_path / "items.csv"
+    path.write_text("name,category,unit,quantity,reorder_level\nPens,Office,box,x,5\n")
+    assert cli.main(["import-items", str(path)]) == 1
+    assert "items.csv:2: bad row" in capsys.readouterr().out
+
+
+def test_import_missing_file_fails(tmp_path):
+    assert cli.main(["import-items", str(tmp_path / "missing.csv")]) == 1
+
+
+def test_report_writes_header_and_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "_report_batches", lambda args: iter([[Row("Pens", 3)], [Row("Ink", 1)]]))
+    path = tmp_path / "report.csv"
+    assert cli.main(["report", "items", "--output", str(path)]) == 0
+    assert path.read_text().splitlines() == ["name,quantity", "Pens,3", "Ink,1"]
+
+
+def test_report_fails_when_the_database_failed(tmp_path, monkeypatch):
+    from config.db_config import _query_scope
+
+    def failing_batches(args):
+        # What a service does on a DB error: its connection marks the scope's token, and it returns no rows
+        token, _ = _query_scope.get()
+        token.failed = True
+        yield []
+
+    monkeypatch.setattr(cli, "_report_batches", failing_batches)
+    assert cli.main(["report", "items", "--output", str(tmp_path / "report.csv")]) == 1
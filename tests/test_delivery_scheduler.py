@@ -0,0 +1,112 @@
+from models.rows import CourierRequestRow
+from services.delivery_scheduler import DeliveryScheduler
+
+
+def line(request_no, quantity, request_type='Request', college='College A'):
+    return CourierRequestRow(request_no, college, f"item {request_no}", quantity, request_type, '')
+
+
+def loads(runs):
+    return [load for load, _ in runs]
+
+
+def test_college_fitting_one_vehicle_is_one_run():
+    runs = DeliveryScheduler._split_college([line(1, 10), line(2, 15), line(3, 5, 'Return')], capacity=50)
+    assert loads(runs) == [25]
+    assert sorted(l.request_no for l in runs[0][1]) == [1, 2, 3]
+
+
+def test_first_fit_decreasing_packs_bins():
+    # 30 + 20 fill one run, 25 + 25 the other: no run is over capacity and none is wasted
+    lines = [line(1, 20), line(2, 25), line(3, 30), line(4, 25)]
+    runs = DeliveryScheduler._split_college(lines, capacity=50)
+    assert sorted(loads(runs)) == [50, 50]
+    for load, run_lines in runs:
+        assert sum(l.quantity for l in run_lines) == load <= 50
+
+
+def test_deliveries_and_returns_are_packed_separately():
+    # A run carries deliveries out and returns back, so each leg has the full capacity
+    lines = [line(1, 40), line(2, 40, 'Return'), line(3, 30, 'Return')]
+    runs = DeliveryScheduler._split_college(lines, capacity=50)
+    assert loads(runs) == [40, 30]
+    assert sorted(l.request_no for l in runs[0][1]) == [1, 2]
+    assert [l.request_no for l in runs[1][1]] == [3]
+
+
+def test_oversized_line_gets_its_own_run():
+    runs = DeliveryScheduler._split_college([line(1, 80), line(2, 10)], capacity=50)
+    assert sorted(loads(runs)) == [10, 80]
+
+
+def test_plan_balances_load_over_couriers():
+    pickups = [(college, line(college * 10 + i, quantity, college=f"College {college}"))
+               for college, quantities in {1: [40], 2: [30], 3: [20], 4: [10]}.items()
+               for i, quantity in enumerate(quantities)]
+    runs = DeliveryScheduler.plan_runs(couriers=[7, 9], capacity=50, pickups=pickups)
+    per_courier = {}
+    for run in runs:
+        per_courier[run.courier_id] = per_courier.get(run.courier_id, 0) + run.load
+    assert per_courier == {7: 50, 9: 50}  # 40+10 and 30+20
+    assert len(runs) == 4
+
+
+def test_plan_groups_a_college_into_one_run():
+    pickups = [(1, line(1, 5)), (1, line(2, 5)), (2, line(3, 5, college='College B'))]
+    runs = DeliveryScheduler.plan_runs(couriers=[7], capacity=50, pickups=pickups)
+    assert sorted(run.request_nos for run in runs) == [[1, 2], [3]]
+    assert all(run.courier_id == 7 for run in runs)
+
+
+def test_plan_is_ordered_by_courier_then_load():
+    pickups = [(c, line(c, q, college=f"College {c}")) for c, q in ((1, 10), (2, 30), (3, 20))]
+    runs = DeliveryScheduler.plan_runs(couriers=['9', '7'], capacity=50, pickups=pickups)
+    assert [(run.courier_id, run.load) for run in runs] == [(9, 30), (7, 20), (7, 10)]
+
+
+def test_plan_without_couriers_or_pickups_is_empty():
+    assert DeliveryScheduler.plan_runs(couriers=[], capacity=50, pickups=[(1, line(1, 5))]) == []
+    assert DeliveryScheduler.plan_runs(couriers=[7], capacity=50, pickups=[]) == []
+
+
+def four_colleges():
+    return [(college, line(college, quantity, college=f"College {college}"))
+            for college, quantity in ((1, 40), (2, 30), (3, 20), (4, 10))]
+
+
+def assignment(runs):
+    return {courier_id: sorted(run.request_nos for run in runs if run.courier_id == courier_id)
+            for courier_id in {run.courier_id for run in runs}}
+
+
+def test_replan_after_confirmation_keeps_other_assignments():
+    first = DeliveryScheduler.plan_runs(couriers=[7, 9], capacity=50, pickups=four_colleges())
+    assert assignment(first) == {7: [[1], [4]], 9: [[2], [3]]}
+
+    # Courier 7 picks up run [1]: it leaves the open pickups and counts as 7's load in transit
+    pickups = [pickup for pickup in four_colleges() if pickup[1].request_no != 1]
+    replan = DeliveryScheduler.plan_runs(couriers=[7, 9], capacity=50, pickups=pickups,
+                                         in_transit={7: 40}, previous=first)
+    assert assignment(replan) == {7: [[4]], 9: [[2], [3]]}
+
+
+def test_replan_places_only_new_pickups():
+    first = DeliveryScheduler.plan_runs(couriers=[7, 9], capacity=50, pickups=four_colleges())
+    pickups = four_colleges() + [(5, line(5, 5, college="College 5"))]
+    replan = DeliveryScheduler.plan_runs(couriers=[7, 9], capacity=50, pickups=pickups, previous=first)
+    assert assignment(replan) == {7: [[1], [4], [5]], 9: [[2], [3]]}  # Existing runs untouched; 50/50 tie goes to 7
+
+
+def test_in_transit_load_counts_for_balancing():
+    pickups = [(1, line(1, 30)), (2, line(2, 20, college='College B'))]
+    runs = DeliveryScheduler.plan_runs(couriers=[7, 9], capacity=50, pickups=pickups, in_transit={7: 100})
+    assert assignment(runs) == {9: [[1], [2]]}
+
+
+def test_previous_run_partly_taken_is_replanned():
+    first = DeliveryScheduler.plan_runs(couriers=[7], capacity=50,
+                                        pickups=[(1, line(1, 10)), (1, line(2, 10))])
+    # Request 2 was picked up one by one: run [1, 2] is no longer fully open
+    replan = DeliveryScheduler.plan_runs(couriers=[7, 9], capacity=50, pickups=[(1, line(1, 10))],
+                                         in_transit={7: 10}, previous=first)
+    assert assignment(replan) == {9: [[1]]}
@@ -0,0 +1,91 @@
+import datetime
+import math
+
+import numpy as np
+import pytest
+
+from services.demand_analytics import DemandAnalytics
+
+START = datetime.date(2025, 1, 1)
+
+
+def history(requests, n_days=10, start=START):
+    """fetch_history()-shaped dict from (item_id, college_id, quantity, day, lead_days or None) tuples."""
+    item_id, college_id, quantity, day, lead = zip(*requests)
+    return {
+        'item_id': np.array(item_id, dtype=np.int64),
+        'college_id': np.array(college_id, dtype=np.int64),
+        'quantity': np.array(quantity, dtype=float),
+        'day': np.array(day, dtype=np.int64),
+        'month': np.array([(start + datetime.timedelta(days=d)).month - 1 for d in day], dtype=np.int64),
+        'lead_days': np.array([np.nan if l is None else l for l in lead], dtype=float),
+        'start': start,
+        'n_days': n_days,
+        'items': {},
+    }
+
+
+def test_daily_mean_and_std_count_days_without_requests():
+    # Item 1: 10 units on day 0 (two requests) and 10 on day 5, nothing on the other 8 days
+    stats = DemandAnalytics.compute_statistics(
+        history([(1, 100, 4, 0, None), (1, 100, 6, 0, None), (1, 100, 10, 5, None)]), today=START)
+    daily = np.zeros(10)
+    daily[[0, 5]] = 10
+    assert stats['item_id'].tolist() == [1]
+    assert stats['daily_mean'][0] == pytest.approx(daily.mean())  # 2.0
+    assert stats['daily_std'][0] == pytest.approx(daily.std())  # 4.0
+
+
+def test_lead_time_statistics_and_fallback():
+    stats = DemandAnalytics.compute_statistics(
+        history([(1, 100, 1, 0, 2.0), (1, 100, 1, 1, 4.0), (2, 100, 1, 2, None)]), today=START)
+    assert stats['lead_mean'].tolist() == pytest.approx([3.0, 3.0])  # Item 2 was never delivered: median of all
+    assert stats['lead_std'].tolist() == pytest.approx([1.0, 0.0])
+
+
+def test_never_delivered_uses_default_lead_time():
+    stats = DemandAnalytics.compute_statistics(history([(1, 100, 1, 0, None)]), today=START)
+    assert stats['lead_mean'][0] == DemandAnalytics.DEFAULT_LEAD_DAYS
+
+
+def test_main_college_is_the_biggest_requester():
+    stats = DemandAnalytics.compute_statistics(
+        history([(1, 100, 4, 0, None), (1, 200, 16, 1, None), (2, 100, 5, 2, None)]), today=START)
+    assert stats['top_college'].tolist() == [200, 100]
+    assert stats['top_share'].tolist() == pytest.approx([0.8, 1.0])
+
+
+def test_season_factor_follows_the_current_month():
+    # A year of history, all 12 requests in January
+    h = history([(1, 100, 1, day, None) for day in range(12)], n_days=365)
+    january = DemandAnalytics.compute_statistics(h, today=datetime.date(2026, 1, 10))
+    july = DemandAnalytics.compute_statistics(h, today=datetime.date(2026, 7, 10))
+    assert january['season_factor'][0] == pytest.approx((12 / 31) / (12 / 365))
+    assert july['season_factor'][0] == pytest.approx(0.0)
+
+
+def test_few_requests_get_no_seasonal_adjustment():
+    h = history([(1, 100, 1, day, None) for day in range(DemandAnalytics.MIN_REQUESTS_FOR_SEASON - 1)], n_days=365)
+    stats = DemandAnalytics.compute_statistics(h, today=datetime.date(2026, 7, 10))
+    assert stats['season_factor'][0] == 1.0
+
+
+def stats(daily_mean, daily_std, lead_mean, lead_std, season_factor=1.0):
+    return {key: np.array([value], dtype=float) for key, value in (
+        ('daily_mean', daily_mean), ('daily_std', daily_std), ('lead_mean', lead_mean),
+        ('lead_std', lead_std), ('season_factor', season_factor))}
+
+
+def test_reorder_level_is_lead_time_demand_plus_safety_stock():
+    # d*L + z * sqrt(L*sd^2 + d^2*sL^2) = 8 + 1.645 * sqrt(36 + 4)
+    expected = math.ceil(2 * 4 + DemandAnalytics.SERVICE_LEVEL_Z * math.sqrt(4 * 3 ** 2 + 2 ** 2 * 1 ** 2))
+    assert DemandAnalytics.recommend_levels(stats(2, 3, 4, 1)).tolist() == [expected]  # 19
+
+
+def test_reorder_level_without_variability_is_lead_time_demand():
+    assert DemandAnalytics.recommend_levels(stats(1.5, 0, 2, 0)).tolist() == [3]
+
+
+def test_reorder_level_scales_demand_by_season():
+    expected = math.ceil(4 * 4 + DemandAnalytics.SERVICE_LEVEL_Z * math.sqrt(4 * 3 ** 2 + 4 ** 2 * 1 ** 2))
+    assert DemandAnalytics.recommend_levels(stats(2, 3, 4, 1, season_factor=2)).tolist() == [expected]  # 28
@@ -0,0 +1,73 @@
+import threading
+
+from services.job_scheduler import JobScheduler
+
+
+def test_job_never_overlaps_itself():
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    scheduler = JobScheduler()
+    scheduler.add("slow", slow, 0)
+    worker = threading.Thread(target=scheduler.run_now, args=("slow",))
+    worker.start()
+    try:
+        assert started.wait(5)
+        assert scheduler.run_now("slow") is None  # Still busy: skipped, not queued
+    finally:
+        release.set()
+        worker.join(5)
+        scheduler.stop()
+    assert [run.result for run in scheduler.history("slow")] == ["done"]
+    assert scheduler.run_now("slow").ok  # Free again once the first run finished
+
+
+def test_failures_are_recorded_not_raised():
+    scheduler = JobScheduler()
+    scheduler.add("broken", lambda: 1 / 0, 0)
+    try:
+        run = scheduler.run_now("broken")
+    finally:
+        scheduler.stop()
+    assert not run.ok
+    assert run.result.startswith("ZeroDivisionError")
+
+
+def test_history_is_bounded_and_summarised(monkeypatch):
+    monkeypatch.setattr(JobScheduler, "HISTORY_SIZE", 3)
+    outcomes = iter([True, False, True, True])
+
+    def job():
+        if not next(outcomes): raise RuntimeError("no connection")
+        return "ok"
+
+    scheduler = JobScheduler()
+    scheduler.add("backup", job, 0)
+    scheduler.add("idle", lambda: "ok", 0)
+    try:
+        runs = [scheduler.run_now("backup") for _ in range(4)]
+    finally:
+        scheduler.stop()
+    assert scheduler.history("backup") == runs[1:]
+    stats = scheduler.stats()
+    assert stats["backup"]["runs"] == 3
+    assert stats["backup"]["failures"] == 1
+    assert stats["backup"]["last_run"] == runs[-1].started_at
+    assert stats["backup"]["max_seconds"] >= stats["backup"]["avg_seconds"]
+    assert stats["idle"] == dict(runs=0, failures=0, avg_seconds=0.0, max_seconds=0.0, last_run=None)
+    assert scheduler.job_names() == ["backup", "idle"]
+
+
+def test_due_jobs_run_on_the_scheduler_thread():
+    ran = threading.Event()
+    scheduler = JobScheduler()
+    scheduler.add("tick", ran.set, 0.01)
+    scheduler.start()
+    try:
+        assert ran.wait(5)
+    finally:
+        scheduler.stop()
@@ -0,0 +1,74 @@
+from services.job_scheduler import rotate_transaction_log
+from services.log_index import TransactionLogIndex, query_history, rotated_paths
+
+
+def record(time, actor, action, ref, qty):
+    return f"[{time}] Actor: {actor} | Action: {action} | Item/Req: {ref} | Qty: {qty}\n"
+
+
+def append(path, *lines):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def test_update_indexes_only_appended_lines(tmp_path):
+    log = str(tmp_path / "transactions.log")
+    append(log, record("2025-06-30 09:00:00", 1001, "Create Request", 5, 10),
+           record("2025-06-30 10:30:00", 2002, "Approve Request", 41, 10))
+    index = TransactionLogIndex(log)
+    try:
+        assert index.update() == 2
+        assert index.update() == 0
+        append(log, record("2025-06-30 11:00:00", 1001, "Create Request", 7, 3),
+               "[2025-06-30 11:05:00] Actor: 1001 | Action: Cre")  # Still being written
+        assert index.update() == 1
+        assert len(index.query(actor=1001)) == 2
+    finally:
+        index.close()
+
+
+def test_query_combines_filters_and_time_range(tmp_path):
+    log = str(tmp_path / "transactions.log")
+    append(log, record("2025-06-30 09:00:00", 1001, "Create Request", 5, 10),
+           record("2025-06-30 09:40:00", 1001, "Create Return", 5, 2),
+           record("2025-06-30 10:30:00", 2002, "Approve Request", 41, 10),
+           record("2025-07-01 08:00:00", 1001, "Create Request", 9, 1))
+    index = TransactionLogIndex(log)
+    try:
+        assert [line[1:20] for line in index.query(actor=1001, action="Create Request")] == \
+            ["2025-06-30 09:00:00", "2025-07-01 08:00:00"]
+        assert len(index.query(ref=5)) == 2
+        # Exact times inside the 09 hour bucket are checked on the records
+        assert [line[1:20] for line in index.query(since="2025-06-30 09:30:00", until="2025-06-30")] == \
+            ["2025-06-30 09:40:00", "2025-06-30 10:30:00"]
+        assert index.query(actor=3003) == []
+    finally:
+        index.close()
+
+
+def test_rewritten_log_is_reindexed(tmp_path):
+    log = str(tmp_path / "transactions.log")
+    append(log, record("2025-06-30 09:00:00", 1001, "Create Request", 5, 10))
+    index = TransactionLogIndex(log)
+    try:
+        index.update()
+        with open(log, "w", encoding="utf-8") as f:
+            f.write(record("2025-07-01 09:00:00", 2002, "Approve Request", 6, 1))
+        assert index.query(actor=1001) == []
+        assert len(index.query(actor=2002)) == 1
+    finally:
+        index.close()
+
+
+def test_rotated_logs_stay_searchable(tmp_path):
+    log = str(tmp_path / "transactions.log")
+    append(log, record("2025-06-30 09:00:00", 1001, "Create Request", 5, 10))
+    assert rotate_transaction_log(log, max_bytes=1) == f"rotated to {log}.1"
+    append(log, record("2025-07-01 09:00:00", 1001, "Create Request", 6, 1))
+    assert rotate_transaction_log(log, max_bytes=1) == f"rotated to {log}.1"
+    append(log, record("2025-07-02 09:00:00", 1001, "Create Request", 7, 2))
+
+    assert rotated_paths(log) == [f"{log}.2", f"{log}.1"]
+    assert (tmp_path / "transactions.log.2.idx").exists()
+    assert [line[1:11] for line in query_history(log, actor=1001)] == ["2025-06-30", "2025-07-01", "2025-07-02"]
+    assert len(query_history(log, ref=6)) == 1
@@ -0,0 +1,62 @@
+import pytest
+
+from monitoring import metrics
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", [])
+    monkeypatch.setattr(metrics, "_enabled", True)
+    return metrics._registry
+
+
+def test_counter_and_gauge_lines(registry):
+    counter = metrics.Counter("ksu_test_total", "Things counted", ("kind",))
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    counter.inc('say "hi"\n')
+    metrics.Gauge("ksu_test_pool", "Open connections", lambda: {(): 4})
+    assert metrics.render().splitlines() == [
+        "# HELP ksu_test_total Things counted",
+        "# TYPE ksu_test_total counter",
+        'ksu_test_total{kind="a"} 3',
+        'ksu_test_total{kind="say \\"hi\\"\\n"} 1',
+        "# HELP ksu_test_pool Open connections",
+        "# TYPE ksu_test_pool gauge",
+        "ksu_test_pool 4",
+    ]
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = metrics.Histogram("ksu_test_seconds", "Latency", ("method",), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(seconds, "get_items")
+    lines = metrics.render().splitlines()
+    assert lines[2:] == [
+        'ksu_test_seconds_bucket{method="get_items",le="0.1"} 2',
+        'ksu_test_seconds_bucket{method="get_items",le="1.0"} 3',
+        'ksu_test_seconds_bucket{method="get_items",le="+Inf"} 4',
+        'ksu_test_seconds_count{method="get_items"} 4',
+        'ksu_test_seconds_sum{method="get_items"} 3.65',
+    ]
+
+
+def test_nothing_is_collected_when_disabled(registry, monkeypatch):
+    counter = metrics.Counter("ksu_test_total", "Things counted", ("kind",))
+    histogram = metrics.Histogram("ksu_test_seconds", "Latency")
+    monkeypatch.setattr(metrics, "_enabled", False)
+    counter.inc("a")
+    histogram.observe(0.2)
+    assert [line for line in metrics.render().splitlines() if not line.startswith("#")] == []
+
+
+def test_timed_service_labels_the_sql_it_runs(registry, monkeypatch):
+    monkeypatch.setattr(metrics, "SERVICE_SECONDS", metrics.Histogram("ksu_test_service_seconds", "", ("method",)))
+
+    @metrics.timed_service("StockManager.get_all_items")
+    def get_all_items():
+        return metrics.service_method()
+
+    assert get_all_items() == "StockManager.get_all_items"
+    assert metrics.service_method() == ""
+    assert 'ksu_test_service_seconds_count{method="StockManager.get_all_items"} 1' in metrics.render()
@@ -0,0 +1,71 @@
+import pytest
+
+from models.request_status import RequestStatus, transition, transition_many
+
+
+class RecordingCursor:
+    """Stands in for a DB cursor: records the statement and returns canned rows."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.sql = None
+        self.params = None
+
+    def execute(self, sql, params):
+        self.sql, self.params = sql, params
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_transition_only_from_statuses_that_lead_to_target():
+    cursor = RecordingCursor([(4, 10, int(RequestStatus.APPROVED))])
+    result = transition(cursor, 42, RequestStatus.PICKED_UP)
+    assert result == (4, 10, RequestStatus.APPROVED)
+    # target, request_no, allowed sources, request_type
+    assert cursor.params == [2, 42, [int(RequestStatus.APPROVED)], 'Request']
+    assert "r.request_type = %s" in cursor.sql
+    assert "FOR UPDATE" in cursor.sql
+    assert cursor.sql.count("%s") == len(cursor.params)
+
+
+def test_transition_sets_extra_columns_and_narrows_sources():
+    cursor = RecordingCursor([(int(RequestStatus.PENDING),)])
+    result = transition(cursor, 7, RequestStatus.REJECTED, sources=(RequestStatus.PENDING,),
+                        set_columns={'reject_reason': "Out of stock"}, returning=())
+    assert result == (RequestStatus.PENDING,)
+    assert "status_code = %s, reject_reason = %s" in cursor.sql
+    assert cursor.params == [int(RequestStatus.REJECTED), "Out of stock", 7, [int(RequestStatus.PENDING)]]
+    # Rejection applies to requests and returns alike
+    assert "request_type" not in cursor.sql
+    assert "r.item_id" not in cursor.sql
+
+
+def test_transition_not_allowed_returns_none():
+    assert transition(RecordingCursor(), 7, RequestStatus.DELIVERED) is None
+
+
+def test_transition_to_unreachable_status_raises():
+    with pytest.raises(ValueError):
+        transition(RecordingCursor(), 7, RequestStatus.PENDING)
+    with pytest.raises(ValueError):
+        transition(RecordingCursor(), 7, RequestStatus.APPROVED, sources=(RequestStatus.APPROVED,))
+
+
+def test_transition_many_maps_each_source_to_its_target():
+    cursor = RecordingCursor([(3,), (5,)])
+    moves = {RequestStatus.APPROVED: RequestStatus.PICKED_UP,
+             RequestStatus.RETURN_APPROVED: RequestStatus.RETURN_IN_TRANSIT}
+    assert transition_many(cursor, [5, 3, 9], moves, set_columns={'courier_id': 8}) == [3, 5]
+    assert "CASE status_code WHEN %s THEN %s WHEN %s THEN %s END, courier_id = %s" in cursor.sql
+    assert cursor.params == [1, 2, 4, 5, 8, [5, 3, 9], [1, 4]]
+    assert "ORDER BY request_no FOR UPDATE" in cursor.sql
+    assert cursor.sql.count("%s") == len(cursor.params)
+
+
+def test_transition_many_rejects_invalid_moves():
+    with pytest.raises(ValueError):
+        transition_many(RecordingCursor(), [1], {RequestStatus.DELIVERED: RequestStatus.PENDING})
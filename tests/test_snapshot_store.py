@@ -0,0 +1,70 @@
+import datetime
+import decimal
+import json
+
+import pytest
+
+from models.inventory_item import InventoryItem
+from models.rows import CollegeRequestRow, ItemRow
+from services.snapshot_store import SnapshotStore
+
+
+def round_trip(value):
+    # Through JSON text, as the value goes through the snapshot file
+    return SnapshotStore._decode(json.loads(json.dumps(SnapshotStore._encode(value))))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(SnapshotStore, "PATH", str(tmp_path / "snapshot.json"))
+    monkeypatch.setattr(SnapshotStore, "_data", None)
+    monkeypatch.setattr(SnapshotStore, "_dirty", False)
+    monkeypatch.setattr(SnapshotStore, "_writer", None)
+    return tmp_path / "snapshot.json"
+
+
+def flush():
+    writer = SnapshotStore._writer
+    if writer is not None: writer.join(5)
+
+
+def test_rows_keep_their_type():
+    row = CollegeRequestRow(12, "Projector", 2, "Pending", datetime.datetime(2025, 6, 30, 9, 15), None)
+    restored = round_trip([row])
+    assert restored == [row]
+    assert type(restored[0]) is CollegeRequestRow
+    assert restored[0].request_date == datetime.datetime(2025, 6, 30, 9, 15)
+
+
+def test_inventory_items_are_rebuilt():
+    item = InventoryItem(3, "Office Desk", "Furniture", "piece", 5, 20)
+    restored = round_trip(item)
+    assert isinstance(restored, InventoryItem)
+    assert [getattr(restored, name) for name in InventoryItem.__slots__] == [3, "Office Desk", "Furniture",
+                                                                             "piece", 5, 20]
+
+
+def test_dict_keys_dates_and_decimals():
+    value = {7: [ItemRow(1, "Pens", None, "box", 10, decimal.Decimal("4.5"))], "day": datetime.date(2025, 1, 2)}
+    restored = round_trip(value)
+    assert set(restored) == {7, "day"}  # Integer keys survive JSON
+    assert restored["day"] == datetime.date(2025, 1, 2)
+    assert restored[7][0].quantity_central == 4.5
+
+
+def test_put_then_get_from_a_new_session(store):
+    rows = [ItemRow(1, "Pens", "Office", "box", 10, 40)]
+    SnapshotStore.put("manager/items", rows)
+    flush()
+    SnapshotStore._data = None  # Next start of the app: read back from the file
+    assert SnapshotStore.get("manager/items") == rows
+    assert SnapshotStore.get("manager/other") is None
+
+
+def test_damaged_file_or_unknown_row_type_reads_as_missing(store):
+    store.write_text("{not json")
+    assert SnapshotStore.get("manager/items") is None
+
+    store.write_text(json.dumps({"manager/items": [{"row": "RemovedRow", "v": [1]}]}))
+    SnapshotStore._data = None
+    assert SnapshotStore.get("manager/items") is None